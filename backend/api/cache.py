@@ -0,0 +1,195 @@
+# cache.py
+#
+# 地方の一覧 (BasePokemonListView) のレスポンスキャッシュ。
+# データは all_register を実行したときにしか変わらないので、描画済みの JSON 本文をそのまま返す。
+#
+# - キー: データの版 (DataVersion "pokemon" の指紋と更新時刻) + ビュー + ホスト + クエリパラメータ
+#   本文の next / previous はリクエストのクエリから作られるので、パラメータはすべてキーに入れる。
+#   DRF はリンクのパラメータを名前順に並べ直すため、並び順だけが違うリクエストは同じキーにする
+# - all_register / all_set_original が DataVersion を更新すると版が変わり、古いキーは使われなくなる
+#   （LRU では容量の上限で追い出される）
+# - バックエンドは settings.POKEDEX_RESPONSE_CACHE で選ぶ
+#     {"BACKEND": "lru", "MAX_BYTES": ...}            プロセス内の LRU（本文のバイト数で上限を決める）
+#     {"BACKEND": "django", "ALIAS": ..., "TIMEOUT": ...}  Django の CACHES (Redis など) を使う
+#     {"BACKEND": None}                                 無効
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+from pokedex.models.data_version import DataVersion
+
+# all_register / all_set_original が書く DataVersion の name
+DATA_VERSION_NAME = DataVersion.POKEMON
+DEFAULT_SETTINGS = {"BACKEND": "lru", "MAX_BYTES": 64 * 1024 * 1024}
+
+# (本文, Content-Type)
+CachedBody = Tuple[bytes, str]
+
+
+class LRUBackend:
+    """
+    プロセス内の LRU。本文とキーのバイト数の合計が max_bytes を超えたら、最も古く使われたものから追い出す。
+    """
+
+    name = "lru"
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[CachedBody, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: CachedBody) -> None:
+        size = len(key) + len(value[0]) + len(value[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self.stores += 1
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class DjangoCacheBackend:
+    """
+    Django の CACHES[alias] (django.core.cache.backends.redis.RedisCache など) に置く。
+    ヒット・ミスはこのプロセスで数えた値。追い出しはキャッシュサーバー側で行われるので数えない (None)。
+    """
+
+    name = "django"
+
+    def __init__(self, alias: str = "default", timeout: Optional[int] = None) -> None:
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        value = caches[self.alias].get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return tuple(value) if value is not None else None
+
+    def set(self, key: str, value: CachedBody) -> None:
+        caches[self.alias].set(key, value, self.timeout)
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": f"{self.name}:{self.alias}",
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": None,
+            }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    settings.POKEDEX_RESPONSE_CACHE のバックエンド（プロセスに 1 つ）。無効なら None。
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend(getattr(settings, "POKEDEX_RESPONSE_CACHE", DEFAULT_SETTINGS))
+    return _backend or None
+
+
+def _create_backend(options: Optional[dict]):
+    kind = (options or {}).get("BACKEND")
+    if kind == "lru":
+        return LRUBackend(int(options.get("MAX_BYTES", DEFAULT_SETTINGS["MAX_BYTES"])))
+    if kind == "django":
+        return DjangoCacheBackend(options.get("ALIAS", "default"), options.get("TIMEOUT"))
+    if kind is None:
+        return False  # 無効（毎回 settings を読み直さないように False を入れておく）
+    raise ValueError(f"POKEDEX_RESPONSE_CACHE の BACKEND が不明です: {kind!r}")
+
+
+def data_stamp() -> Optional[str]:
+    """
+    データの版。all_register が DataVersion を書くたびに変わる。表が無ければ None（キャッシュしない）。
+    """
+    try:
+        row = DataVersion.objects.filter(name=DATA_VERSION_NAME).values_list("fingerprint", "updated_at").first()
+    except DatabaseError:
+        return None
+    if row is None:
+        return "none"
+    return f"{row[0]}@{row[1].timestamp()}"
+
+
+def response_key(view, request) -> Optional[str]:
+    """
+    一覧のリクエストのキャッシュキー。データの版が分からなければ None。
+    next / previous の URL はホストとクエリパラメータを含むので、どちらもキーに入れる（パラメータは名前順）。
+    """
+    stamp = data_stamp()
+    if stamp is None:
+        return None
+    canonical = json.dumps(
+        [
+            stamp,
+            type(view).__name__,
+            request.scheme,
+            request.get_host(),
+            request.accepted_renderer.format,
+            sorted(request.query_params.lists()),
+        ],
+        ensure_ascii=False,
+    )
+    return "pokemon-list:" + hashlib.sha1(canonical.encode("utf-8")).hexdigest()
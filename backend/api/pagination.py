@@ -0,0 +1,131 @@
+# pagination.py
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    (ja, unique_id) をキーにしたカーソル方式のページネーション。?pagination=cursor で使う。
+
+    - 次 / 前のページは、直前のページの最後 / 最初の行の (ja, unique_id) より後 / 前の limit 件を読むので、
+      OFFSET のように前の行を読み飛ばさず、何ページ目でも同じ手間で済む（地方の一覧の部分索引をそのまま使う）
+    - cursor は (向き, ja, unique_id) を base64 にしただけの不透明な文字列。next / previous の URL に入れて返す
+    - 件数 (count) は最初のページ (cursor なし) か ?count=1 のときだけ数え、それ以外は null を返す
+    """
+
+    ordering = ("ja", "unique_id")
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    count_query_param = "count"
+    # StandardResultsSetPagination と同じ
+    default_limit = 24
+    max_limit = 72
+
+    def paginate_queryset(self, queryset, request, view=None) -> List:
+        self.request = request
+        self.limit = self.get_limit(request)
+        cursor = self.decode_cursor(request)
+
+        self.count: Optional[int] = None
+        if cursor is None or request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.count = queryset.count()
+
+        if cursor is None:
+            rows = list(queryset.order_by(*self.ordering)[:self.limit + 1])
+            self.has_next, self.has_previous = len(rows) > self.limit, False
+            rows = rows[:self.limit]
+        elif cursor[0] == "n":
+            # (ja, unique_id) > cursor。ja >= の範囲で索引を引き、同じ ja の分だけ unique_id で除く
+            _, ja, unique_id = cursor
+            rows = list(
+                queryset.filter(ja__gte=ja)
+                .exclude(ja=ja, unique_id__lte=unique_id)
+                .order_by(*self.ordering)[:self.limit + 1]
+            )
+            self.has_next, self.has_previous = len(rows) > self.limit, True
+            rows = rows[:self.limit]
+        else:
+            # (ja, unique_id) < cursor を逆順に読み、並べ直す
+            _, ja, unique_id = cursor
+            rows = list(
+                queryset.filter(ja__lte=ja)
+                .exclude(ja=ja, unique_id__gte=unique_id)
+                .order_by(*(f"-{field_name}" for field_name in self.ordering))[:self.limit + 1]
+            )
+            self.has_next, self.has_previous = True, len(rows) > self.limit
+            rows = rows[:self.limit][::-1]
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["count", "results"],
+            "properties": {
+                "count": {"type": "integer", "nullable": True},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.cursor_link(("n", *self.row_key(self.page[-1])))
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.cursor_link(("p", *self.row_key(self.page[0])))
+
+    def cursor_link(self, cursor: Tuple[str, str, str]) -> str:
+        url = remove_query_param(self.request.build_absolute_uri(), self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(cursor))
+
+    def row_key(self, row) -> Tuple[str, str]:
+        return tuple(getattr(row, field_name) for field_name in self.ordering)
+
+    def encode_cursor(self, cursor: Tuple[str, str, str]) -> str:
+        raw = json.dumps(list(cursor), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, request) -> Optional[Tuple[str, str, str]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            direction, ja, unique_id = json.loads(raw)
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if direction not in ("n", "p") or not isinstance(ja, str) or not isinstance(unique_id, str):
+            raise NotFound("Invalid cursor")
+        return direction, ja, unique_id
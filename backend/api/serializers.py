@@ -89,3 +89,90 @@ class DefaultSerializer(serializers.ModelSerializer):
             "pokemon": obj.pokemon_json_file,
             "form": obj.form_json_file
         }
+
+
+# ----- values_list の行からの高速版 -----
+# DefaultSerializer と同じ形の辞書を、モデルのインスタンスを作らずに values_list(*DEFAULT_ROW_FIELDS) の行から作る。
+# 一覧のビュー (api/views.py) はこちらを使う。出力が同じであることは manage.py compare_serializers で確かめる。
+# DefaultSerializer の項目を変えたら、DEFAULT_ROW_FIELDS と serialize_default_rows も同じように変えること。
+
+DEFAULT_ROW_FIELDS = (
+    "original",
+    "unique_id", "species_id", "pokemon_id", "form_id",
+    "ja", "en", "sub_ja", "sub_en",
+    "front_default_url", "front_shiny_url",
+    "type_first", "type_second",
+    "ability_01", "ability_02", "ability_03",
+    "base_h", "base_a", "base_b", "base_c", "base_d", "base_s", "base_t",
+    "exist_generation_01", "exist_generation_02", "exist_generation_03",
+    "exist_generation_04", "exist_generation_05", "exist_generation_06",
+    "exist_generation_07", "exist_generation_08", "exist_generation_09",
+    "national_dex", "paldea_dex", "kitakami_dex", "blueberry_dex",
+    "species_json_file", "pokemon_json_file", "form_json_file",
+)
+
+GENERATIONS = tuple(range(1, 10))
+
+
+def serialize_default_rows(rows):
+    """
+    values_list(*DEFAULT_ROW_FIELDS) の行（タプルでも named=True でもよい）を DefaultSerializer と同じ形のリストにする。
+    """
+    data = []
+    append = data.append
+    for (
+        original,
+        unique_id, species_id, pokemon_id, form_id,
+        ja, en, sub_ja, sub_en,
+        front_default_url, front_shiny_url,
+        type_first, type_second,
+        ability_01, ability_02, ability_03,
+        base_h, base_a, base_b, base_c, base_d, base_s, base_t,
+        exist_01, exist_02, exist_03, exist_04, exist_05, exist_06, exist_07, exist_08, exist_09,
+        national_dex, paldea_dex, kitakami_dex, blueberry_dex,
+        species_json_file, pokemon_json_file, form_json_file,
+    ) in rows:
+        exists = (exist_01, exist_02, exist_03, exist_04, exist_05, exist_06, exist_07, exist_08, exist_09)
+        append({
+            "original": original,
+            "ids": {
+                "unique_id": unique_id,
+                "species_id": species_id,
+                "pokemon_id": pokemon_id,
+                "form_id": form_id
+            },
+            "names": {
+                "ja": ja,
+                "en": en.capitalize(),
+                "subJa": sub_ja or "",
+                "subEn": sub_en.capitalize() if sub_en else ""
+            },
+            "images": {
+                "frontUrl": front_default_url,
+                "frontShinyUrl": front_shiny_url
+            },
+            "type_": [value for value in (type_first, type_second) if value],
+            "abilities": [value for value in (ability_01, ability_02, ability_03) if value],
+            "stats": {
+                "hp": base_h,
+                "attack": base_a,
+                "defense": base_b,
+                "spAttack": base_c,
+                "spDefense": base_d,
+                "speed": base_s,
+                "total": base_t
+            },
+            "exists_in_generations": [gen for gen, exist in zip(GENERATIONS, exists) if exist],
+            "dex_numbers": {
+                "national": national_dex,
+                "paldea": paldea_dex,
+                "kitakami": kitakami_dex,
+                "blueberry": blueberry_dex
+            },
+            "json_files": {
+                "species": species_json_file,
+                "pokemon": pokemon_json_file,
+                "form": form_json_file
+            },
+        })
+    return data
@@ -0,0 +1,255 @@
+# tests.py
+
+from __future__ import annotations
+
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from pokedex.models.data_version import DataVersion
+from pokedex.models.move import Move
+from pokedex.models.pokemon import Pokemon
+
+from . import cache as response_cache
+from .serializers import DEFAULT_ROW_FIELDS, DefaultSerializer, serialize_default_rows
+
+
+def make_pokemon(unique_id: str, **fields) -> Pokemon:
+    record = {
+        "unique_id": unique_id,
+        "species_id": unique_id[:4],
+        "pokemon_id": unique_id[:5],
+        "form_id": unique_id[:5],
+        "ja": "フシギダネ",
+        "en": "bulbasaur",
+        "species_json_file": f"{unique_id[:5]}.json",
+        "pokemon_json_file": f"{unique_id[:5]}.json",
+        "form_json_file": f"{unique_id[:5]}.json",
+    }
+    record.update(fields)
+    return Pokemon(**record)
+
+
+class SerializeDefaultRowsTests(TestCase):
+    """
+    一覧のビューが使う serialize_default_rows が、DefaultSerializer と同じバイト列に描画されること。
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Pokemon.objects.bulk_create([
+            # 全部の値が埋まった行
+            make_pokemon(
+                "00001-00",
+                sub_ja="",
+                sub_en="",
+                type_first="草",
+                type_second="毒",
+                ability_01="しんりょく",
+                ability_02=None,
+                ability_03="ようりょくそ",
+                front_default_url="https://example.com/1.png",
+                front_shiny_url="https://example.com/shiny/1.png",
+                base_h=45, base_a=49, base_b=49, base_c=65, base_d=65, base_s=45, base_t=318,
+                original=True,
+                exist_generation_01=True,
+                exist_generation_08=False,
+                exist_generation_09=True,
+                national_dex=1,
+                paldea_dex=0,
+                kitakami_dex=None,
+                blueberry_dex=164,
+            ),
+            # 特性・タイプ・図鑑番号・種族値・画像が無い行 (NULL)
+            make_pokemon("00002-00", ja="ヒトカゲ", en="charmander"),
+            # 英語名が小文字以外で始まる / 全角・記号・絵文字を含む名前
+            make_pokemon(
+                "10191-01",
+                ja="ウーラオス（れんげき）",
+                en="urshifu-rapid-strike",
+                sub_ja="キョダイマックス ✨",
+                sub_en="gigantamax Ñandú",
+                type_first="格",
+                ability_01="ふかしのこぶし",
+                original=False,
+                exist_generation_08=True,
+            ),
+        ])
+
+    def test_same_json_as_default_serializer(self) -> None:
+        renderer = JSONRenderer()
+        queryset = Pokemon.objects.order_by("ja", "unique_id")
+        instances = list(queryset)
+        rows = list(queryset.values_list(*DEFAULT_ROW_FIELDS, named=True))
+        expected = DefaultSerializer(instances, many=True).data
+        actual = serialize_default_rows(rows)
+
+        self.assertEqual(len(expected), len(actual))
+        for instance, old, new in zip(instances, expected, actual):
+            with self.subTest(unique_id=instance.unique_id):
+                self.assertEqual(renderer.render(old), renderer.render(new))
+        self.assertEqual(renderer.render(expected), renderer.render(actual))
+
+    def test_plain_tuples(self) -> None:
+        # named=True でないタプルでも同じ
+        queryset = Pokemon.objects.order_by("unique_id")
+        self.assertEqual(
+            serialize_default_rows(queryset.values_list(*DEFAULT_ROW_FIELDS)),
+            serialize_default_rows(queryset.values_list(*DEFAULT_ROW_FIELDS, named=True)),
+        )
+
+
+@override_settings(POKEDEX_RESPONSE_CACHE={"BACKEND": "lru", "MAX_BYTES": 1024 * 1024})
+class ResponseCacheTests(TestCase):
+    """
+    レスポンスキャッシュから返した本文が、キャッシュなしで作った本文と同じであること
+    (next / previous のリンクに、最初にキャッシュしたリクエストのクエリが残らない)。
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Pokemon.objects.bulk_create(
+            make_pokemon(f"{index:05d}-00", ja=f"ポケモン{index:02d}", front_default_url="x", in_national=True)
+            for index in range(1, 8)
+        )
+        DataVersion.objects.create(name=response_cache.DATA_VERSION_NAME, fingerprint="test")
+
+    def setUp(self) -> None:
+        response_cache._backend = None
+        self.addCleanup(setattr, response_cache, "_backend", None)
+
+    def get(self, query: str):
+        return self.client.get(f"/api/national-pokemon/?{query}", HTTP_ACCEPT="application/json")
+
+    def test_reordered_query_hits_with_same_links(self) -> None:
+        first = self.get("h_op=gte&h_line=1&limit=2&offset=2")
+        reordered = self.get("offset=2&limit=2&h_line=1&h_op=gte")
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(reordered["X-Cache"], "HIT")
+        self.assertEqual(reordered.content, first.content)
+
+    def test_different_query_gets_own_links(self) -> None:
+        self.get("limit=2&offset=2")
+        other = self.get("limit=2&offset=2&h_line=1")
+        self.assertEqual(other["X-Cache"], "MISS")
+        self.assertIn("h_line=1", other.json()["next"])
+
+        # キャッシュなしで作った本文と同じ
+        response_cache._backend = False
+        uncached = self.get("limit=2&offset=2&h_line=1")
+        self.assertNotIn("X-Cache", uncached)
+        self.assertEqual(other.content, uncached.content)
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    ?pagination=cursor (KeysetPagination): next をたどると offset 方式と同じ行が (ja, unique_id) 順に
+    抜けも重複もなく並び、previous で 1 つ前のページに戻ること。フロントエンドのページ送りはこのリンクをそのまま使う。
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        # ja が同じ行を混ぜ、ページの境目で unique_id による並びが効くようにする
+        Pokemon.objects.bulk_create(
+            make_pokemon(f"{index:05d}-00", ja=f"ポケモン{index % 4}", front_default_url="x", in_national=True)
+            for index in range(1, 12)
+        )
+        Pokemon.objects.bulk_create([make_pokemon("00099-00", ja="ポケモン0", in_national=False)])
+
+    def setUp(self) -> None:
+        response_cache._backend = False
+        self.addCleanup(setattr, response_cache, "_backend", None)
+
+    def get(self, url: str) -> dict:
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def unique_ids(self, page: dict) -> list:
+        return [row["ids"]["unique_id"] for row in page["results"]]
+
+    def test_next_links_walk_every_row_once(self) -> None:
+        expected = self.unique_ids(self.get("/api/national-pokemon/?limit=72"))
+        self.assertEqual(
+            expected,
+            list(
+                Pokemon.objects.filter(in_national=True)
+                .order_by("ja", "unique_id")
+                .values_list("unique_id", flat=True)
+            ),
+        )
+
+        page = self.get("/api/national-pokemon/?pagination=cursor&limit=3")
+        self.assertEqual(page["count"], 11)
+        self.assertIsNone(page["previous"])
+        pages = [page]
+        while page["next"]:
+            page = self.get(page["next"])
+            # 2 ページ目以降は件数を数えない
+            self.assertIsNone(page["count"])
+            pages.append(page)
+
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 3, 2])
+        self.assertEqual([unique_id for page in pages for unique_id in self.unique_ids(page)], expected)
+
+    def test_previous_link_returns_prior_page(self) -> None:
+        first = self.get("/api/national-pokemon/?pagination=cursor&limit=4")
+        second = self.get(first["next"])
+        third = self.get(second["next"])
+
+        self.assertEqual(self.unique_ids(self.get(third["previous"])), self.unique_ids(second))
+        back = self.get(second["previous"])
+        self.assertEqual(self.unique_ids(back), self.unique_ids(first))
+        # 先頭まで戻ったら previous は無い
+        self.assertIsNone(back["previous"])
+        self.assertIsNotNone(back["next"])
+
+    def test_count_on_request(self) -> None:
+        first = self.get("/api/national-pokemon/?pagination=cursor&limit=4")
+        second = self.get(first["next"] + "&count=1")
+        self.assertEqual(second["count"], 11)
+        # count=1 は次のリンクに引き継がない
+        self.assertNotIn("count=", second["next"])
+
+    def test_invalid_cursor(self) -> None:
+        for cursor in ("not-base64!", "WyJ4IiwiYSIsImIiXQ"):  # 後者は ["x","a","b"] (向きが不正)
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    f"/api/national-pokemon/?pagination=cursor&cursor={cursor}", HTTP_ACCEPT="application/json"
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class MoveLearnersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Move.objects.create(move_id=2, name="karate-chop", ja="からてチョップ", move_json_file="00002.json")
+
+    def test_move_by_id_or_name(self) -> None:
+        for move in ("2", "karate-chop"):
+            with self.subTest(move=move):
+                response = self.client.get(f"/api/moves/{move}/learners/")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["move"]["move_id"], 2)
+
+    def test_non_ascii_digits_are_names(self) -> None:
+        # "²".isdigit() は真だが int() できない。"١" (アラビア・インド数字の 1) も ID としては扱わない
+        for move in ("²", "١"):
+            with self.subTest(move=move):
+                self.assertEqual(self.client.get(f"/api/moves/{move}/learners/").status_code, 404)
+
+
+class PokemonLearnsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        make_pokemon("00001-00", move_generation_01=[33, 1, 1]).save()
+
+    def test_generation_filter(self) -> None:
+        response = self.client.get("/api/pokemon/00001-00/learnset/?generation=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()["learnsets"]), ["1"])
+
+    def test_non_ascii_digit_generation_is_rejected(self) -> None:
+        for generation in ("²", "١", "10"):
+            with self.subTest(generation=generation):
+                response = self.client.get("/api/pokemon/00001-00/learnset/", {"generation": generation})
+                self.assertEqual(response.status_code, 400)
@@ -3,10 +3,16 @@ from .views import (
     NationalPokemonListView,
     PaldeaPokemonListView,
     GalarPokemonListView,
+    MoveLearnersView,
+    PokemonLearnsetView,
+    ResponseCacheStatsView,
 )
 
 urlpatterns = [
     path("national-pokemon/", NationalPokemonListView.as_view(), name="national-pokemon-list"),
     path("paldea-pokemon/", PaldeaPokemonListView.as_view(), name="paldea-pokemon-list"),
     path("galar-pokemon/", GalarPokemonListView.as_view(), name="galar-pokemon-list"),
+    path("cache-stats/", ResponseCacheStatsView.as_view(), name="response-cache-stats"),
+    path("moves/<str:move>/learners/", MoveLearnersView.as_view(), name="move-learners"),
+    path("pokemon/<str:unique_id>/learnset/", PokemonLearnsetView.as_view(), name="pokemon-learnset"),
 ]
@@ -1,17 +1,19 @@
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
-from pokedex.models.pokemon import Pokemon
-from .serializers import DefaultSerializer
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# ページネーション（同じ）
-from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
+from pokedex.models.move import Move, PokemonMove
 from pokedex.models.pokemon import Pokemon
-from .serializers import DefaultSerializer
+from pokedex.register import learnset
+
+from . import cache as response_cache
+from .pagination import KeysetPagination
+from .serializers import DEFAULT_ROW_FIELDS, DefaultSerializer, serialize_default_rows
 
-from rest_framework.pagination import LimitOffsetPagination
 
 class StandardResultsSetPagination(LimitOffsetPagination):
     # デフォルトで1ページあたり24件表示
@@ -27,7 +29,10 @@ class BasePokemonListView(ListAPIView):
     """
     シリアライザーによるデータ加工をそのまま利用するベースクラスです。
     - サブクラスは build_queryset() を実装して、各エンドポイント固有の条件を追加してください。
+      地方の一覧は、all_register が登録時に求めた in_<地方> 列で絞り、(ja, unique_id) 順に並べます
+      (pokedex/register/regions.py)。この形なら Pokemon.Meta.indexes の部分索引だけで読めます。
     - 本クラスで、ステータスに対する op/line のフィルタを行います。
+    - 出力は DefaultSerializer と同じ形ですが、values_list の行から serialize_default_rows で作ります。
     """
     serializer_class = DefaultSerializer
     pagination_class = StandardResultsSetPagination
@@ -48,6 +53,59 @@ class BasePokemonListView(ListAPIView):
     t_op = None
     t_line = None
 
+    @property
+    def paginator(self):
+        """
+        ?pagination=cursor なら (ja, unique_id) のカーソル方式 (KeysetPagination)、
+        それ以外は従来どおり limit / offset (StandardResultsSetPagination)。
+        """
+        if not hasattr(self, "_paginator"):
+            if self.request.query_params.get("pagination") == "cursor":
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        """
+        レスポンスキャッシュ (api/cache.py) にあれば、描画済みの本文をそのまま返す。
+        無ければ values_list の行から組み立て、finalize_response で描画した本文を保存する。
+        """
+        self.cache_key = None
+        backend = response_cache.get_backend()
+        if backend is not None and request.accepted_renderer.format == "json":
+            self.cache_key = response_cache.response_key(self, request)
+        if self.cache_key is not None:
+            cached = backend.get(self.cache_key)
+            if cached is not None:
+                body, content_type = cached
+                response = HttpResponse(body, content_type=content_type)
+                patch_vary_headers(response, ["Accept"])
+                response["X-Cache"] = "HIT"
+                return response
+
+        # DefaultSerializer と同じ形を、必要な列だけの values_list から作る (serializers.serialize_default_rows)
+        queryset = self.get_row_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_default_rows(page))
+        return Response(serialize_default_rows(queryset))
+
+    def get_row_queryset(self):
+        """
+        一覧が読むクエリセット。モデルのインスタンスは作らず、DEFAULT_ROW_FIELDS の列だけを
+        named=True の行で返す（KeysetPagination が ja / unique_id を属性で読むため）。
+        """
+        return self.filter_queryset(self.get_queryset()).values_list(*DEFAULT_ROW_FIELDS, named=True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "cache_key", None) is not None and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            response_cache.get_backend().set(self.cache_key, (response.content, response["Content-Type"]))
+            response["X-Cache"] = "MISS"
+        return response
+
     def build_queryset(self):
         """
         サブクラスで実装予定。
@@ -58,34 +116,50 @@ class BasePokemonListView(ListAPIView):
         # 1) ベースのクエリセットを取得（サブクラスで固有の条件を付与）
         qs = self.build_queryset()
 
-        # 2) 画像URLが存在するものに限定
-        qs = qs.filter(front_default_url__isnull=False).exclude(front_default_url__exact="")
-
-        # 3) ステータスごとの op / line をフィルタリング
+        # 2) ステータスごとの op / line をフィルタリング
+        #    （画像URLが無いものは、登録時に in_<地方> が False になっているので、ここでは絞らない）
         qs = self.filter_stats(qs)
 
         return qs
 
+    # "h_op", "h_line" のようなキーをループでまとめて処理できるよう、マッピングを定義
+    stat_mapping = {
+        'h': 'base_h',
+        'a': 'base_a',
+        'b': 'base_b',
+        'c': 'base_c',
+        'd': 'base_d',
+        's': 'base_s',
+        't': 'base_t',
+    }
+
     def filter_stats(self, qs):
         """
         h_op, h_line, a_op, a_line, ..., t_op, t_line
         といったクエリパラメータを解析して、フィルタに反映する。
         op が「gte」「lte」「eq」のいずれかであれば適用、それ以外や未指定の場合は無視。
         """
+        for field_name, op_value, line_int in self.stat_filters():
+            # フィールドに対するフィルタ式を組み立て
+            if op_value == "eq":
+                # 等しい (=)
+                filter_expr = {field_name: line_int}
+            else:
+                # "gte" or "lte"
+                filter_expr = {f"{field_name}__{op_value}": line_int}
+
+            qs = qs.filter(**filter_expr)
+
+        return qs
+
+    def stat_filters(self):
+        """
+        クエリパラメータのうち有効な op / line の組を (フィールド名, op, 数値) のリストで返す
+        """
         # まずはクエリパラメータから取得
         request = self.request
-        # "h_op", "h_line" のようなキーをループでまとめて処理できるよう、マッピングを定義
-        stat_mapping = {
-            'h': 'base_h',
-            'a': 'base_a',
-            'b': 'base_b',
-            'c': 'base_c',
-            'd': 'base_d',
-            's': 'base_s',
-            't': 'base_t',
-        }
-
-        for short_key, field_name in stat_mapping.items():
+        filters = []
+        for short_key, field_name in self.stat_mapping.items():
             op_key = f"{short_key}_op"     # 例: "h_op"
             line_key = f"{short_key}_line" # 例: "h_line"
 
@@ -106,46 +180,130 @@ class BasePokemonListView(ListAPIView):
             except ValueError:
                 continue
 
-            # フィールドに対するフィルタ式を組み立て
-            if op_value == "eq":
-                # 等しい (=)
-                filter_expr = {field_name: line_int}
-            else:
-                # "gte" or "lte"
-                filter_expr = {f"{field_name}__{op_value}": line_int}
-
-            qs = qs.filter(**filter_expr)
+            filters.append((field_name, op_value, line_int))
 
-        return qs
+        return filters
 
 
 # ----- 各地方のビュー -----
 
 class NationalPokemonListView(BasePokemonListView):
     def build_queryset(self):
-        # original=True かつ sub_ja に英字が含まれないポケモンを全国版として返す例
-        return Pokemon.objects.filter(
-            original=True
-        ).filter(
-            ~Q(sub_ja__iregex=r'[A-Za-z]')
-        ).order_by("ja")
+        # original=True かつ sub_ja に英字が含まれないポケモン（regions.in_national）
+        return Pokemon.objects.filter(in_national=True).order_by("ja", "unique_id")
 
 
 class GalarPokemonListView(BasePokemonListView):
     def build_queryset(self):
-        return Pokemon.objects.filter(
-            exist_generation_08=True
-        ).filter(
-            ~Q(sub_ja__icontains="メガ"),
-            ~Q(sub_ja__iregex=r'[A-Za-z]') | Q(sub_ja="gmax")
-        ).order_by("ja")
+        # 剣盾に登場し、メガシンカと英字の sub_ja (キョダイマックス以外) を除いたもの（regions.in_galar）
+        return Pokemon.objects.filter(in_galar=True).order_by("ja", "unique_id")
 
 
 class PaldeaPokemonListView(BasePokemonListView):
     def build_queryset(self):
-        return Pokemon.objects.filter(
-            exist_generation_09=True
-        ).filter(
-            ~Q(sub_ja__icontains="メガ"),
-            ~Q(sub_ja__iregex=r'[A-Za-z]')
-        ).order_by("ja")
+        # SV に登場し、メガシンカと英字の sub_ja を除いたもの（regions.in_paldea）
+        return Pokemon.objects.filter(in_paldea=True).order_by("ja", "unique_id")
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    一覧のレスポンスキャッシュの件数・ヒット・ミス・追い出しの数を返す（このプロセスの値）。
+    """
+
+    def get(self, request):
+        backend = response_cache.get_backend()
+        if backend is None:
+            return Response({"backend": None})
+        stats = backend.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["data_stamp"] = response_cache.data_stamp()
+        return Response(stats)
+
+
+# ----- 技 -----
+
+class MoveLearnersView(APIView):
+    """
+    技 (名前 または move_id) を覚える Pokemon を返す。?generation=N で世代を絞る（省略時は全世代）。
+    PokemonMove の (move, generation, pokemon_id) 索引だけで pokemon_id を引き、Pokemon をまとめて 1 回で読む。
+    """
+
+    def get(self, request, move):
+        # isdigit() は "²" や "١" でも真になるので、ASCII の数字だけを move_id とみなす
+        move_filter = {"move_id": int(move)} if move.isascii() and move.isdigit() else {"name": move}
+        move_row = Move.objects.filter(**move_filter).values("move_id", "name", "ja", "type", "generation").first()
+        if move_row is None:
+            raise NotFound(f"move '{move}' not found")
+
+        entries = PokemonMove.objects.filter(move_id=move_row["move_id"])
+        generation = request.query_params.get("generation")
+        if generation:
+            try:
+                entries = entries.filter(generation=int(generation))
+            except ValueError:
+                raise ValidationError({"generation": "must be an integer"})
+
+        learned: dict = {}
+        for pokemon_id, gen, method, level in entries.values_list("pokemon_id", "generation", "learn_method", "level"):
+            learned.setdefault(pokemon_id, []).append({"generation": gen, "method": method, "level": level})
+
+        pokemon_rows = (
+            Pokemon.objects.filter(pokemon_id__in=list(learned))
+            .order_by("unique_id")
+            .values("unique_id", "pokemon_id", "ja", "sub_ja", "original", "front_default_url")
+        )
+        results = [
+            {
+                "unique_id": row["unique_id"],
+                "ja": row["ja"],
+                "sub_ja": row["sub_ja"] or "",
+                "original": row["original"],
+                "front_url": row["front_default_url"],
+                "learned": sorted(
+                    learned[row["pokemon_id"]],
+                    key=lambda item: (item["generation"], item["method"], item["level"]),
+                ),
+            }
+            for row in pokemon_rows
+        ]
+        return Response({"move": move_row, "count": len(results), "results": results})
+
+
+class PokemonLearnsetView(APIView):
+    """
+    Pokemon 1 件の世代ごとの技一覧 (move_generation_0X の整数配列) を decode して返す。
+    ?generation=N で世代を絞る。技の名前は ?names=ja / ?names=en のときだけ Move から引いて付ける。
+    """
+
+    NAME_FIELDS = {"ja": "ja", "en": "name"}
+
+    def get(self, request, unique_id):
+        generation = request.query_params.get("generation")
+        if generation:
+            # MoveLearnersView の move と同じく、ASCII の数字だけを受け付ける（"²" は int() できない）
+            if not (generation.isascii() and generation.isdigit()) or int(generation) not in learnset.GENERATION_VERSION_GROUPS:
+                raise ValidationError({"generation": "must be one of 1-9"})
+            generations = [int(generation)]
+        else:
+            generations = list(learnset.GENERATION_VERSION_GROUPS)
+        names = request.query_params.get("names")
+        if names and names not in self.NAME_FIELDS:
+            raise ValidationError({"names": f"must be one of {', '.join(self.NAME_FIELDS)}"})
+
+        # 要求された世代の列だけを読む
+        fields = {gen: learnset.move_field(gen) for gen in generations}
+        row = Pokemon.objects.filter(unique_id=unique_id).values("unique_id", *fields.values()).first()
+        if row is None:
+            raise NotFound(f"pokemon '{unique_id}' not found")
+
+        move_names = None
+        if names:
+            move_ids = {move_id for field in fields.values() for move_id in learnset.move_ids(row[field])}
+            move_names = dict(
+                Move.objects.filter(move_id__in=move_ids).values_list("move_id", self.NAME_FIELDS[names])
+            )
+        return Response({
+            "unique_id": row["unique_id"],
+            "learnsets": {str(gen): learnset.decode(row[field], move_names) for gen, field in fields.items()},
+        })
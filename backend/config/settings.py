@@ -134,6 +134,13 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # PokeAPI のデータを保存するベースディレクトリ
 POKEAPI_OUTPUT_DIR = os.path.join(BASE_DIR, 'data')
 
+# 一覧 API のレスポンスキャッシュ (api/cache.py)
+# "lru": プロセス内 (MAX_BYTES で上限) / "django": CACHES[ALIAS] (Redis など) / None: 無効
+POKEDEX_RESPONSE_CACHE = {
+    "BACKEND": "lru",
+    "MAX_BYTES": 64 * 1024 * 1024,
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React 開発サーバーの URL
     "http://127.0.0.1:3000",  # 別の形式でのローカル URL
@@ -0,0 +1,64 @@
+# codec.py
+#
+# フェッチしたレスポンスボディを加工する CPU 処理。
+# FetchScheduler.run_cpu からプロセスプールで実行されるため、
+# Django に依存しないモジュールレベルの関数だけを置く（spawn 環境でも pickle できるように）。
+
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, List, Optional
+
+COMPRESS_LEVEL = 6
+
+
+def pretty_json(body: bytes) -> bytes:
+    """
+    従来形式のファイル (indent=4, ensure_ascii=False) に整形した bytes を返す。
+    JSON として不正なら ValueError。
+    """
+    data = json.loads(body)
+    return json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def compress_payload(body: bytes) -> bytes:
+    """
+    上流のボディをそのまま zlib 圧縮する（パック形式用）。
+    """
+    return zlib.compress(body, COMPRESS_LEVEL)
+
+
+def extract_payload_id(body: bytes) -> Optional[int]:
+    """
+    ボディを JSON として検証し、トップレベルの "id" を返す（無ければ None）。
+    JSON として不正なら ValueError。
+    """
+    data = json.loads(body)
+    if isinstance(data, dict) and isinstance(data.get("id"), int):
+        return data["id"]
+    return None
+
+
+def parse_json(body: bytes) -> Any:
+    return json.loads(body)
+
+
+def species_variety_urls(body: bytes) -> List[str]:
+    """
+    pokemon-species のボディから varieties[].pokemon.url を返す。
+    """
+    data = json.loads(body)
+    return [
+        variety["pokemon"]["url"]
+        for variety in data.get("varieties", [])
+        if variety.get("pokemon", {}).get("url")
+    ]
+
+
+def pokemon_form_urls(body: bytes) -> List[str]:
+    """
+    pokemon のボディから forms[].url を返す。
+    """
+    data = json.loads(body)
+    return [form["url"] for form in data.get("forms", []) if form.get("url")]
@@ -0,0 +1,56 @@
+# crawl.py
+#
+# all_register が実際に参照するリソースだけをたどるための依存関係の定義。
+# pokemon-species -> varieties[].pokemon (pokemon) -> forms[] (pokemon-form)
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+
+from pokedex.fetch import codec
+
+
+@dataclass(frozen=True)
+class CrawlStep:
+    """
+    依存関係をたどるクロールの 1 段。
+
+    - sub_name: 保存先のサブエンドポイント名 (data/raw/pokemon/{sub_name})
+    - resource: PokeAPI のリソース名
+    - follow: ボディから次の段の URL を取り出す関数 (最後の段は None)。
+      FetchScheduler.run_cpu に渡すので codec のモジュールレベル関数を使う
+    """
+
+    sub_name: str
+    resource: str
+    follow: Optional[Callable[[bytes], List[str]]] = None
+
+
+SPECIES_CRAWL: List[CrawlStep] = [
+    CrawlStep("pokemon-species", "pokemon-species", codec.species_variety_urls),
+    CrawlStep("pokemon-pokemon", "pokemon", codec.pokemon_form_urls),
+    CrawlStep("pokemon-form", "pokemon-form"),
+]
+
+
+def parse_id_ranges(spec: str) -> List[int]:
+    """
+    "1-151,250,386-387" のような指定を昇順の ID リストにする。不正な指定は ValueError。
+    """
+    ids: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+            if start > end:
+                raise ValueError(f"範囲の指定が逆です: {part}")
+            ids.update(range(start, end + 1))
+        else:
+            ids.add(int(part))
+    if not ids or min(ids) < 1:
+        raise ValueError(f"ID の指定が不正です: {spec}")
+    return sorted(ids)
@@ -0,0 +1,89 @@
+# endpoints.py
+#
+# PokeAPI の一覧エンドポイント。fetch_pokemon / fetch_move / fetch_games と
+# ローカルのモックサーバー (mock_server.py) が共有する。
+
+POKEAPI_BASE_URL = "https://pokeapi.co/api/v2"
+
+# Pokemon グループに属するエンドポイントをまとめる
+POKEMON_ENDPOINTS = {
+    "pokemon-pokemon": "https://pokeapi.co/api/v2/pokemon?limit=100000&offset=0",
+    "pokemon-form": "https://pokeapi.co/api/v2/pokemon-form?limit=100000&offset=0",
+    "pokemon-species": "https://pokeapi.co/api/v2/pokemon-species?limit=100000&offset=0",
+    "pokemon-abilities": "https://pokeapi.co/api/v2/ability?limit=100000&offset=0",
+    "pokemon-characteristics": "https://pokeapi.co/api/v2/characteristic?limit=100000&offset=0",
+    "pokemon-egg-group": "https://pokeapi.co/api/v2/egg-group?limit=100000&offset=0",
+    "pokemon-gender": "https://pokeapi.co/api/v2/gender?limit=100000&offset=0",
+    "pokemon-grows": "https://pokeapi.co/api/v2/growth-rate?limit=100000&offset=0",
+    "pokemon-nature": "https://pokeapi.co/api/v2/nature?limit=100000&offset=0",
+    "pokemon-habitat": "https://pokeapi.co/api/v2/pokemon-habitat?limit=100000&offset=0",
+    "pokemon-stat": "https://pokeapi.co/api/v2/stat?limit=100000&offset=0",
+    "pokemon-type": "https://pokeapi.co/api/v2/type?limit=100000&offset=0",
+}
+
+# Move グループに属するエンドポイントをまとめる
+MOVE_ENDPOINTS = {
+    "move": "https://pokeapi.co/api/v2/move?limit=100000&offset=0",
+    "move-ailment": "https://pokeapi.co/api/v2/move-ailment?limit=100000&offset=0",
+    "move-battle-style": "https://pokeapi.co/api/v2/move-battle-style?limit=100000&offset=0",
+    "move-categories": "https://pokeapi.co/api/v2/move-category?limit=100000&offset=0",
+    "move-damage-class": "https://pokeapi.co/api/v2/move-damage-class?limit=100000&offset=0",
+    "move-learn-method": "https://pokeapi.co/api/v2/move-learn-method?limit=100000&offset=0",
+}
+
+# Game グループに属するエンドポイントをまとめる
+GAME_ENDPOINTS = {
+    "generations": "https://pokeapi.co/api/v2/generation?limit=100000&offset=0",
+    "pokedexes": "https://pokeapi.co/api/v2/pokedex?limit=100000&offset=0",
+    "version": "https://pokeapi.co/api/v2/version?limit=100000&offset=0",
+    "version-group": "https://pokeapi.co/api/v2/version-group?limit=100000&offset=0",
+}
+
+# グループ名 -> エンドポイント
+ENDPOINT_GROUPS = {
+    "pokemon": POKEMON_ENDPOINTS,
+    "move": MOVE_ENDPOINTS,
+    "game": GAME_ENDPOINTS,
+}
+
+# 優先度クラス。値が小さいクラスのアイテムほど先にキューから取り出す
+PRIORITY_CLASSES = {
+    "reference": 0,  # 件数が少ない参照用データ (タイプ、バージョングループなど)
+    "normal": 1,
+    "heavy": 2,  # 件数が多く、ボディも大きいもの
+}
+
+# (グループ名, サブエンドポイント名) -> 優先度クラス。ここに無いものは "reference"
+ENDPOINT_PRIORITY_CLASSES = {
+    ("pokemon", "pokemon-species"): "normal",
+    ("pokemon", "pokemon-abilities"): "normal",
+    ("pokemon", "pokemon-characteristics"): "normal",
+    ("pokemon", "pokemon-pokemon"): "heavy",
+    ("pokemon", "pokemon-form"): "heavy",
+    ("move", "move"): "heavy",
+}
+
+
+def endpoint_priority(group_name: str, sub_name: str) -> int:
+    """
+    サブエンドポイントの優先度 (PRIORITY_CLASSES の値) を返す。
+    """
+    return PRIORITY_CLASSES[ENDPOINT_PRIORITY_CLASSES.get((group_name, sub_name), "reference")]
+
+
+def resource_name(list_endpoint: str) -> str:
+    """
+    一覧URLから PokeAPI のリソース名を返す。
+    例: https://pokeapi.co/api/v2/pokemon-form?limit=100000&offset=0 -> "pokemon-form"
+    """
+    path = list_endpoint.split("?", 1)[0].rstrip("/")
+    return path.rsplit("/", 1)[-1]
+
+
+def rebase_url(url: str, base_url: str) -> str:
+    """
+    PokeAPI の URL を別のベースURL (ローカルのモックサーバーなど) に付け替える。
+    """
+    if url.startswith(POKEAPI_BASE_URL):
+        return base_url.rstrip("/") + url[len(POKEAPI_BASE_URL):]
+    return url
@@ -0,0 +1,71 @@
+# journal.py
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Set
+
+
+class FetchJournal:
+    """
+    ステージ内で処理を終えたアイテム ID を 1 行ずつ追記するジャーナル。
+
+    形式は 1 行 1 件の "ok 00013" / "fail 00013"。同じ ID が複数回現れた場合は最後の行が有効。
+    行単位でバッファを flush するので、クラッシュや Ctrl-C で止まっても直前の行までは残る。
+
+    - resume=True なら既存の内容を読み込んでから追記する
+    - resume=False なら空にしてから書き始める（ステージを最初からやり直す）
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self.statuses: Dict[str, str] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            self.load()
+            self._drop_partial_line()
+        self._file = path.open("a" if resume else "w", encoding="utf-8", buffering=1)
+
+    @staticmethod
+    def key(id_num: int) -> str:
+        return f"{id_num:05d}"
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                # 改行で終わっていない最終行は書きかけ ("ok 000" など) なので読まない
+                if not line.endswith("\n"):
+                    break
+                parts = line.split()
+                if len(parts) == 2 and parts[0] in ("ok", "fail"):
+                    self.statuses[parts[1]] = parts[0]
+
+    def _drop_partial_line(self) -> None:
+        """
+        書きかけの最終行を切り詰める。そのまま追記すると次の行と 1 行につながって壊れる。
+        """
+        if not self.path.exists():
+            return
+        with self.path.open("r+b") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    @property
+    def completed_ids(self) -> Set[str]:
+        return {key for key, status in self.statuses.items() if status == "ok"}
+
+    def is_completed(self, id_num: int) -> bool:
+        return self.statuses.get(self.key(id_num)) == "ok"
+
+    def record(self, id_num: int, ok: bool) -> None:
+        status = "ok" if ok else "fail"
+        key = self.key(id_num)
+        self.statuses[key] = status
+        self._file.write(f"{status} {key}\n")
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
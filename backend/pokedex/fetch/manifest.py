@@ -0,0 +1,142 @@
+# manifest.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+class FetchManifest:
+    """
+    JSON 保存ディレクトリごとのバリデータ台帳。
+
+    ID (5桁ゼロ埋め文字列) ごとに ETag / Last-Modified / 内容の sha256 を保持し、
+    次回フェッチ時の条件付きリクエストと、内容が変わっていない場合の書き込みスキップに使う。
+    ステージ中の判定結果 (新規・変更・変更なし) も集計し、最後にサマリーを返す。
+
+    台帳は {json_dir}/.manifest に保存する。拡張子を .json にしないのは、
+    all_register が *.json を全件読み込むため。
+    """
+
+    FILE_NAME = ".manifest"
+
+    def __init__(self, json_dir: Path) -> None:
+        self.path = json_dir / self.FILE_NAME
+        self.entries: Dict[str, Dict[str, Optional[str]]] = {}
+        self.new_ids: Set[str] = set()
+        self.changed_ids: Set[str] = set()
+        self.unchanged_ids: Set[str] = set()
+        self.removed_ids: Set[str] = set()
+        self.load()
+
+    @staticmethod
+    def key(id_num: int) -> str:
+        return f"{id_num:05d}"
+
+    @staticmethod
+    def content_hash(payload: bytes) -> str:
+        return hashlib.sha256(payload).hexdigest()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            # 壊れた台帳は捨てて全件を取り直す
+            self.entries = {}
+
+    def save(self) -> None:
+        """
+        一時ファイルに書いてから置き換える（途中で落ちても台帳が壊れないように）。
+        """
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, id_num: int) -> Optional[Dict[str, Optional[str]]]:
+        return self.entries.get(self.key(id_num))
+
+    def conditional_headers(self, id_num: int) -> Dict[str, str]:
+        """
+        前回のバリデータから If-None-Match / If-Modified-Since ヘッダーを組み立てる。
+        """
+        entry = self.get(id_num)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, id_num: int, sha256: str) -> bool:
+        entry = self.get(id_num)
+        return bool(entry) and entry.get("sha256") == sha256
+
+    def mark_not_modified(self, id_num: int) -> None:
+        """304 Not Modified を受け取った場合。"""
+        self.unchanged_ids.add(self.key(id_num))
+
+    def record(
+        self,
+        id_num: int,
+        sha256: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> bool:
+        """
+        200 応答の内容を台帳に記録する。内容が前回から変わっていれば True を返す。
+        """
+        key = self.key(id_num)
+        previous = self.entries.get(key)
+        if previous is None:
+            self.new_ids.add(key)
+            changed = True
+        elif previous.get("sha256") != sha256:
+            self.changed_ids.add(key)
+            changed = True
+        else:
+            self.unchanged_ids.add(key)
+            changed = False
+
+        self.entries[key] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": sha256,
+        }
+        return changed
+
+    def prune(self, listed_ids: Iterable[int]) -> List[str]:
+        """
+        一覧に存在しなくなった ID を台帳から外し、その ID のリストを返す。
+        """
+        listed_keys = {self.key(id_num) for id_num in listed_ids}
+        removed = sorted(set(self.entries) - listed_keys)
+        for key in removed:
+            del self.entries[key]
+        self.removed_ids.update(removed)
+        return removed
+
+    def summary(self) -> str:
+        return (
+            f"新規 {len(self.new_ids)} 件 / 変更 {len(self.changed_ids)} 件 / "
+            f"変更なし {len(self.unchanged_ids)} 件 / 削除 {len(self.removed_ids)} 件"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        構造化ログ用に、新規・変更・削除の ID と件数を返す（変更なしは件数のみ）。
+        """
+        return {
+            "new": sorted(self.new_ids),
+            "changed": sorted(self.changed_ids),
+            "removed": sorted(self.removed_ids),
+            "unchanged_count": len(self.unchanged_ids),
+        }
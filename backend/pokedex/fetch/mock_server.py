@@ -0,0 +1,262 @@
+# mock_server.py
+#
+# PokeAPI のローカル代用サーバー。フェッチャーの計測・回帰確認を pokeapi.co に繋がずに行うためのもの。
+# Django には依存しない（ベンチマークからは別プロセスとして起動する）。
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from pokedex.fetch.endpoints import ENDPOINT_GROUPS, POKEAPI_BASE_URL, resource_name
+from pokedex.fetch.store import PackReader, PackStore, resolve_layout
+
+
+@dataclass
+class MockConfig:
+    """
+    モックサーバーの挙動。
+
+    - latency / jitter: 1 リクエストごとの待ち時間 (秒)。jitter は一様分布の幅
+    - error_rate: 500/503 を返す確率
+    - rate_429: 429 (Retry-After 付き) を返す確率
+    - items: 合成データの 1 リソースあたりの件数 (fixtures に無いリソースに使う)
+    - moves: 合成 pokemon の moves 配列の長さ（ペイロードの大きさの調整用）
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8765
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    items: int = 200
+    moves: int = 80
+    seed: int = 0
+    fixtures: Optional[Path] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v2"
+
+
+class MockPokeAPI:
+    """
+    一覧エンドポイント (/api/v2/{resource}?limit=&offset=) と
+    個別リソース (/api/v2/{resource}/{id}/) を返す aiohttp アプリケーション。
+
+    fixtures (data/raw と同じ構成) があればそこから、無いリソースは合成データを返す。
+    ボディ中の https://pokeapi.co/api/v2 はモックの URL に書き換える。
+    ETag / If-None-Match にも対応する。
+    """
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        # resource -> {id: body}
+        self.bodies: Dict[str, Dict[int, bytes]] = {}
+        self.counters: Dict[str, int] = {"requests": 0, "errors": 0, "throttled": 0, "not_modified": 0}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.load()
+
+    # --------------------------------------------------
+    # データの準備
+    # --------------------------------------------------
+    def load(self) -> None:
+        for group_name, endpoints in ENDPOINT_GROUPS.items():
+            for sub_name, list_endpoint in endpoints.items():
+                resource = resource_name(list_endpoint)
+                bodies = self.load_fixtures(group_name, sub_name)
+                if not bodies:
+                    bodies = {
+                        id_num: self.synthesize(resource, id_num)
+                        for id_num in range(1, self.config.items + 1)
+                    }
+                self.bodies[resource] = bodies
+
+    def load_fixtures(self, group_name: str, sub_name: str) -> Dict[int, bytes]:
+        if self.config.fixtures is None:
+            return {}
+        json_dir = self.config.fixtures / group_name / sub_name
+        if not json_dir.is_dir():
+            return {}
+
+        bodies: Dict[int, bytes] = {}
+        if resolve_layout(json_dir) == PackStore.format_name:
+            with PackReader(json_dir) as reader:
+                for id_num in reader.ids():
+                    bodies[id_num] = self.rebase(reader.get_bytes(id_num))
+            return bodies
+
+        for json_file in json_dir.glob("*.json"):
+            try:
+                bodies[int(json_file.stem)] = self.rebase(json_file.read_bytes())
+            except ValueError:
+                continue
+        return bodies
+
+    def rebase(self, body: bytes) -> bytes:
+        return body.replace(POKEAPI_BASE_URL.encode(), self.config.base_url.encode())
+
+    def synthesize(self, resource: str, id_num: int) -> bytes:
+        """
+        リソースごとに、all_register が参照する形をなぞった合成データを作る。
+        species -> varieties(pokemon) -> forms(pokemon-form) の参照もたどれるようにする。
+        """
+        base = self.config.base_url
+        rnd = self.random
+        name = f"{resource}-{id_num}"
+        data: dict
+        if resource == "pokemon-species":
+            data = {
+                "id": id_num,
+                "name": name,
+                "names": [{"language": {"name": "ja-Hrkt"}, "name": f"ポケモン{id_num}"}],
+                "pokedex_numbers": [{"entry_number": id_num, "pokedex": {"name": "national"}}],
+                "varieties": [
+                    {"is_default": True, "pokemon": {"name": name, "url": f"{base}/pokemon/{id_num}/"}}
+                ],
+            }
+        elif resource == "pokemon":
+            data = {
+                "id": id_num,
+                "name": name,
+                "forms": [{"name": name, "url": f"{base}/pokemon-form/{id_num}/"}],
+                "types": [{"slot": 1, "type": {"name": "normal"}}],
+                "abilities": [{"slot": 1, "ability": {"name": "run-away"}}],
+                "stats": [{"base_stat": rnd.randint(20, 150)} for _ in range(6)],
+                "sprites": {"front_default": f"https://example.invalid/{id_num}.png"},
+                "moves": [
+                    {
+                        "move": {"name": f"move-{move_id}", "url": f"{base}/move/{move_id}/"},
+                        "version_group_details": [
+                            {
+                                "level_learned_at": rnd.randint(0, 60),
+                                "move_learn_method": {"name": "level-up"},
+                                "version_group": {"name": "scarlet-violet"},
+                            }
+                        ],
+                    }
+                    for move_id in rnd.sample(range(1, 1000), k=min(self.config.moves, 999))
+                ],
+            }
+        elif resource == "pokemon-form":
+            data = {
+                "id": id_num,
+                "name": name,
+                "form_name": "",
+                "form_names": [],
+                "sprites": {"front_default": f"https://example.invalid/form-{id_num}.png"},
+            }
+        else:
+            data = {
+                "id": id_num,
+                "name": name,
+                "names": [{"language": {"name": "ja-Hrkt"}, "name": name}],
+            }
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    # --------------------------------------------------
+    # ハンドラ
+    # --------------------------------------------------
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/__stats__", self.handle_stats)
+        app.router.add_get("/api/v2/{resource}", self.handle_list)
+        app.router.add_get("/api/v2/{resource}/", self.handle_list)
+        app.router.add_get("/api/v2/{resource}/{id_num:\\d+}/", self.handle_item)
+        app.router.add_get("/api/v2/{resource}/{id_num:\\d+}", self.handle_item)
+        return app
+
+    async def simulate(self) -> Optional[web.Response]:
+        """
+        待ち時間を入れ、確率に応じて 429 / 5xx を返す。正常に進めてよい場合は None。
+        """
+        self.counters["requests"] += 1
+        delay = self.config.latency + self.random.uniform(0, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.config.rate_429:
+            self.counters["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": f"{self.config.retry_after:g}"})
+        if roll < self.config.rate_429 + self.config.error_rate:
+            self.counters["errors"] += 1
+            return web.Response(status=self.random.choice([500, 503]))
+        return None
+
+    async def handle_list(self, request: web.Request) -> web.StreamResponse:
+        resource = request.match_info["resource"]
+        bodies = self.bodies.get(resource)
+        if bodies is None:
+            raise web.HTTPNotFound()
+        fault = await self.simulate()
+        if fault is not None:
+            return fault
+
+        limit, offset = self.paging(request)
+        ids = sorted(bodies)
+        page = ids[offset:offset + limit]
+        base = self.config.base_url
+        return web.json_response({
+            "count": len(ids),
+            "next": None,
+            "previous": None,
+            "results": [
+                {"name": f"{resource}-{id_num}", "url": f"{base}/{resource}/{id_num}/"}
+                for id_num in page
+            ],
+        })
+
+    async def handle_item(self, request: web.Request) -> web.StreamResponse:
+        resource = request.match_info["resource"]
+        body = self.bodies.get(resource, {}).get(int(request.match_info["id_num"]))
+        if body is None:
+            raise web.HTTPNotFound()
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            fault = await self.simulate()
+        finally:
+            self.in_flight -= 1
+        if fault is not None:
+            return fault
+
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.counters["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.counters, "peak_in_flight": self.peak_in_flight})
+
+    @staticmethod
+    def paging(request: web.Request) -> Tuple[int, int]:
+        try:
+            limit = int(request.query.get("limit", "20"))
+            offset = int(request.query.get("offset", "0"))
+        except ValueError:
+            raise web.HTTPBadRequest()
+        return max(0, limit), max(0, offset)
+
+    def resources(self) -> List[str]:
+        return sorted(self.bodies)
+
+
+def run_mock_server(config: MockConfig) -> None:
+    """
+    モックサーバーを起動し、終了されるまでブロックする。
+    """
+    server = MockPokeAPI(config)
+    web.run_app(server.create_app(), host=config.host, port=config.port, print=None)
@@ -0,0 +1,186 @@
+# retry.py
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, FrozenSet, List, Optional
+
+
+@dataclass
+class RetryPolicy:
+    """
+    一時的なエラー (429 / 5xx / 接続エラー / タイムアウト) に対する再試行の方針。
+    待ち時間は full jitter 付きの指数バックオフで、Retry-After があればそちらを優先する。
+    """
+
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 60.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        attempt 回目 (0 始まり) の失敗の後に待つ秒数を返す。
+        """
+        hinted = parse_retry_after(retry_after)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After ヘッダー (秒数 もしくは HTTP-date) を秒数に変換する。解釈できなければ None。
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (加算増・乗算減) で同時実行数を調整するリミッター。
+
+    - 成功かつレイテンシが latency_target 以下なら、limit を 1/limit ずつ増やす（おおよそ 1 往復で +1）
+    - 失敗 (429 / 5xx / 接続エラー) もしくはレイテンシ超過なら limit を decrease_factor 倍に減らす
+    - 同じ混雑で何度も減らさないよう、減少は cooldown 秒に 1 回まで
+
+    Usage:
+        async with limiter:
+            ...  # 1 リクエスト
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_target: float = 2.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.limit: float = float(max_limit)
+        self.lowest_limit: float = self.limit
+        self.decreases: int = 0
+
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def __aenter__(self) -> AdaptiveLimiter:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.current_limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self._decrease()
+            return
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def on_failure(self) -> None:
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self.lowest_limit = min(self.lowest_limit, self.limit)
+        self.decreases += 1
+
+
+@dataclass
+class EndpointStats:
+    """
+    サブエンドポイント単位のリクエスト統計。
+    アイテムごとにはログを書かず、ここでメモリ上に集計してステージ終了時に 1 レコードだけ書き出す。
+    """
+
+    name: str
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0
+    bytes: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)
+
+    def record_attempt(self, status: Optional[int], latency: float, nbytes: int = 0) -> None:
+        """
+        1 回の HTTP 試行を記録する。接続エラーなどでステータスが無い場合は status=None。
+        """
+        self.attempts += 1
+        self.bytes += nbytes
+        self.statuses[status if status is not None else "error"] += 1
+        self.latencies.append(latency)
+
+    def percentile(self, ratio: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> str:
+        statuses = ", ".join(f"{key}={count}" for key, count in sorted(self.statuses.items(), key=str))
+        return (
+            f"requests={self.requests} attempts={self.attempts} retries={self.retries} "
+            f"failures={self.failures} status=[{statuses}] "
+            f"latency p50={self.percentile(0.5) * 1000:.0f}ms "
+            f"p95={self.percentile(0.95) * 1000:.0f}ms "
+            f"max={max(self.latencies, default=0.0) * 1000:.0f}ms"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        構造化ログ (JSON Lines) 用の集計値。レイテンシはミリ秒。
+        """
+        return {
+            "endpoint": self.name,
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes": self.bytes,
+            "status": {str(key): count for key, count in self.statuses.items()},
+            "latency_ms": {
+                "p50": round(self.percentile(0.5) * 1000, 1),
+                "p95": round(self.percentile(0.95) * 1000, 1),
+                "p99": round(self.percentile(0.99) * 1000, 1),
+                "max": round(max(self.latencies, default=0.0) * 1000, 1),
+            },
+        }
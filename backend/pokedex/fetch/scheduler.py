@@ -0,0 +1,271 @@
+# scheduler.py
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+import aiohttp
+
+from pokedex.fetch.retry import AdaptiveLimiter, EndpointStats, RetryPolicy
+
+
+@dataclass
+class FetchResponse:
+    """
+    FetchScheduler.fetch の結果。ボディは読み切った bytes で返す。
+    """
+
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+
+class LoopLagMonitor:
+    """
+    イベントループの遅延 (event-loop lag) を計測する。
+    interval 秒ごとに sleep し、予定より何秒遅れて起きたかをサンプルとして記録する。
+    ループ上で重い同期処理 (JSON のデコードなど) が走ると、この値が大きくなる。
+    """
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "event-loop lag: no samples"
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        mean = sum(ordered) / len(ordered)
+        return (
+            f"event-loop lag: mean={mean * 1000:.1f}ms p99={p99 * 1000:.1f}ms "
+            f"max={ordered[-1] * 1000:.1f}ms (samples={len(ordered)})"
+        )
+
+
+class FetchScheduler:
+    """
+    全グループ・全サブエンドポイントのフェッチを 1 本のキューで捌くスケジューラ。
+
+    - aiohttp.ClientSession を 1 つだけ持ち、keep-alive のコネクションプールを共有する
+    - ワーカー数 = グローバルな同時実行数の上限 (concurrency)
+    - キューは優先度付き。priority の値が小さいジョブから取り出し、同じ優先度なら投入順
+    - TCPConnector の limit_per_host でホストごとの同時接続数を制限 (per_host)
+    - fetch() は RetryPolicy に従って再試行し、AdaptiveLimiter (AIMD) で実際の同時実行数を絞る
+    - run_cpu() で JSON の整形や圧縮などの CPU 処理をプロセスプールに逃がす (decode_workers。0 ならその場で実行)
+    - LoopLagMonitor でイベントループの遅延を計測する
+    - 完了件数と経過時間からスループット (items/s) を算出する
+
+    Usage:
+        async with FetchScheduler(concurrency=16, per_host=8) as scheduler:
+            future = scheduler.submit(self.fetch_and_save, item, stage)
+            result = await future
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        per_host: int,
+        timeout: float = 60.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        decode_workers: int = 0,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency は 1 以上を指定してください。")
+        if per_host < 1:
+            raise ValueError("per_host は 1 以上を指定してください。")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.decode_workers = max(0, decode_workers)
+        self.lag_monitor = LoopLagMonitor()
+
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.completed: int = 0
+        self.failed: int = 0
+        self.elapsed: float = 0.0
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._lag_task: Optional[asyncio.Task] = None
+        self._cpu_pool: Optional[ProcessPoolExecutor] = None
+        self._started_at: float = 0.0
+
+    async def __aenter__(self) -> FetchScheduler:
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self.limiter = AdaptiveLimiter(max_limit=self.concurrency)
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+        if self.decode_workers:
+            # fork だとイベントループや aiohttp のソケット、ログのスレッドを抱えたまま複製されるので spawn で起こす
+            self._cpu_pool = ProcessPoolExecutor(
+                max_workers=self.decode_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self._lag_task = asyncio.create_task(self.lag_monitor.run())
+        self._started_at = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.elapsed = time.perf_counter() - self._started_at
+        for worker in self._workers:
+            worker.cancel()
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._workers.append(self._lag_task)
+            self._lag_task = None
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+            self._cpu_pool = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def submit(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: int = 0,
+    ) -> asyncio.Future:
+        """
+        ジョブをキューに積み、結果を受け取る Future を返す。
+        func は func(*args) の形で呼び出される。HTTP リクエストは fetch() を使うこと。
+        priority が小さいジョブほど先に実行される (endpoints.PRIORITY_CLASSES を参照)。
+        """
+        if self._queue is None:
+            raise RuntimeError("FetchScheduler は async with の中で使用してください。")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), func, args, future))
+        return future
+
+    async def _worker(self) -> None:
+        """
+        キューからジョブを取り出して実行し続けるワーカー。
+        """
+        assert self._queue is not None
+        while True:
+            _, _, func, args, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                result = await func(*args)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as exc:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                self.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    async def run_cpu(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        CPU 処理をプロセスプールで実行する。decode_workers=0 の場合はその場（イベントループ上）で実行する。
+        func はモジュールレベルの関数であること (pokedex.fetch.codec を参照)。
+        """
+        if self._cpu_pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._cpu_pool, func, *args)
+
+    async def fetch(
+        self,
+        url: str,
+        stats: EndpointStats,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> FetchResponse:
+        """
+        GET を再試行付きで実行する。
+
+        - 429 / 5xx / 接続エラー / タイムアウトは RetryPolicy に従って待ってから再試行
+        - 待機中はリミッターの枠を手放す（他のリクエストを止めない）
+        - 再試行しきれなかった場合や 4xx は aiohttp.ClientError を送出する
+        - 304 はエラーにせずそのまま返す
+        """
+        assert self.session is not None and self.limiter is not None
+        policy = self.retry_policy
+        stats.requests += 1
+
+        for attempt in range(policy.max_retries + 1):
+            is_last = attempt == policy.max_retries
+            retry_after: Optional[str] = None
+            async with self.limiter:
+                started = time.perf_counter()
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        body = await response.read()
+                        latency = time.perf_counter() - started
+                        stats.record_attempt(response.status, latency, len(body))
+
+                        if response.status in policy.retry_statuses:
+                            self.limiter.on_failure()
+                            if is_last:
+                                response.raise_for_status()
+                            retry_after = response.headers.get("Retry-After")
+                        else:
+                            self.limiter.on_success(latency)
+                            if response.status != 304:
+                                response.raise_for_status()
+                            return FetchResponse(
+                                status=response.status,
+                                headers=response.headers,
+                                body=body,
+                            )
+                except aiohttp.ClientResponseError:
+                    stats.failures += 1
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                    stats.record_attempt(None, time.perf_counter() - started)
+                    self.limiter.on_failure()
+                    if is_last:
+                        stats.failures += 1
+                        if isinstance(exc, asyncio.TimeoutError):
+                            raise aiohttp.ServerTimeoutError(f"タイムアウト: {url}") from exc
+                        raise
+
+            stats.retries += 1
+            await asyncio.sleep(policy.backoff(attempt, retry_after))
+
+        raise AssertionError("unreachable")
+
+    def throughput(self) -> Tuple[int, float, float]:
+        """
+        (処理件数, 経過秒数, items/s) を返す。
+        """
+        elapsed = self.elapsed or (time.perf_counter() - self._started_at)
+        total = self.completed + self.failed
+        rate = total / elapsed if elapsed > 0 else 0.0
+        return total, elapsed, rate
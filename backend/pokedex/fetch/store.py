@@ -0,0 +1,374 @@
+# store.py
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+from pokedex.fetch import codec
+
+
+# 最後にそのディレクトリへ書き込んだ保存形式 ("files" / "pack") を記録するファイル。
+# pack_raw_data は既定で *.json を残すので、両方の形式が並ぶことがある。読み手 (raw_format="auto") は
+# この記録に従い、記録が無いときだけ pack.seg の有無で決める（古いパックを読み続けないように）
+LAYOUT_FILE_NAME = ".storage"
+
+
+class JsonFileStore:
+    """
+    従来の保存形式: 1 アイテム 1 ファイル ({json_dir}/00013.json)。
+    既定では indent=4 に整形して保存し、raw=True なら上流のボディをそのまま保存する。
+
+    書き込みは encoder(raw) で得た関数でボディを変換してから write_encoded に渡す。
+    encoder はプロセスプールで実行できるモジュールレベルの関数 (None なら変換不要)。
+    """
+
+    format_name = "files"
+
+    def __init__(self, json_dir: Path) -> None:
+        self.json_dir = json_dir
+        json_dir.mkdir(parents=True, exist_ok=True)
+        mark_layout(json_dir, self.format_name)
+
+    def path_for(self, id_num: int) -> Path:
+        return self.json_dir / f"{id_num:05d}.json"
+
+    def exists(self, id_num: int) -> bool:
+        return self.path_for(id_num).exists()
+
+    def encoder(self, raw: bool) -> Optional[Callable[[bytes], bytes]]:
+        return None if raw else codec.pretty_json
+
+    async def write_encoded(self, id_num: int, encoded: bytes) -> None:
+        """
+        一時ファイル ({ID}.json.tmp) に書いてから置き換える。途中で落ちても書きかけの .json が残らず、
+        exists() や台帳 (--resume, 304 の判定) が壊れたファイルを取得済みとみなさない。
+        """
+        path = self.path_for(id_num)
+        tmp_path = path.with_name(path.name + ".tmp")
+        async with aiofiles.open(tmp_path, "wb") as afp:
+            await afp.write(encoded)
+        await aiofiles.os.replace(tmp_path, path)
+
+    async def read_bytes(self, id_num: int) -> Optional[bytes]:
+        """
+        保存済みの JSON を bytes で返す。無ければ None。
+        """
+        path = self.path_for(id_num)
+        if not path.exists():
+            return None
+        async with aiofiles.open(path, "rb") as afp:
+            return await afp.read()
+
+    def remove(self, id_num: int) -> None:
+        path = self.path_for(id_num)
+        if path.exists():
+            path.unlink()
+
+    def close(self) -> None:
+        pass
+
+
+class PackStore:
+    """
+    サブエンドポイントごとの追記専用パック形式。
+
+    - {json_dir}/pack.seg : レコードを追記していくセグメントファイル
+        1 レコード = ヘッダー struct("<II") (ID, 圧縮後の長さ) + zlib 圧縮したコンパクト JSON
+        長さ 0 のレコードは削除 (tombstone)
+    - {json_dir}/pack.idx : 先頭 8 バイトのマジックに続き、struct("<IQI") (ID, オフセット, 長さ) を追記
+        同じ ID が複数あれば最後のエントリが有効
+
+    インデックスはセグメントから再構築できるキャッシュで、整合しない場合は開くときに作り直す。
+    読み出しは PackReader (mmap) を使う。
+    フェッチ時は上流のボディ (コンパクト JSON) を再エンコードせずにそのまま圧縮して格納する。
+    """
+
+    format_name = "pack"
+
+    SEGMENT_NAME = "pack.seg"
+    INDEX_NAME = "pack.idx"
+    INDEX_MAGIC = b"PKIDX1\x00\x00"
+    RECORD_HEADER = struct.Struct("<II")
+    INDEX_ENTRY = struct.Struct("<IQI")
+    # 無効なバイトがこの割合を超えたら close 時に詰め直す
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, json_dir: Path) -> None:
+        self.json_dir = json_dir
+        json_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_path = json_dir / self.SEGMENT_NAME
+        self.index_path = json_dir / self.INDEX_NAME
+
+        # 書き込み側は開くたびにセグメントを走査し、書きかけの末尾を切り詰めてからインデックスを作り直す
+        self.entries: Dict[int, Tuple[int, int]] = {}
+        if self.segment_path.exists():
+            self.entries, valid_end = _scan_segment(self.segment_path)
+            if valid_end < self.segment_path.stat().st_size:
+                os.truncate(self.segment_path, valid_end)
+        write_pack_index(json_dir, self.entries)
+        mark_layout(json_dir, self.format_name)
+        self._segment = self.segment_path.open("ab")
+        self._index = self.index_path.open("ab")
+
+    @classmethod
+    def exists_in(cls, json_dir: Path) -> bool:
+        return (json_dir / cls.SEGMENT_NAME).exists()
+
+    def exists(self, id_num: int) -> bool:
+        return id_num in self.entries
+
+    def encoder(self, raw: bool) -> Optional[Callable[[bytes], bytes]]:
+        return codec.compress_payload
+
+    async def write_encoded(self, id_num: int, encoded: bytes) -> None:
+        self.append(id_num, encoded)
+
+    async def read_bytes(self, id_num: int) -> Optional[bytes]:
+        """
+        格納済みのペイロード (コンパクト JSON の bytes) を返す。無ければ None。
+        書き込み中のセグメントを flush してから、別のハンドルで該当レコードだけを読む。
+        """
+        entry = self.entries.get(id_num)
+        if entry is None:
+            return None
+        offset, length = entry
+        self._segment.flush()
+        with self.segment_path.open("rb") as f:
+            f.seek(offset + self.RECORD_HEADER.size)
+            return zlib.decompress(f.read(length))
+
+    def put(self, id_num: int, data: Any) -> None:
+        """
+        データをコンパクト JSON にして圧縮し、追記する。
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.append(id_num, codec.compress_payload(payload))
+
+    def append(self, id_num: int, compressed: bytes) -> None:
+        """
+        圧縮済みのペイロードをセグメントに追記し、インデックスに登録する。
+        """
+        offset = self._segment.tell()
+        self._segment.write(self.RECORD_HEADER.pack(id_num, len(compressed)))
+        self._segment.write(compressed)
+        self._index.write(self.INDEX_ENTRY.pack(id_num, offset, len(compressed)))
+        if compressed:
+            self.entries[id_num] = (offset, len(compressed))
+        else:
+            self.entries.pop(id_num, None)
+
+    def remove(self, id_num: int) -> None:
+        if id_num in self.entries:
+            self.append(id_num, b"")
+
+    def close(self) -> None:
+        if self._segment.closed:
+            return
+        self._segment.close()
+        self._index.close()
+        live_bytes = sum(self.RECORD_HEADER.size + length for _, length in self.entries.values())
+        total_bytes = self.segment_path.stat().st_size
+        if total_bytes and (total_bytes - live_bytes) / total_bytes > self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        有効なレコードだけを ID 順に新しいセグメントへ詰め直し、インデックスを書き直す。
+        """
+        tmp_segment = self.segment_path.with_name(self.SEGMENT_NAME + ".tmp")
+        new_entries: Dict[int, Tuple[int, int]] = {}
+        with PackReader(self.json_dir) as reader, tmp_segment.open("wb") as out:
+            for id_num in reader.ids():
+                compressed = reader.get_compressed(id_num)
+                offset = out.tell()
+                out.write(self.RECORD_HEADER.pack(id_num, len(compressed)))
+                out.write(compressed)
+                new_entries[id_num] = (offset, len(compressed))
+        os.replace(tmp_segment, self.segment_path)
+        write_pack_index(self.json_dir, new_entries)
+        self.entries = new_entries
+
+
+def mark_layout(json_dir: Path, format_name: str) -> None:
+    """
+    json_dir に最後に書き込んだ保存形式を記録する（同じなら書き直さない）。
+    """
+    path = json_dir / LAYOUT_FILE_NAME
+    if read_layout(json_dir) != format_name:
+        path.write_text(format_name + "\n", encoding="utf-8")
+
+
+def read_layout(json_dir: Path) -> Optional[str]:
+    try:
+        name = (json_dir / LAYOUT_FILE_NAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return name if name in (JsonFileStore.format_name, PackStore.format_name) else None
+
+
+def resolve_layout(json_dir: Path, raw_format: str = "auto") -> str:
+    """
+    読み込む保存形式 ("files" / "pack") を返す。raw_format が "auto" なら、最後に書き込んだ形式
+    (mark_layout の記録)、記録が無ければ pack.seg があるかで決める。
+    """
+    if raw_format != "auto":
+        return raw_format
+    layout = read_layout(json_dir)
+    if layout is not None:
+        return layout
+    return PackStore.format_name if PackStore.exists_in(json_dir) else JsonFileStore.format_name
+
+
+def write_pack_index(json_dir: Path, entries: Dict[int, Tuple[int, int]]) -> None:
+    index_path = json_dir / PackStore.INDEX_NAME
+    tmp_index = index_path.with_name(PackStore.INDEX_NAME + ".tmp")
+    with tmp_index.open("wb") as f:
+        f.write(PackStore.INDEX_MAGIC)
+        for id_num in sorted(entries):
+            offset, length = entries[id_num]
+            f.write(PackStore.INDEX_ENTRY.pack(id_num, offset, length))
+    os.replace(tmp_index, index_path)
+
+
+def load_pack_index(json_dir: Path) -> Dict[int, Tuple[int, int]]:
+    """
+    pack.idx を読み込み {ID: (オフセット, 長さ)} を返す。
+    インデックスが無い・壊れている・セグメントと食い違う場合はセグメントを走査して求める。
+    """
+    segment_path = json_dir / PackStore.SEGMENT_NAME
+    index_path = json_dir / PackStore.INDEX_NAME
+    if not segment_path.exists():
+        return {}
+
+    entries = _read_index_file(index_path)
+    if entries is not None and _index_matches_segment(segment_path, entries):
+        return entries
+
+    entries, _ = _scan_segment(segment_path)
+    return entries
+
+
+def _read_index_file(index_path: Path) -> Optional[Dict[int, Tuple[int, int]]]:
+    if not index_path.exists():
+        return None
+    raw = index_path.read_bytes()
+    if not raw.startswith(PackStore.INDEX_MAGIC):
+        return None
+    entries: Dict[int, Tuple[int, int]] = {}
+    body = raw[len(PackStore.INDEX_MAGIC):]
+    if len(body) % PackStore.INDEX_ENTRY.size:
+        return None  # 書きかけのエントリがある
+    for id_num, offset, length in PackStore.INDEX_ENTRY.iter_unpack(body):
+        if length:
+            entries[id_num] = (offset, length)
+        else:
+            entries.pop(id_num, None)
+    return entries
+
+
+def _index_matches_segment(segment_path: Path, entries: Dict[int, Tuple[int, int]]) -> bool:
+    size = segment_path.stat().st_size
+    if not entries:
+        return True
+    if size == 0:
+        return False
+    header = PackStore.RECORD_HEADER
+    with segment_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for id_num, (offset, length) in entries.items():
+            if offset + header.size + length > size:
+                return False
+            if header.unpack_from(mm, offset) != (id_num, length):
+                return False
+    return True
+
+
+def _scan_segment(segment_path: Path) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    """
+    セグメントを先頭から走査して ({ID: (オフセット, 長さ)}, 有効な末尾のオフセット) を返す。
+    """
+    entries: Dict[int, Tuple[int, int]] = {}
+    size = segment_path.stat().st_size
+    if size == 0:
+        return entries, 0
+    offset = 0
+    header = PackStore.RECORD_HEADER
+    with segment_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while offset + header.size <= size:
+            id_num, length = header.unpack_from(mm, offset)
+            if offset + header.size + length > size:
+                break  # 書きかけの末尾レコード
+            if length:
+                entries[id_num] = (offset, length)
+            else:
+                entries.pop(id_num, None)
+            offset += header.size + length
+    return entries, offset
+
+
+class PackReader:
+    """
+    PackStore で書いたパックを mmap で読み出すリーダー。
+
+    Usage:
+        with PackReader(json_dir) as reader:
+            data = reader.load(13)
+            for id_num, data in reader.items():
+                ...
+    """
+
+    def __init__(self, json_dir: Path) -> None:
+        self.json_dir = json_dir
+        self.entries = load_pack_index(json_dir)
+        segment_path = json_dir / PackStore.SEGMENT_NAME
+        self._file = segment_path.open("rb")
+        size = segment_path.stat().st_size
+        self._mm: Optional[mmap.mmap] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+
+    def __enter__(self) -> PackReader:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, id_num: int) -> bool:
+        return id_num in self.entries
+
+    def ids(self) -> List[int]:
+        return sorted(self.entries)
+
+    def get_compressed(self, id_num: int) -> bytes:
+        offset, length = self.entries[id_num]
+        start = offset + PackStore.RECORD_HEADER.size
+        assert self._mm is not None
+        return self._mm[start:start + length]
+
+    def get_bytes(self, id_num: int) -> bytes:
+        """ID のペイロード (コンパクト JSON の bytes) を返す。存在しなければ KeyError。"""
+        return zlib.decompress(self.get_compressed(id_num))
+
+    def load(self, id_num: int) -> Any:
+        return json.loads(self.get_bytes(id_num))
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        for id_num in self.ids():
+            yield id_num, self.load(id_num)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
@@ -0,0 +1,113 @@
+# all_extract.py
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict
+
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from pokedex.register import extract, loader
+
+# 抽出するサブエンドポイント (all_register が読むもの)
+EXTRACT_SOURCES = ["pokemon-species", "pokemon-pokemon", "pokemon-form"]
+
+
+class Command(BaseCommand):
+    """
+    data/raw/pokemon/* を、all_register が読むフィールドだけの行区切りファイル
+    data/extract/pokemon/<サブエンドポイント>.jsonl に抽出するコマンド (fetch と register の間のステージ)。
+
+    前回の抽出から変わった生データ (JSON ファイルのサイズ・更新時刻、パックのペイロードの CRC32) だけを
+    読み直すので、生データが変わっていなければ stat を取るだけで終わる。
+    all_register は既定でこのステージを実行してから抽出ファイルを読む。
+
+    Usage:
+      python manage.py all_extract
+      python manage.py all_extract --rebuild
+    """
+
+    help = "Extract the fields all_register needs from data/raw/pokemon/* into compact JSON-lines files, incrementally."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--raw-format",
+            choices=["auto", "files", "pack"],
+            default="auto",
+            help=(
+                "Raw data layout to read. 'auto' reads the layout last written to each directory "
+                "(pack.seg when present and unrecorded, otherwise *.json files)."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes used to parse the changed raw documents (1 = parse in this process).",
+        )
+        parser.add_argument(
+            "--json-parser",
+            choices=loader.available_parsers(),
+            default=loader.default_parser(),
+            help="JSON parser used while extracting. orjson is used when installed.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Ignore the existing extract files and re-extract every document.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        raw_dir = Path.cwd() / "data" / "raw" / "pokemon"
+        extract_dir = Path.cwd() / "data" / "extract" / "pokemon"
+        if not raw_dir.is_dir():
+            raise CommandError(f"ディレクトリがありません: {raw_dir}")
+
+        self.refresh_all(
+            raw_dir,
+            extract_dir,
+            raw_format=options.get("raw_format", "auto"),
+            parser=options.get("json_parser") or "json",
+            workers=options.get("workers") or 1,
+            rebuild=options.get("rebuild", False),
+        )
+
+    def refresh_all(
+        self,
+        raw_dir: Path,
+        extract_dir: Path,
+        raw_format: str = "auto",
+        parser: str = "json",
+        workers: int = 1,
+        rebuild: bool = False,
+    ) -> Dict[str, extract.ExtractStats]:
+        """
+        EXTRACT_SOURCES を順に抽出し、サブエンドポイント名 -> ExtractStats を返す（all_register からも呼ぶ）。
+        """
+        results: Dict[str, extract.ExtractStats] = {}
+        failed = False
+        for name in EXTRACT_SOURCES:
+            progress = tqdm(desc=f"{name} を抽出中", unit="件", leave=False)
+            stats = extract.refresh(
+                name,
+                raw_dir / name,
+                extract.extract_path(extract_dir, name),
+                raw_format=raw_format,
+                parser=parser,
+                workers=workers,
+                rebuild=rebuild,
+                on_progress=progress.update,
+            )
+            progress.close()
+            for where, message in stats.errors:
+                self.stderr.write(f"[ERROR] {where}: {message}")
+            failed = failed or bool(stats.errors)
+            self.stdout.write(
+                f"{name}: {stats.total} 件 (抽出 {stats.extracted} / 再利用 {stats.reused} / 削除 {stats.removed})"
+            )
+            results[name] = stats
+        if failed:
+            self.stderr.write("読み込めなかった生データがあります。該当する行は抽出ファイルに含まれていません。")
+        return results
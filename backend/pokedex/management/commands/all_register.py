@@ -1,28 +1,54 @@
+import hashlib
 import json
+import os
 import re
 import sys
+import zlib
+from collections import Counter
 from pathlib import Path
-from typing import Generator, Tuple, List, Dict, Any
+from typing import Generator, Tuple, List, Dict, Any, Optional, Sequence, Type
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
 from tqdm import tqdm
 
+from pokedex.fetch.store import PackReader, PackStore, resolve_layout
+from pokedex.management.commands.all_extract import Command as ExtractCommand
+from pokedex.models.data_version import DataVersion
 from pokedex.models.pokemon import Pokemon
+from pokedex.register import extract, grouping, learnset, loader, regions, swap
+from pokedex.register.stream import DocumentCache, MemoryBudget, MemoryLimitExceeded, open_lazy_maps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 
 class Command(BaseCommand):
     """
     PokeAPIから取得したJSONデータを元に、Pokemonモデルを再構築するコマンド。
 
-    1) JSONファイルを読み込む
-    2) ポケモンのレコード（辞書リスト）を作成
-    3) 既存のPokemonレコードを全削除
-    4) 新しいレコードを一括登録
-    5) 登録したレコードを確認用にJSON出力
+    0) 入力の指紋（生データのスタンプ + レコード生成のコードの版）を求める。
+       data/merged/pokedex_check.json を作ったときと同じなら 1)～3) を省いてそれを使い、
+       DB の DataVersion とも同じなら 4) も省いて終わる（--force で無視）
+    1) all_extract で生データのうち変わったものだけを data/extract/pokemon/*.jsonl に抽出し、それを読み込む
+       --source raw の場合は生の JSON を読む（プロセスプールで並列に。--project で必要なフィールドだけに絞る）
+       --streaming の場合は生データを全件読まず、レコード生成中に参照されたものだけを LRU 経由で読む
+    2) ポケモンのレコード（辞書リスト）を作成し、group / original を割り当てる (grouping.assign_groups)。
+       続けて各地方の一覧に載るか (in_national など) を求める (regions.membership)
+    3) 登録したレコードを確認用にJSON出力
+    4) unique_id ごとに内容のハッシュ (content_hash) を現在の行と比べ、新規は追加・変更は変わったフィールドだけ更新・
+       無くなった行は削除する（--full-refresh なら従来どおり全削除してから一括登録）
+       --swap の場合は影テーブル (pokedex_pokemon__shadow) に組み立ててから本番と入れ替え、
+       前の版を pokedex_pokemon__old に残す（--rollback で戻す）
     """
 
-    help = "ポケモンのデータを統合し、既存レコードを全削除後にDBへ一括登録するスクリプト"
+    help = (
+        "ポケモンのデータを統合し、現在の行との差分（新規・変更・削除）だけをDBに反映するスクリプト。"
+        "--full-refresh で全削除してから一括登録、--swap で影テーブルに組み立てて入れ替え、"
+        "--rollback で --swap 前の表に戻す"
+    )
 
     # 地方図鑑の pokedex.name と、Pokemonモデルの対応フィールド名のマッピング
     POKEDEX_MAP = {
@@ -70,41 +96,420 @@ class Command(BaseCommand):
         r"]+$"
     )
 
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--source",
+            choices=["extract", "raw"],
+            default=None,
+            help=(
+                "Read the incrementally refreshed extract files (default) or parse data/raw directly "
+                "(default when --streaming / --memory-limit is given)."
+            ),
+        )
+        parser.add_argument(
+            "--raw-format",
+            choices=["auto", "files", "pack"],
+            default="auto",
+            help=(
+                "Raw data layout to read. 'auto' reads the layout last written to each directory "
+                "(pack.seg when present and unrecorded, otherwise *.json files)."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes used to load and parse the raw JSON (1 = load in this process).",
+        )
+        parser.add_argument(
+            "--json-parser",
+            choices=loader.available_parsers(),
+            default=loader.default_parser(),
+            help="JSON parser used while loading. orjson is used when installed.",
+        )
+        parser.add_argument(
+            "--project",
+            action="store_true",
+            help="Keep only the fields generate_records reads, inside the workers.",
+        )
+        parser.add_argument(
+            "--streaming",
+            action="store_true",
+            help="Join species -> pokemon -> form on demand through a bounded LRU instead of loading everything.",
+        )
+        parser.add_argument(
+            "--cache-size",
+            type=int,
+            default=64,
+            help="With --streaming: maximum number of parsed documents kept in the LRU.",
+        )
+        parser.add_argument(
+            "--memory-limit",
+            type=float,
+            default=None,
+            help="Limit in MB on the Python heap retained while generating records (tracemalloc). Implies --streaming.",
+        )
+        parser.add_argument(
+            "--full-refresh",
+            action="store_true",
+            help="Delete every Pokemon row and re-insert all records instead of applying the diff.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=self.REGISTER_BATCH_SIZE,
+            help="Rows per bulk_create / bulk_update / delete statement.",
+        )
+        parser.add_argument(
+            "--swap",
+            action="store_true",
+            help="Build into a shadow table and swap it in atomically, keeping the previous table for --rollback.",
+        )
+        parser.add_argument(
+            "--rollback",
+            action="store_true",
+            help="Swap the previous table (kept by --swap) back in, and exit.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild pokedex_check.json and apply it to the DB even when the input fingerprint is unchanged.",
+        )
+
     def handle(self, *args, **options) -> None:
+        # 読み手が書き込みを待たないように (SQLite のみ)
+        swap.enable_wal()
+        if options.get("rollback"):
+            try:
+                swap.rollback(Pokemon)
+            except RuntimeError as e:
+                raise CommandError(str(e)) from e
+            self.stdout.write(
+                f"{Pokemon._meta.db_table} を前の版に戻しました"
+                f"（戻す前の版は {Pokemon._meta.db_table}{swap.OLD_SUFFIX} に残っています）。"
+            )
+            # どの入力の版かは分からなくなるので、次回は DB への反映を必ず行う
+            self.set_data_version(None)
+            return
+
         base_path = Path.cwd() / "data" / "raw" / "pokemon"
         species_dir = base_path / "pokemon-species"
         pokemon_dir = base_path / "pokemon-pokemon"
         form_dir = base_path / "pokemon-form"
+        extract_dir = Path.cwd() / "data" / "extract" / "pokemon"
         output_dir = Path.cwd() / "data" / "merged"
         output_file = output_dir / "pokedex_check.json"
         output_dir.mkdir(exist_ok=True, parents=True)
+        raw_format = options.get("raw_format", "auto")
+
+        directories = {
+            "pokemon-species": species_dir,
+            "pokemon-pokemon": pokemon_dir,
+            "pokemon-form": form_dir,
+        }
+        parser = options.get("json_parser") or "json"
+        memory_limit = options.get("memory_limit")
+        streaming = options.get("streaming", False) or memory_limit is not None
+        source = options.get("source") or ("raw" if streaming else "extract")
+        if source == "extract" and streaming:
+            raise CommandError("--streaming / --memory-limit は --source raw でのみ使えます。")
+
+        workers = options.get("workers") or 1
+        force = options.get("force", False)
+        full_refresh = options.get("full_refresh", False)
+
+        # 0) 入力の指紋（生データのスタンプとレコード生成のコードの版）
+        if source == "extract":
+            # 抽出ステージ (変わった生データだけ読み直す) を先に済ませ、そのスタンプを使う
+            extract_stats = ExtractCommand(stdout=self.stdout, stderr=self.stderr).refresh_all(
+                base_path,
+                extract_dir,
+                raw_format=raw_format,
+                parser=parser,
+                workers=workers,
+            )
+            input_digests = {name: stats.digest for name, stats in extract_stats.items()}
+        else:
+            input_digests = {
+                name: extract.stamps_digest(extract.source_stamps(directory, raw_format))
+                for name, directory in directories.items()
+            }
+        fingerprint = self.input_fingerprint(input_digests)
+        fingerprint_file = output_dir / "pokedex_check.fingerprint"
+        # フォームのデータが無く飛ばしたレコードの unique_id（DB の既存の行は消さない）
+        skipped_file = output_dir / "pokedex_check.skipped"
+
+        merged_current = (
+            not force
+            and output_file.exists()
+            and fingerprint_file.exists()
+            and fingerprint_file.read_text(encoding="utf-8").strip() == fingerprint
+        )
+        db_current = not force and not full_refresh and self.get_data_version() == fingerprint
+        if merged_current and db_current:
+            self.stdout.write(f"入力に変更はありません (指紋 {fingerprint[:12]})。{output_file} と DB はそのままです。")
+            return
+
+        if merged_current:
+            # 1)～3) 入力が前回と同じなので、前回の確認用 JSON をそのまま使う
+            all_records = self.fill_record_fields(loader.get_loads(parser)(output_file.read_bytes()))
+            skipped_ids = self.read_skipped_ids(skipped_file)
+            self.stdout.write(f"入力に変更がないため {output_file} を再利用します ({len(all_records)} 件)。")
+        else:
+            all_records = self.build_records(
+                directories,
+                extract_dir,
+                source=source,
+                raw_format=raw_format,
+                parser=parser,
+                workers=workers,
+                project=options.get("project", False),
+                streaming=streaming,
+                memory_limit=memory_limit,
+                cache_size=options.get("cache_size") or 1,
+            )
+            skipped_ids = list(getattr(self, "skipped_ids", []))
+
+            # 3) 確認用 JSON 出力（書き終えてから指紋を書く。途中で止まっても次回は作り直す）
+            fingerprint_file.unlink(missing_ok=True)
+            output_file.write_bytes(loader.dumps_indented(all_records))
+            skipped_file.write_text("".join(f"{unique_id}\n" for unique_id in skipped_ids), encoding="utf-8")
+            fingerprint_file.write_text(fingerprint + "\n", encoding="utf-8")
+            self.stdout.write(f"\nDone! Created {output_file} with {len(all_records)} records.\n")
+
+        # 4) DB 反映
+        if db_current:
+            self.stdout.write("DB は既にこの入力の版です。DB への反映は省きます。")
+            return
 
-        # 1) JSON読み込み
-        species_data_map = dict(self.load_json_generator(species_dir, desc="Loading species json"))
-        pokemon_data_map = dict(self.load_json_generator(pokemon_dir, desc="Loading pokemon json"))
-        form_data_map = dict(self.load_json_generator(form_dir, desc="Loading form json"))
+        batch_size = max(1, options.get("batch_size") or self.REGISTER_BATCH_SIZE)
+        # 表の列と索引は pokedex/migrations で作る（--swap の影テーブルも本番と同じ列で写す）
+        pending = swap.unapplied_migrations(Pokemon._meta.app_label)
+        if pending:
+            raise CommandError(
+                f"適用されていないマイグレーションがあります ({', '.join(pending)})。先に manage.py migrate を実行してください。"
+            )
+        if options.get("swap"):
+            # 影テーブルに組み立ててから、1 トランザクションで本番と入れ替える
+            # --full-refresh でも、飛ばしたレコードの行は写して残す
+            shadow = swap.create_shadow(Pokemon, copy_rows=not full_refresh or bool(skipped_ids))
+            if full_refresh:
+                shadow.objects.exclude(unique_id__in=skipped_ids).delete()
+                self.register_database(all_records, batch_size=batch_size, model=shadow)
+            else:
+                self.upsert_database(all_records, batch_size=batch_size, model=shadow, keep_ids=skipped_ids)
+            swap.swap_in(Pokemon)
+            self.stdout.write(
+                f"{Pokemon._meta.db_table} を入れ替えました。前の版は "
+                f"{Pokemon._meta.db_table}{swap.OLD_SUFFIX} に残しています (--rollback で戻せます)。"
+            )
+        elif full_refresh:
+            # 削除と登録を 1 トランザクションにし、読み手に空の表を見せない
+            with transaction.atomic():
+                self.refresh_database(keep_ids=skipped_ids)
+                self.register_database(all_records, batch_size=batch_size)
+        else:
+            self.upsert_database(all_records, batch_size=batch_size, keep_ids=skipped_ids)
+        self.set_data_version(fingerprint)
+
+    def build_records(
+        self,
+        directories: Dict[str, Path],
+        extract_dir: Path,
+        source: str = "extract",
+        raw_format: str = "auto",
+        parser: str = "json",
+        workers: int = 1,
+        project: bool = False,
+        streaming: bool = False,
+        memory_limit: Optional[float] = None,
+        cache_size: int = 64,
+    ) -> List[dict]:
+        """
+        1) データを読み込み、2) レコードを生成して並べ替えたものを返す。
+        """
+        budget = None
+        cache = None
+        if source == "extract":
+            # 1) 抽出ファイルを読み込む
+            data_maps = {
+                name: extract.load(extract.extract_path(extract_dir, name), parser=parser)
+                for name in directories
+            }
+        elif streaming:
+            # 1) ストリーミング: 読み込みはレコード生成中に必要になった分だけ
+            # tracemalloc は遅くなるので、上限を指定したときだけ使う（最大 RSS は常に表示する）
+            budget = MemoryBudget(int(memory_limit * 1024 * 1024)) if memory_limit else None
+            cache = DocumentCache(cache_size, budget=budget)
+            data_maps = open_lazy_maps(directories, cache, raw_format=raw_format, parser=parser, project=project)
+        else:
+            # 1) JSON読み込み
+            data_maps = self.load_data_maps(
+                directories,
+                raw_format=raw_format,
+                workers=workers,
+                parser=parser,
+                project=project,
+            )
 
         # 2) レコード生成
-        all_records = self.generate_records(
-            species_data_map=species_data_map,
-            pokemon_data_map=pokemon_data_map,
-            form_data_map=form_data_map,
-        )
+        try:
+            all_records = self.generate_records(
+                species_data_map=data_maps["pokemon-species"],
+                pokemon_data_map=data_maps["pokemon-pokemon"],
+                form_data_map=data_maps["pokemon-form"],
+            )
+        except MemoryLimitExceeded as e:
+            raise CommandError(f"{e} --cache-size を小さくするか、--project を指定してください。") from e
+        finally:
+            if streaming:
+                for data_map in data_maps.values():
+                    for where, message in data_map.errors:
+                        self.stderr.write(f"[ERROR] {where}: {message}")
+                    data_map.close()
+                if budget is not None:
+                    budget.stop()
+        del data_maps
         all_records.sort(key=self.sort_key)
+        self.report_memory(budget, cache)
+
+        # group / original もここで付ける（all_set_original を別に実行しなくてよい）
+        assignments = grouping.assign_groups(all_records)
+        for record in all_records:
+            record["group"], record["original"] = assignments[record["unique_id"]]
+            # 地方ごとの一覧への所属（original を使うので group の後）
+            record.update(regions.membership(record))
+        return self.fill_record_fields(all_records)
 
-        # 3) 確認用 JSON 出力
-        with output_file.open("w", encoding="utf-8") as f_out:
-            json.dump(all_records, f_out, ensure_ascii=False, indent=2)
-        self.stdout.write(f"\nDone! Created {output_file} with {len(all_records)} records.\n")
+    def record_fields(self) -> List[str]:
+        """
+        レコードが持つフィールド (content_hash 以外の Pokemon の全列)。
+        """
+        return Pokemon.record_fields()
 
-        # 4) DB リフレッシュ（全削除 → bulk_create）
-        self.refresh_database()
-        self.register_database(all_records)
+    def fill_record_fields(self, records: List[dict]) -> List[dict]:
+        """
+        レコードに無いフィールドを None で埋める（元データから特性や図鑑番号が消えた場合も、
+        差分登録で NULL に戻るように。ハッシュもこの形で求める）。
+        """
+        field_names = self.record_fields()
+        for record in records:
+            for field_name in field_names:
+                record.setdefault(field_name, None)
+        return records
+
+    # --------------------------------------------------
+    # 入力の指紋とデータの版
+    # --------------------------------------------------
+    # レコードの作り方を変えたら上げる（下の RECORD_SOURCES 以外のファイルを変えた場合など）
+    RECORDS_VERSION = 1
+    # 中身が変わったらレコードも変わりうるモジュール。ソースの SHA-1 を指紋に含める
+    RECORD_SOURCES = (sys.modules[__name__], grouping, learnset, loader, extract, regions)
+    DATA_VERSION_NAME = DataVersion.POKEMON
+
+    def input_fingerprint(self, input_digests: Dict[str, str]) -> str:
+        """
+        生データのスタンプ (サブエンドポイントごとの SHA-1) と、レコード生成のコードの版から指紋を作る。
+        """
+        sha1 = hashlib.sha1()
+        sha1.update(f"records-version:{self.RECORDS_VERSION}\n".encode())
+        for module in self.RECORD_SOURCES:
+            sha1.update(Path(module.__file__).read_bytes())
+        for name in sorted(input_digests):
+            sha1.update(f"{name}:{input_digests[name]}\n".encode())
+        return sha1.hexdigest()
+
+    def get_data_version(self) -> Optional[str]:
+        if not swap.table_exists(DataVersion._meta.db_table):
+            self.stderr.write(
+                f"[WARN] {DataVersion._meta.db_table} がありません (manage.py migrate で作成)。"
+                "DB への反映は毎回行います。"
+            )
+            return None
+        row = DataVersion.objects.filter(name=self.DATA_VERSION_NAME).first()
+        return row.fingerprint if row and row.fingerprint else None
+
+    def set_data_version(self, fingerprint: Optional[str]) -> None:
+        """
+        DB に反映した入力の指紋を保存する。None なら空にする（--rollback 後など、版が分からないとき）。
+        行は消さずに書き直すので、updated_at は必ず進む（api のレスポンスキャッシュがこれで古い版を捨てる）。
+        """
+        if not swap.table_exists(DataVersion._meta.db_table):
+            return
+        DataVersion.objects.update_or_create(name=self.DATA_VERSION_NAME, defaults={"fingerprint": fingerprint or ""})
+
+    def read_skipped_ids(self, skipped_file: Path) -> List[str]:
+        if not skipped_file.exists():
+            return []
+        return [line for line in skipped_file.read_text(encoding="utf-8").splitlines() if line]
 
     # --------------------------------------------------
     # JSON 読み込み
     # --------------------------------------------------
-    def load_json_generator(self, directory: Path, desc: str = "") -> Generator[Tuple[str, dict], None, None]:
+    LOAD_CHUNK_SIZE = 32  # 1 ジョブで読み込むファイル数
+    REGISTER_BATCH_SIZE = 500  # 1 文あたりの行数 (bulk_create / bulk_update / delete)
+
+    def load_data_maps(
+        self,
+        directories: Dict[str, Path],
+        raw_format: str = "auto",
+        workers: int = 1,
+        parser: str = "json",
+        project: bool = False,
+    ) -> Dict[str, Dict[str, dict]]:
+        """
+        サブエンドポイント名 -> ディレクトリ を受け取り、サブエンドポイント名 -> {5桁ID: データ} を返す。
+
+        ファイル (パックなら ID) を LOAD_CHUNK_SIZE 件ずつのジョブに分け、workers 個のプロセスで読み込む。
+        3 つのディレクトリのジョブは 1 つのプールにまとめて投入する。
+        project=True の場合はワーカーの中で loader.PROJECTIONS の射影をかけ、小さな dict だけを受け取る。
+        """
+        jobs = []  # (サブエンドポイント名, 関数, 引数)
+        for name, directory in directories.items():
+            projection = name if project else None
+            if resolve_layout(directory, raw_format) == PackStore.format_name:
+                with PackReader(directory) as reader:
+                    ids = reader.ids()
+                for chunk in self.chunked(ids):
+                    jobs.append((name, loader.load_pack_ids, (str(directory), chunk, parser, projection)))
+            else:
+                paths = sorted(str(path) for path in directory.glob("*.json"))
+                for chunk in self.chunked(paths):
+                    jobs.append((name, loader.load_files, (chunk, parser, projection)))
+
+        data_maps: Dict[str, Dict[str, dict]] = {name: {} for name in directories}
+        progress = tqdm(total=len(jobs), desc=f"Loading json ({parser}, workers={workers})")
+
+        def collect(name: str, result: loader.LoadResult) -> None:
+            loaded, errors = result
+            data_maps[name].update(loaded)
+            for where, message in errors:
+                self.stderr.write(f"[ERROR] {where}: {message}")
+            progress.update()
+
+        loader.run_jobs(jobs, workers, collect)
+        progress.close()
+        return data_maps
+
+    def chunked(self, values: List[Any], size: Optional[int] = None) -> Generator[List[Any], None, None]:
+        size = size or self.LOAD_CHUNK_SIZE
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+
+    def load_json_generator(
+        self,
+        directory: Path,
+        desc: str = "",
+        raw_format: str = "auto",
+    ) -> Generator[Tuple[str, dict], None, None]:
+        """
+        (5桁ID, データ) を順に返す。
+        raw_format が "pack"、もしくは "auto" でパック (pack.seg) がある場合はパックから mmap で読む。
+        """
+        if resolve_layout(directory, raw_format) == PackStore.format_name:
+            yield from self.load_pack_generator(directory, desc=desc)
+            return
+
         for json_file in tqdm(directory.glob("*.json"), desc=desc):
             file_id = json_file.stem
             try:
@@ -114,6 +519,14 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stderr.write(f"[ERROR] {json_file}: {e}")
 
+    def load_pack_generator(self, directory: Path, desc: str = "") -> Generator[Tuple[str, dict], None, None]:
+        with PackReader(directory) as reader:
+            for id_num in tqdm(reader.ids(), desc=desc):
+                try:
+                    yield f"{id_num:05d}", reader.load(id_num)
+                except (ValueError, zlib.error) as e:
+                    self.stderr.write(f"[ERROR] {directory / PackStore.SEGMENT_NAME} (id={id_num}): {e}")
+
     # --------------------------------------------------
     # レコード生成
     # --------------------------------------------------
@@ -125,6 +538,10 @@ class Command(BaseCommand):
     ) -> List[dict]:
         all_records: List[dict] = []
         unique_counters: Dict[str, int] = {}
+        # フォームのデータが無く飛ばしたレコード (フォームの JSON のパス)。
+        # その unique_id は self.skipped_ids に残し、DB の既存の行を消さないようにする (upsert_database の keep_ids)
+        skipped_forms: List[str] = []
+        self.skipped_ids = []
 
         # 例外名前出力用
         exception_dir = Path.cwd() / "data" / "exception"
@@ -135,7 +552,9 @@ class Command(BaseCommand):
 
         species_keys = sorted(species_data_map.keys(), key=lambda x: int(x))
         for species_key in species_keys:
-            species_data = species_data_map[species_key]
+            species_data = species_data_map.get(species_key)
+            if not species_data:
+                continue
             species_name_jp = self.get_species_ja_name(species_data)
             species_name_en = self.get_species_en_name(species_data)
 
@@ -170,20 +589,26 @@ class Command(BaseCommand):
 
                     form_json_file = f"pokemon-form/{form_id_str.zfill(5)}.json"
                     single_form_data = form_data_map.get(form_id_str.zfill(5))
+
+                    # 番号はフォームを飛ばす場合も進める（同じ種の他のフォームの unique_id が変わらないように）
+                    counter_key = f"{species_key}-{species_name_jp}"
+                    unique_counters[counter_key] = unique_counters.get(counter_key, -1) + 1
+                    unique_id_value = f"{species_key}-{unique_counters[counter_key]:02d}"
+
                     if not single_form_data:
-                        sys.exit("[ERROR] Missing form data.")
+                        # 読み込めなかった生データと同じく、記録して飛ばす（次回データが揃えば登録される）
+                        self.stderr.write(f"[ERROR] {form_json_file}: Missing form data ({pokemon_json_file}).")
+                        skipped_forms.append(form_json_file)
+                        self.skipped_ids.append(unique_id_value)
+                        continue
 
                     form_name_jp = self.get_sub_ja(single_form_data)
                     form_name_en = self.get_sub_en(single_form_data)
                     if self.is_exception_name(form_name_jp):
                         exception_name_set.add(form_name_jp)
 
-                    counter_key = f"{species_key}-{species_name_jp}"
-                    unique_counters[counter_key] = unique_counters.get(counter_key, -1) + 1
-                    unique_id_value = f"{species_key}-{unique_counters[counter_key]:02d}"
-
                     stats_fields = self.get_pokemon_stats(pokemon_data)
-                    generation_fields = self.get_generation_flags(pokemon_data)
+                    generation_fields = self.get_generation_fields(pokemon_data)
                     en_types = self.get_types(pokemon_data)
                     ja_types = self.translate_types(en_types)
                     abilities = self.get_abilities(pokemon_data)
@@ -224,32 +649,141 @@ class Command(BaseCommand):
                 for ex_name in sorted(exception_name_set):
                     ef.write(ex_name + "\n")
 
+        if skipped_forms:
+            preview = ", ".join(skipped_forms[:20]) + (" ..." if len(skipped_forms) > 20 else "")
+            self.stderr.write(f"フォームのデータが無いため {len(skipped_forms)} 件のレコードを飛ばしました: {preview}")
         return all_records
 
+    def report_memory(self, budget: Optional[MemoryBudget], cache: Optional[DocumentCache]) -> None:
+        """
+        ピークメモリ (tracemalloc は --memory-limit 指定時のみ) と LRU のヒット率を表示する。
+        """
+        lines = []
+        if budget is not None:
+            limit = f" / 上限 {budget.limit_bytes / 1024 / 1024:.1f} MB" if budget.limit_bytes else ""
+            lines.append(f"Python ヒープのピーク: {budget.peak() / 1024 / 1024:.1f} MB{limit}")
+        if cache is not None:
+            lines.append(f"LRU: ヒット {cache.hits} 件 / 読み込み {cache.misses} 件 (最大 {cache.max_items} 件保持)")
+        if resource is not None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+            lines.append(f"最大 RSS: {maxrss / scale:.1f} MB")
+        for line in lines:
+            self.stdout.write(line)
+
     # --------------------------------------------------
     # DB 更新
     # --------------------------------------------------
-    def refresh_database(self) -> None:
-        """既存のPokemonレコードをすべて削除する処理"""
+    def refresh_database(self, keep_ids: Sequence[str] = ()) -> None:
+        """既存のPokemonレコードをすべて削除する処理 (keep_ids の行は残す)"""
         self.stdout.write("既存のレコードを削除中...")
         with transaction.atomic():
-            Pokemon.objects.all().delete()
+            Pokemon.objects.exclude(unique_id__in=list(keep_ids)).delete()
         self.stdout.write("レコード削除完了。")
 
-    def register_database(self, records: List[dict]) -> None:
-        """新しいレコードを一括登録する処理"""
+    def register_database(
+        self,
+        records: List[dict],
+        batch_size: int = REGISTER_BATCH_SIZE,
+        model: Type[Pokemon] = Pokemon,
+    ) -> None:
+        """新しいレコードを一括登録する処理 (model は影テーブルのモデルでもよい)"""
         if not records:
             self.stdout.write("追加する新しいレコードはありません。")
             return
 
         new_pokemon_list = [
-            Pokemon(**record)
+            model(**record, content_hash=self.record_hash(record))
             for record in tqdm(records, desc="新しいレコードを登録中")
         ]
         with transaction.atomic():
-            Pokemon.objects.bulk_create(new_pokemon_list)
+            model.objects.bulk_create(new_pokemon_list, batch_size=batch_size)
         self.stdout.write(f"{len(new_pokemon_list)} 件の新しいレコードをデータベースに追加しました。")
 
+    def upsert_database(
+        self,
+        records: List[dict],
+        batch_size: int = REGISTER_BATCH_SIZE,
+        model: Type[Pokemon] = Pokemon,
+        keep_ids: Sequence[str] = (),
+    ) -> None:
+        """
+        生成したレコードと現在の行を unique_id で突き合わせ、差分だけを反映する処理 (model は影テーブルのモデルでもよい)。
+
+        - content_hash が一致する行は触らない
+        - ハッシュが違う行は現在の値と比べ、変わったフィールドだけを bulk_update する
+          （変わったフィールドの組み合わせごとにまとめ、UPDATE の列を最小にする）
+        - レコードに無くなった unique_id の行は削除する（ただし keep_ids の行は残す。
+          フォームのデータが一時的に欠けて飛ばしたレコードで、DB の有効な行を消さないように）
+        """
+        hashes = {record["unique_id"]: self.record_hash(record) for record in records}
+        current_hashes = dict(model.objects.values_list("unique_id", "content_hash"))
+
+        new_records = [record for record in records if record["unique_id"] not in current_hashes]
+        candidates = {
+            record["unique_id"]: record
+            for record in records
+            if record["unique_id"] in current_hashes and current_hashes[record["unique_id"]] != hashes[record["unique_id"]]
+        }
+        removed_ids = sorted(set(current_hashes) - set(hashes) - set(keep_ids))
+
+        # ハッシュが違う行は、現在の値と比べて実際に変わったフィールドを求める
+        # レコードのキーではなくモデルの全列で比べる（レコードに無い列は None として NULL に戻す）
+        record_fields = [field_name for field_name in self.record_fields() if field_name != "unique_id"]
+        updates: Dict[Tuple[str, ...], List[models.Model]] = {}
+        field_counts: Counter = Counter()
+        changed_count = 0
+        for chunk in self.chunked(sorted(candidates), size=batch_size):
+            for row in model.objects.filter(unique_id__in=chunk).values("unique_id", *record_fields):
+                record = candidates[row["unique_id"]]
+                changed_fields = tuple(
+                    field_name for field_name in record_fields
+                    if row[field_name] != record.get(field_name)
+                )
+                if changed_fields:
+                    changed_count += 1
+                    field_counts.update(changed_fields)
+                pokemon = model(
+                    unique_id=row["unique_id"],
+                    content_hash=hashes[row["unique_id"]],
+                    **{field_name: record[field_name] for field_name in changed_fields},
+                )
+                updates.setdefault(changed_fields + ("content_hash",), []).append(pokemon)
+
+        with transaction.atomic():
+            for chunk in self.chunked(removed_ids, size=batch_size):
+                model.objects.filter(unique_id__in=chunk).delete()
+            model.objects.bulk_create(
+                [model(**record, content_hash=hashes[record["unique_id"]]) for record in new_records],
+                batch_size=batch_size,
+            )
+            for update_fields, objs in updates.items():
+                model.objects.bulk_update(objs, list(update_fields), batch_size=batch_size)
+
+        unchanged_count = len(records) - len(new_records) - changed_count
+        self.stdout.write(
+            f"登録差分: 新規 {len(new_records)} 件 / 変更 {changed_count} 件 / "
+            f"変更なし {unchanged_count} 件 / 削除 {len(removed_ids)} 件"
+        )
+        kept_ids = sorted(set(keep_ids) & set(current_hashes))
+        if kept_ids:
+            self.stdout.write(f"元データが欠けているため、既存の行を残しました: {', '.join(kept_ids[:20])}")
+        if field_counts:
+            self.stdout.write(
+                "変更されたフィールド: "
+                + ", ".join(f"{field_name}={count}" for field_name, count in field_counts.most_common())
+            )
+        for label, ids in (("新規", [record["unique_id"] for record in new_records]), ("削除", removed_ids)):
+            if ids:
+                preview = ", ".join(ids[:20]) + (" ..." if len(ids) > 20 else "")
+                self.stdout.write(f"{label}: {preview}")
+
+    def record_hash(self, record: dict) -> str:
+        """
+        レコードの内容から content_hash を求める（キーの順序に依存しない）。
+        """
+        return loader.record_hash(record)
+
 
     # --------------------------------------------------
     # ユーティリティ
@@ -328,42 +862,17 @@ class Command(BaseCommand):
                 result[field_name] = dex_num
         return result
 
-    def get_generation_flags(self, pokemon_data: dict) -> dict:
+    def get_generation_fields(self, pokemon_data: dict) -> dict:
         """
-        各世代の技の判定結果を、キーをモデルのフィールド名（generation_01～generation_09）とした辞書で返す
+        moves を 1 回だけ走査し、世代ごとの登場フラグ (exist_generation_01～09) と
+        覚える技の一覧 (move_generation_01～09) を、キーをモデルのフィールド名とした辞書で返す
+        （--project の場合は読み込み時に計算済み）
         """
-        generation_mapping = {
-            "exist_generation_01": ["red-blue", "yellow"],
-            "exist_generation_02": ["gold-silver", "crystal"],
-            "exist_generation_03": ["ruby-sapphire", "emerald"],
-            "exist_generation_04": ["diamond-pearl", "platinum"],
-            "exist_generation_05": ["black-white", "black-2-white-2"],
-            "exist_generation_06": ["x-y"],
-            "exist_generation_07": ["sun-moon", "ultra-sun-ultra-moon"],
-            "exist_generation_08": ["sword-shield"],
-            "exist_generation_09": ["scarlet-violet"],
-        }
-        moves = pokemon_data.get("moves", [])
-        return {
-            gen_key: any(
-                version_info.get("version_group", {}).get("name", "") in target_versions
-                for move in moves
-                for version_info in move.get("version_group_details", [])
-            )
-            for gen_key, target_versions in generation_mapping.items()
-        }
+        precomputed = pokemon_data.get(learnset.PRECOMPUTED_KEY)
+        if precomputed is not None:
+            return precomputed
+        return learnset.generation_fields(pokemon_data.get("moves", []))
 
-    def _is_pokemon_in_versions(self, pokemon_data: dict, target_versions: list) -> bool:
-        moves = pokemon_data.get("moves", [])
-        for move in moves:
-            for version_info in move.get("version_group_details", []):
-                if version_info.get("version_group", {}).get("name", "") in target_versions:
-                    return True
-        return False
-    
-    def moves_in_generations(self,pokemon_data: dict) -> list:
-        pass
-    
     def get_abilities(self, pokemon_data: dict) -> dict:
         entries = pokemon_data.get("abilities", [])
         abilities_dict = {}
@@ -412,13 +921,4 @@ class Command(BaseCommand):
         return not bool(self.EXCEPTION_PATTERN.fullmatch(name))
 
     def sort_key(self, record: dict) -> Tuple[int, int, int]:
-        def to_int_safe(value: str) -> int:
-            try:
-                return int(value)
-            except ValueError:
-                return 999999
-        return (
-            to_int_safe(record.get("species_id", "999999")),
-            to_int_safe(record.get("pokemon_id", "999999")),
-            to_int_safe(record.get("form_id", "999999")),
-        )
+        return grouping.record_order(record)
@@ -0,0 +1,246 @@
+# all_register_moves.py
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from tqdm import tqdm
+
+from pokedex.fetch.store import PackReader, PackStore, resolve_layout
+from pokedex.management.commands.all_extract import Command as ExtractCommand
+from pokedex.management.commands.all_register import Command as RegisterCommand
+from pokedex.models.data_version import DataVersion
+from pokedex.models.move import Move, PokemonMove
+from pokedex.register import extract, learnset, loader, swap
+
+# PokeAPI の generation.name の末尾 (ローマ数字) -> 世代
+GENERATION_NUMBERS = {
+    "i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9,
+}
+
+
+class Command(BaseCommand):
+    """
+    data/raw/move/move (fetch_move の出力) から Move を、pokemon-pokemon の抽出ファイル
+    (all_extract の出力。世代ごとの技一覧を計算済み) から PokemonMove を一括登録するコマンド。
+
+    1) all_extract を実行し (変わった生データだけ読み直す)、入力の指紋を求める。
+       DB の DataVersion ("moves") と同じなら何もしない（--force で無視）
+    2) move を読み込み (プロセスプールで並列に、必要なフィールドだけ)、Move を upsert する
+    3) PokemonMove を 1 トランザクションで全削除して executemany で入れ直す
+
+    Usage:
+      python manage.py all_register_moves
+      python manage.py all_register_moves --force
+    """
+
+    help = "Register Move and PokemonMove (learnsets) from data/raw/move/move and the pokemon extract."
+
+    # レコードの作り方を変えたら上げる（下の RECORD_SOURCES 以外のファイルを変えた場合など）
+    RECORDS_VERSION = 1
+    RECORD_SOURCES = (sys.modules[__name__], learnset, loader, extract)
+    DATA_VERSION_NAME = DataVersion.MOVES
+    BATCH_SIZE = 2000  # Move の bulk_create 1 文あたりの行数 (SQLite の変数の上限は Django が考慮する)
+    INSERT_CHUNK_SIZE = 20000  # PokemonMove の executemany 1 回あたりの行数
+    # build_learnsets が返すタプルの並びと同じ
+    LEARNSET_COLUMNS = ("pokemon_id", "move_id", "generation", "learn_method", "level")
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--raw-format",
+            choices=["auto", "files", "pack"],
+            default="auto",
+            help=(
+                "Raw data layout to read. 'auto' reads the layout last written to each directory "
+                "(pack.seg when present and unrecorded, otherwise *.json files)."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes used to load and parse the raw JSON (1 = load in this process).",
+        )
+        parser.add_argument(
+            "--json-parser",
+            choices=loader.available_parsers(),
+            default=loader.default_parser(),
+            help="JSON parser used while loading. orjson is used when installed.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Register even when the input fingerprint matches the registered data version.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        move_dir = Path.cwd() / "data" / "raw" / "move" / "move"
+        raw_dir = Path.cwd() / "data" / "raw" / "pokemon"
+        extract_dir = Path.cwd() / "data" / "extract" / "pokemon"
+        if not move_dir.is_dir():
+            raise CommandError(f"ディレクトリがありません: {move_dir} (先に fetch_move move を実行してください)")
+        for model in (Move, PokemonMove, DataVersion):
+            if not swap.table_exists(model._meta.db_table):
+                raise CommandError(
+                    f"{model._meta.db_table} がありません。manage.py migrate で作成してください。"
+                )
+        raw_format = options.get("raw_format", "auto")
+        parser = options.get("json_parser") or "json"
+        workers = options.get("workers") or 1
+
+        # 1) 入力の指紋
+        extract_stats = ExtractCommand(stdout=self.stdout, stderr=self.stderr).refresh_all(
+            raw_dir, extract_dir, raw_format=raw_format, parser=parser, workers=workers
+        )
+        fingerprint = self.input_fingerprint({
+            "move": extract.stamps_digest(extract.source_stamps(move_dir, raw_format)),
+            "pokemon-pokemon": extract_stats["pokemon-pokemon"].digest,
+        })
+        row = DataVersion.objects.filter(name=self.DATA_VERSION_NAME).first()
+        if not options.get("force") and row is not None and row.fingerprint == fingerprint:
+            self.stdout.write(f"入力に変更はありません (指紋 {fingerprint[:12]})。Move / PokemonMove はそのままです。")
+            return
+
+        # 2) Move
+        moves = self.build_moves(move_dir, raw_format=raw_format, parser=parser, workers=workers)
+        move_ids = {move.move_id for move in moves}
+
+        # 3) PokemonMove (抽出ファイルの move_generation_0X から)
+        pokemon_data_map = extract.load(extract.extract_path(extract_dir, "pokemon-pokemon"), parser=parser)
+        entries, unknown_moves = self.build_learnsets(pokemon_data_map, move_ids)
+        if unknown_moves:
+            self.stderr.write(
+                f"[WARN] move データに無い技 {len(unknown_moves)} 種を含む行は登録しませんでした "
+                f"(例: move_id {', '.join(str(move_id) for move_id in sorted(unknown_moves)[:5])})。"
+            )
+
+        update_fields = [
+            field.name for field in Move._meta.concrete_fields if not field.primary_key
+        ]
+        with transaction.atomic():
+            PokemonMove.objects.all().delete()
+            Move.objects.exclude(move_id__in=[move.move_id for move in moves]).delete()
+            Move.objects.bulk_create(
+                moves,
+                batch_size=self.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["move_id"],
+                update_fields=update_fields,
+            )
+            self.insert_rows(PokemonMove, self.LEARNSET_COLUMNS, entries)
+            DataVersion.objects.update_or_create(name=self.DATA_VERSION_NAME, defaults={"fingerprint": fingerprint})
+
+        self.stdout.write(
+            f"Move {len(moves)} 件 / PokemonMove {len(entries)} 件 "
+            f"({len(pokemon_data_map)} pokemon) を登録しました。"
+        )
+
+    def insert_rows(self, model, columns: Tuple[str, ...], rows: List[tuple]) -> None:
+        """
+        行 (columns の順のタプル) を INSERT ... VALUES の executemany で入れる。
+        PokemonMove は数十万行になり、モデルのインスタンスを作る bulk_create では時間の大半が
+        Python 側の変換に使われるため、型変換の要らない値をそのまま渡す。
+        """
+        with connection.cursor() as cursor:
+            quote = connection.ops.quote_name
+            sql = (
+                f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(column) for column in columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))})"
+            )
+            progress = tqdm(total=len(rows), desc=f"{model.__name__} を登録中")
+            for start in range(0, len(rows), self.INSERT_CHUNK_SIZE):
+                chunk = rows[start:start + self.INSERT_CHUNK_SIZE]
+                cursor.executemany(sql, chunk)
+                progress.update(len(chunk))
+            progress.close()
+
+    def input_fingerprint(self, input_digests: Dict[str, str]) -> str:
+        sha1 = hashlib.sha1()
+        sha1.update(f"records-version:{self.RECORDS_VERSION}\n".encode())
+        for module in self.RECORD_SOURCES:
+            sha1.update(Path(module.__file__).read_bytes())
+        for name in sorted(input_digests):
+            sha1.update(f"{name}:{input_digests[name]}\n".encode())
+        return sha1.hexdigest()
+
+    def build_moves(self, move_dir: Path, raw_format: str = "auto", parser: str = "json", workers: int = 1) -> List[Move]:
+        jobs = []
+        if resolve_layout(move_dir, raw_format) == PackStore.format_name:
+            with PackReader(move_dir) as reader:
+                ids = reader.ids()
+            for start in range(0, len(ids), RegisterCommand.LOAD_CHUNK_SIZE):
+                chunk = ids[start:start + RegisterCommand.LOAD_CHUNK_SIZE]
+                jobs.append(("move", loader.load_pack_ids, (str(move_dir), chunk, parser, "move")))
+        else:
+            paths = sorted(str(path) for path in move_dir.glob("*.json"))
+            for start in range(0, len(paths), RegisterCommand.LOAD_CHUNK_SIZE):
+                chunk = paths[start:start + RegisterCommand.LOAD_CHUNK_SIZE]
+                jobs.append(("move", loader.load_files, (chunk, parser, "move")))
+
+        moves: List[Move] = []
+        progress = tqdm(total=len(jobs), desc=f"Loading move ({parser}, workers={workers})")
+
+        def collect(_: str, result: loader.LoadResult) -> None:
+            loaded, errors = result
+            for id_str, data in loaded:
+                moves.append(self.to_move(id_str, data))
+            for where, message in errors:
+                self.stderr.write(f"[ERROR] {where}: {message}")
+            progress.update()
+
+        loader.run_jobs(jobs, workers, collect)
+        progress.close()
+        moves.sort(key=lambda move: move.move_id)
+        return moves
+
+    def to_move(self, id_str: str, data: dict) -> Move:
+        names = {name_info["language"]["name"]: name_info.get("name") for name_info in data.get("names", [])}
+        type_name = data.get("type", {}).get("name")
+        return Move(
+            move_id=data.get("id") or int(id_str),
+            name=data.get("name", ""),
+            ja=names.get("ja-Hrkt") or names.get("ja"),
+            type=RegisterCommand.TYPE_MAP.get(type_name, type_name),
+            damage_class=data.get("damage_class", {}).get("name"),
+            power=data.get("power"),
+            accuracy=data.get("accuracy"),
+            pp=data.get("pp"),
+            priority=data.get("priority"),
+            generation=self.parse_generation(data.get("generation", {}).get("name")),
+            move_json_file=f"move/{id_str}.json",
+        )
+
+    def parse_generation(self, name: Optional[str]) -> Optional[int]:
+        # "generation-iii" -> 3
+        if not name:
+            return None
+        return GENERATION_NUMBERS.get(name.rsplit("-", 1)[-1])
+
+    def build_learnsets(
+        self,
+        pokemon_data_map: Dict[str, dict],
+        move_ids: Set[int],
+    ) -> Tuple[List[Tuple[str, int, int, str, int]], Set[int]]:
+        """
+        (pokemon_id, move_id, generation, learn_method, level) のリストと、move_ids に無かった技IDの集合を返す。
+        """
+        entries: List[Tuple[str, int, int, str, int]] = []
+        unknown_moves: Set[int] = set()
+        for pokemon_id in sorted(pokemon_data_map):
+            pokemon_data = pokemon_data_map[pokemon_id]
+            fields = pokemon_data.get(learnset.PRECOMPUTED_KEY)
+            if fields is None:
+                fields = learnset.generation_fields(pokemon_data.get("moves", []))
+            for generation in learnset.GENERATION_VERSION_GROUPS:
+                for entry in learnset.decode(fields.get(learnset.move_field(generation))):
+                    if entry["move_id"] not in move_ids:
+                        unknown_moves.add(entry["move_id"])
+                        continue
+                    entries.append((pokemon_id, entry["move_id"], generation, entry["method"], entry["level"]))
+        return entries, unknown_moves
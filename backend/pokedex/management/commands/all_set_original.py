@@ -1,87 +1,53 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from pokedex.models.data_version import DataVersion
 from pokedex.models.pokemon import Pokemon
+from pokedex.register import grouping, loader, regions, swap
 
 class Command(BaseCommand):
     help = (
-        "全 Pokemon レコードについて、まず group と original を 初期化して設定。\n"
-
+        "全 Pokemon レコードについて、group と original (と、それに依存する in_<地方>) を設定し直す。\n"
+        "all_register が登録時に同じ割り当てを行うため、DB を直接編集した後などに使う。"
     )
 
-    def handle(self, *args, **options):
-        # 1. すべてのレコードの group と original を初期化（nullに設定）
-        count_init = Pokemon.objects.all().update(group=None, original=None)
-        self.stdout.write(f"Initialized {count_init} records: group and original set to null.")
-
-        to_update = []
+    BATCH_SIZE = 500  # bulk_update 1 文あたりの行数
 
-        # 2. species_id ごとに処理（各 species 内でグループ番号は 1 からスタート）
-        species_ids = Pokemon.objects.values_list('species_id', flat=True).distinct()
-        for species_id in species_ids:
-            pokemons = list(Pokemon.objects.filter(species_id=species_id))
-            # グループ化: キーは (ability_*, type_*, base_*, sub_ja_key) のタプル
-            # sub_ja_key は、p.sub_ja が "gmax" の場合に "gmax"、それ以外は None とする
-            groups = {}
-            for p in pokemons:
-                sub_ja_key = p.sub_ja if p.sub_ja == "gmax" else None
-                key = (
-                    p.ability_01,
-                    p.ability_02,
-                    p.ability_03,
-                    p.type_first,
-                    p.type_second,
-                    p.base_h,
-                    p.base_a,
-                    p.base_b,
-                    p.base_c,
-                    p.base_d,
-                    p.base_s,
-                    sub_ja_key,
-                )
-                groups.setdefault(key, []).append(p)
-
-            group_number = 1  # species 内のグループ番号は 1 からスタート
-            for key, group in groups.items():
-                # 各グループのレコードにグループ番号を設定
-                for p in group:
-                    p.group = group_number
-
-                if len(group) == 1:
-                    # グループが1件の場合 → そのレコードを original=True とする
-                    p = group[0]
-                    p.original = True
-                    self.stdout.write(f"Set {p.unique_id} original=True (unique group, group {group_number})")
-                else:
-                    # グループが複数件の場合
-                    # まず、unique_id の末尾が "00" のレコードを抽出
-                    records_00 = [p for p in group if p.unique_id[-2:] == "00"]
-                    records_non00 = [p for p in group if p.unique_id[-2:] != "00"]
+    def handle(self, *args, **options):
+        # 1. 全列と content_hash を 1 回のクエリで読む（書き換えた行の content_hash を求め直すため）
+        region_fields = [regions.region_field(region) for region in regions.REGIONS]
+        rows = list(Pokemon.objects.values(*Pokemon.record_fields(), "content_hash"))
 
-                    if records_00:
-                        # グループ内に "00" レコードが存在する場合：
-                        # → "00" レコードは必ず original=True
-                        for p in records_00:
-                            p.original = True
-                            self.stdout.write(f"Set {p.unique_id} original=True ('00' record, group {group_number})")
-                        # → その他（non-'00'）は original=False
-                        for p in records_non00:
-                            p.original = False
-                            self.stdout.write(f"Set {p.unique_id} original=False (non-'00' record, group {group_number})")
-                    else:
-                        # グループ内に "00" レコードが存在しない場合：
-                        # → 非 "00" レコードの中からソート順で最小のものを original=True とし、残りは original=False
-                        non00_sorted = sorted(records_non00, key=lambda p: p.unique_id)
-                        chosen = non00_sorted[0]
-                        chosen.original = True
-                        self.stdout.write(f"Set {chosen.unique_id} original=True (first non-'00', group {group_number})")
-                        for p in non00_sorted[1:]:
-                            p.original = False
-                            self.stdout.write(f"Set {p.unique_id} original=False (non-'00' duplicate, group {group_number})")
-                group_number += 1
-                to_update.extend(group)
+        # 2. メモリ上で割り当てを求める（all_register と同じ grouping.assign_groups）
+        assignments = grouping.assign_groups(rows)
 
-        # 3. bulk_update による一括更新（group, original 両方のフィールドを更新）
+        # 3. 値が変わる行だけを、BATCH_SIZE 件ずつ更新する
+        #    in_<地方> は original を使うので、新しい original で求め直す（all_register と同じ regions.membership）
+        #    content_hash も新しい値で求め直す（all_register の差分登録は content_hash が同じ行を読み飛ばすので、
+        #    古いままだと次の all_register が DB の値を直さない）
+        to_update = []
+        for row in rows:
+            current_hash = row.pop("content_hash")
+            group, original = assignments[row["unique_id"]]
+            membership = regions.membership({**row, "original": original})
+            updated = {**row, "group": group, "original": original, **membership}
+            content_hash = loader.record_hash(updated)
+            if updated != row or content_hash != current_hash:
+                to_update.append(Pokemon(
+                    unique_id=row["unique_id"], group=group, original=original, content_hash=content_hash, **membership
+                ))
         if to_update:
-            Pokemon.objects.bulk_update(to_update, ['group', 'original'])
-            self.stdout.write(self.style.SUCCESS(f"Updated {len(to_update)} records with new group numbers and original flags."))
+            with transaction.atomic():
+                Pokemon.objects.bulk_update(
+                    to_update, ["group", "original", *region_fields, "content_hash"], batch_size=self.BATCH_SIZE
+                )
+                # 指紋はそのままで更新時刻だけ進め、api のレスポンスキャッシュに古い版を使わせない
+                # (all_register と同じく、DataVersion の表が無ければ何もしない)
+                if swap.table_exists(DataVersion._meta.db_table):
+                    DataVersion.objects.filter(name=DataVersion.POKEMON).update(updated_at=timezone.now())
+            self.stdout.write(self.style.SUCCESS(
+                f"Updated {len(to_update)} of {len(rows)} records with new group numbers and original flags."
+            ))
         else:
-            self.stdout.write(self.style.SUCCESS("No records needed updating."))
+            self.stdout.write(self.style.SUCCESS(f"No records needed updating ({len(rows)} records checked)."))
@@ -0,0 +1,240 @@
+# check_query_plans.py
+
+from __future__ import annotations
+
+import re
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import KeysetPagination
+from api.views import GalarPokemonListView, NationalPokemonListView, PaldeaPokemonListView
+from pokedex.models.pokemon import Pokemon
+from pokedex.register import swap
+
+# (名前, ビュー, クエリパラメータ)。フロントエンドの一覧でよく使う絞り込みの形
+QUERY_SHAPES = [
+    ("national", NationalPokemonListView, {}),
+    ("national h>=100", NationalPokemonListView, {"h_op": "gte", "h_line": "100"}),
+    ("galar s>=100", GalarPokemonListView, {"s_op": "gte", "s_line": "100"}),
+    ("paldea t>=500 a>=100", PaldeaPokemonListView, {"t_op": "gte", "t_line": "500", "a_op": "gte", "a_line": "100"}),
+    ("paldea b=100", PaldeaPokemonListView, {"b_op": "eq", "b_line": "100"}),
+    (
+        "national all stats",
+        NationalPokemonListView,
+        {f"{key}_op": "lte" for key in "habcdst"} | {f"{key}_line": "255" for key in "habcds"} | {"t_line": "800"},
+    ),
+    # 深いページ (limit / offset)。同じ位置からのカーソル方式は cursor_shapes() が実データから作る
+    ("national offset 1200", NationalPokemonListView, {"offset": "1200"}),
+]
+DEEP_OFFSET = 1200
+BENCH_SUFFIX = "__bench"
+OFFSET_PATTERN = re.compile(r"\bOFFSET (\d+)")
+
+
+class Command(BaseCommand):
+    """
+    地方の一覧 (api の National / Galar / Paldea) が実際に発行する SQL (件数の COUNT とページの SELECT) を
+    EXPLAIN QUERY PLAN にかけ、索引を使っていること（表の全件走査・並べ替えの一時 B-tree が無いこと）を確かめる。
+    索引を使わない形があれば CommandError で終わる。SQLite のみ。
+
+    --benchmark を付けると、本番の行を --scales 倍に複製した表 (pokedex_pokemon__bench) を作り、
+    同じ SQL の所要時間 (--repeat 回の p50 / p99) を索引なし / あり (Pokemon.Meta.indexes) で比べる。表は最後に消す。
+
+    Usage:
+      python manage.py check_query_plans
+      python manage.py check_query_plans --benchmark --scales 1 10 100
+      python manage.py check_query_plans --benchmark --scales 10 100 --repeat 200   # p99 まで見る
+    """
+
+    help = "EXPLAIN the SQL the regional list views run and fail when a common filter shape does not use an index."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Also time the same SQL on copies of the table scaled by --scales, without and with the indexes.",
+        )
+        parser.add_argument(
+            "--scales",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100],
+            help="With --benchmark: row-count multipliers to time.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="With --benchmark: runs per query shape. p50 and p99 are reported; use 100+ for a meaningful p99.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor != "sqlite":
+            raise CommandError("check_query_plans は SQLite の EXPLAIN QUERY PLAN のみに対応しています。")
+        if not swap.table_exists(Pokemon._meta.db_table):
+            raise CommandError(f"{Pokemon._meta.db_table} がありません。先に all_register を実行してください。")
+        pending = swap.unapplied_migrations(Pokemon._meta.app_label)
+        if pending:
+            raise CommandError(
+                f"適用されていないマイグレーションがあります ({', '.join(pending)})。先に manage.py migrate を実行してください。"
+            )
+
+        shapes = {
+            name: self.view_queries(view_class, params)
+            for name, view_class, params in QUERY_SHAPES + self.cursor_shapes()
+        }
+
+        failures = []
+        for name, queries in shapes.items():
+            for sql in queries:
+                plan = self.explain(sql)
+                ok = self.uses_index(plan, Pokemon._meta.db_table)
+                self.stdout.write(f"{'OK  ' if ok else 'NG  '}{name}: {sql.split(' FROM ')[0][:40]}...")
+                for line in plan:
+                    self.stdout.write(f"        {line}")
+                if not ok:
+                    failures.append(name)
+
+        if options.get("benchmark"):
+            self.benchmark(shapes, options.get("scales") or [1], max(1, options.get("repeat") or 1))
+
+        if failures:
+            raise CommandError(
+                f"索引を使っていない形があります: {', '.join(sorted(set(failures)))}。"
+                "Pokemon.Meta.indexes と本番の索引が揃っているか確かめてください (manage.py migrate で揃えます)。"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(shapes)} 通りの絞り込みはすべて索引を使っています。"))
+
+    def view_queries(self, view_class, params: Dict[str, str]) -> List[str]:
+        """
+        ビュー (get_row_queryset) とページネーションが発行する SQL を、パラメータを埋めた文字列で返す。
+        """
+        view = view_class()
+        view.request = Request(APIRequestFactory().get("/", params))
+        view.format_kwarg = None
+        with CaptureQueriesContext(connection) as context:
+            list(view.paginate_queryset(view.get_row_queryset()))
+        return [query["sql"] for query in context.captured_queries]
+
+    def cursor_shapes(self) -> list:
+        """
+        全国の一覧の DEEP_OFFSET 番目の行をカーソルにした、次 / 前のページの形（行が無ければ空）。
+        """
+        keys = list(
+            Pokemon.objects.filter(in_national=True)
+            .order_by(*KeysetPagination.ordering)
+            .values_list(*KeysetPagination.ordering)[:DEEP_OFFSET]
+        )
+        if not keys:
+            return []
+        ja, unique_id = keys[-1]
+        return [
+            (
+                f"national cursor {direction}",
+                NationalPokemonListView,
+                {"pagination": "cursor", "cursor": KeysetPagination().encode_cursor((direction[0], ja, unique_id))},
+            )
+            for direction in ("next", "prev")
+        ]
+
+    def explain(self, sql: str) -> List[str]:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def uses_index(self, plan: List[str], db_table: str) -> bool:
+        # "SCAN <表>" だけ (USING INDEX が無い) は全件走査、"USE TEMP B-TREE FOR ORDER BY" は並べ替え
+        for line in plan:
+            if "TEMP B-TREE" in line:
+                return False
+            if line.startswith(("SCAN", "SEARCH")) and db_table in line and "USING" not in line:
+                return False
+        return True
+
+    # --------------------------------------------------
+    # ベンチマーク
+    # --------------------------------------------------
+    def benchmark(self, shapes: Dict[str, List[str]], scales: List[int], repeat: int) -> None:
+        live_table = Pokemon._meta.db_table
+        bench = swap.table_model(Pokemon, live_table + BENCH_SUFFIX)
+        bench_table = bench._meta.db_table
+        quote = connection.ops.quote_name
+        # 索引の名前はデータベース全体で一意なので、本番と別の名前で作る
+        indexes = [
+            models.Index(fields=index.fields, name=f"{index.name}_bench") for index in Pokemon._meta.indexes
+        ]
+        columns = [field.column for field in Pokemon._meta.local_fields]
+        select = ", ".join(
+            f"{quote(column)} || '~' || %s" if column == Pokemon._meta.pk.column else quote(column)
+            for column in columns
+        )
+
+        self.stdout.write(
+            f"\n{'shape':<24}{'rows':>9}{'no index p50':>14}{'p99':>12}{'indexed p50':>14}{'p99':>12}{'speedup':>10}"
+        )
+        try:
+            for scale in scales:
+                with connection.schema_editor() as editor:
+                    if swap.table_exists(bench_table):
+                        editor.delete_model(bench)
+                    editor.create_model(bench)
+                    for copy in range(max(1, scale)):
+                        editor.execute(
+                            f"INSERT INTO {quote(bench_table)} ({', '.join(quote(column) for column in columns)}) "
+                            f"SELECT {select} FROM {quote(live_table)}",
+                            (str(copy),),
+                        )
+                row_count = bench.objects.count()
+
+                timings: Dict[str, List[Tuple[float, float]]] = {}
+                for indexed in (False, True):
+                    if indexed:
+                        with connection.schema_editor() as editor:
+                            for index in indexes:
+                                editor.add_index(bench, index)
+                    for name, queries in shapes.items():
+                        # 深いページの OFFSET も行数に合わせて scale 倍にし、カーソル方式と同じ位置を読む
+                        bench_queries = [
+                            OFFSET_PATTERN.sub(
+                                lambda match: f"OFFSET {int(match.group(1)) * scale}",
+                                sql.replace(quote(live_table), quote(bench_table)),
+                            )
+                            for sql in queries
+                        ]
+                        timings.setdefault(name, []).append(self.time_queries(bench_queries, repeat))
+
+                # speedup は p50 どうしの比
+                for name, ((plain_p50, plain_p99), (indexed_p50, indexed_p99)) in timings.items():
+                    self.stdout.write(
+                        f"{name:<24}{row_count:>9}{plain_p50 * 1000:>12.2f}ms{plain_p99 * 1000:>10.2f}ms"
+                        f"{indexed_p50 * 1000:>12.2f}ms{indexed_p99 * 1000:>10.2f}ms"
+                        f"{plain_p50 / indexed_p50 if indexed_p50 else 0:>9.1f}x"
+                    )
+        finally:
+            with connection.schema_editor() as editor:
+                if swap.table_exists(bench_table):
+                    editor.delete_model(bench)
+
+    def time_queries(self, queries: List[str], repeat: int) -> Tuple[float, float]:
+        """
+        queries をまとめて repeat 回実行し、1 回あたりの所要時間 (秒) の p50 と p99 を返す。
+        """
+        samples: List[float] = []
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for sql in queries:
+                    cursor.execute(sql)
+                    cursor.fetchall()
+                samples.append(time.perf_counter() - start)
+        if len(samples) < 2:
+            return samples[0], samples[0]
+        # 100 分位の境界 (99 個) のうち 99 番目が p99。"inclusive" は標本の最大値を超えない
+        return statistics.median(samples), statistics.quantiles(samples, n=100, method="inclusive")[98]
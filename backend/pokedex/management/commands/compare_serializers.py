@@ -0,0 +1,79 @@
+# compare_serializers.py
+
+from __future__ import annotations
+
+import statistics
+import time
+from typing import Callable, List
+
+from django.core.management.base import BaseCommand
+
+from api.serializers import DEFAULT_ROW_FIELDS, DefaultSerializer, serialize_default_rows
+from pokedex.models.pokemon import Pokemon
+
+
+class Command(BaseCommand):
+    """
+    一覧の出力を作る 2 つの方法を比べるコマンド。
+
+    - DefaultSerializer: モデルのインスタンス (全列) を SerializerMethodField で変換する従来の方法
+    - serialize_default_rows: values_list(*DEFAULT_ROW_FIELDS) の行から同じ形を作る、一覧のビューが使う方法
+
+    --limit 件ずつのページについて、DB からの読み込み + 変換にかかる時間の中央値を比べる。
+    両者が同じバイト列に描画されることは api/tests.py で確かめる。
+
+    Usage:
+      python manage.py compare_serializers
+      python manage.py compare_serializers --limit 24 48 72 --repeat 50
+    """
+
+    help = "Time DefaultSerializer against serialize_default_rows per list page."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--limit",
+            type=int,
+            nargs="+",
+            default=[24, 48, 72],
+            help="Page sizes to time.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=30,
+            help="Pages timed per page size (the median is reported).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        # ページごとの時間（読み込み + 変換。描画は同じなので含めない）
+        # 全国の一覧と同じクエリで、毎回新しいクエリセットから読む（クエリセットの結果のキャッシュを使わない）
+        def page_queryset():
+            return Pokemon.objects.filter(in_national=True).order_by("ja", "unique_id")
+
+        repeat = max(1, options.get("repeat") or 1)
+        total = page_queryset().count()
+        self.stdout.write(f"{'limit':>6}{'DefaultSerializer':>20}{'values_list':>14}{'speedup':>10}")
+        for limit in options.get("limit") or [24]:
+            offsets = [(index * limit) % max(1, total - limit) for index in range(repeat)]
+
+            def serializer_page(offset: int) -> list:
+                return DefaultSerializer(page_queryset()[offset:offset + limit], many=True).data
+
+            def rows_page(offset: int) -> list:
+                return serialize_default_rows(
+                    page_queryset().values_list(*DEFAULT_ROW_FIELDS, named=True)[offset:offset + limit]
+                )
+
+            before = self.time_pages(serializer_page, offsets)
+            after = self.time_pages(rows_page, offsets)
+            self.stdout.write(
+                f"{limit:>6}{before * 1000:>18.2f}ms{after * 1000:>12.2f}ms{before / after if after else 0:>9.1f}x"
+            )
+
+    def time_pages(self, build: Callable[[int], list], offsets: List[int]) -> float:
+        samples: List[float] = []
+        for offset in offsets:
+            start = time.perf_counter()
+            build(offset)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
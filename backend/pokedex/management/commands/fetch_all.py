@@ -0,0 +1,43 @@
+# fetch_all.py
+
+from __future__ import annotations
+
+from pokedex.fetch.endpoints import ENDPOINT_GROUPS, POKEAPI_BASE_URL
+
+from .fetch_base_command import FetcherBaseCommand
+
+
+class Command(FetcherBaseCommand):
+    """
+    複数グループ・複数サブエンドポイントを 1 プロセス・1 スケジューラでまとめてフェッチするコマンド。
+
+    全対象が同じ同時実行数の枠 (--concurrency) とコネクションプールを共有する。
+    キューは優先度付きで、タイプやバージョングループなどの参照用データ (reference) が
+    pokemon-pokemon や move などの重いクロール (heavy) より先に終わる。
+    fetch_pokemon / fetch_move / fetch_games はこのコマンドの 1 グループ分のプリセット。
+
+    Usage:
+      python manage.py fetch_all
+      python manage.py fetch_all pokemon game
+      python manage.py fetch_all pokemon/pokemon-type game/version-group move/move
+      python manage.py fetch_all --concurrency 32 --priority pokemon/pokemon-species=reference
+    """
+
+    help: str = (
+        "Fetch any set of PokeAPI groups/sub-endpoints concurrently under one scheduler. "
+        "Targets are 'all', '<group>' or '<group>/<sub-endpoint>'."
+    )
+
+    def add_target_arguments(self, parser) -> None:
+        parser.add_argument(
+            "specs",
+            nargs="*",
+            metavar="target",
+            default=["all"],
+            help=f"'all', a group ({', '.join(ENDPOINT_GROUPS)}) or '<group>/<sub-endpoint>'. Default: all.",
+        )
+
+    async def handle_async(self, *args, **options) -> None:
+        base_url: str = options.get("base_url") or POKEAPI_BASE_URL
+        targets = self.resolve_targets(options.get("specs") or ["all"], base_url)
+        await self.run_fetch(targets, **options)
@@ -5,14 +5,32 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-import aiofiles
 import aiohttp
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from tqdm import tqdm
+
+from pokedex.fetch import codec
+from pokedex.fetch.endpoints import (
+    ENDPOINT_GROUPS,
+    POKEAPI_BASE_URL,
+    PRIORITY_CLASSES,
+    endpoint_priority,
+    rebase_url,
+)
+from pokedex.fetch.journal import FetchJournal
+from pokedex.fetch.manifest import FetchManifest
+from pokedex.fetch.retry import EndpointStats, RetryPolicy
+from pokedex.fetch.scheduler import FetchScheduler
+from pokedex.fetch.store import JsonFileStore, PackStore
 
 
 class TZFormatter(logging.Formatter):
@@ -24,12 +42,56 @@ class TZFormatter(logging.Formatter):
         """
         ログレコードの時刻を Django のタイムゾーン設定に基づきフォーマットする。
         """
-        current_time = timezone.localtime(timezone.now())
+        # QueueListener のスレッドで書かれるため、書き込み時刻ではなくレコードの作成時刻を使う
+        current_time = timezone.localtime(datetime.fromtimestamp(record.created, tz=dt_timezone.utc))
         if datefmt:
             return current_time.strftime(datefmt)
         return current_time.isoformat()
 
 
+class JsonLinesFormatter(TZFormatter):
+    """
+    ステージログを 1 行 1 JSON (JSON Lines) で書き出すフォーマッタ。
+
+    extra={"event": ..., "fields": {...}} で渡した値はそのままキーとして展開する。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "event": getattr(record, "event", "message"),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+@dataclass
+class FetchStage:
+    """
+    1 つのサブエンドポイントを 1 ステージ分フェッチする間に共有する状態。
+    """
+
+    group_name: str
+    sub_name: str
+    stage: int
+    json_dir: Path
+    logger: logging.Logger
+    manifest: FetchManifest
+    store: JsonFileStore | PackStore
+    scheduler: FetchScheduler
+    stats: EndpointStats
+    raw: bool = False
+    validate: bool = False
+    journal: Optional[FetchJournal] = None
+    # 依存関係をたどるクロール用: ボディから参照先の URL を取り出す関数と、見つかった URL
+    follow: Optional[Callable[[bytes], List[str]]] = None
+    discovered: Set[str] = field(default_factory=set)
+    # キューの優先度 (endpoints.PRIORITY_CLASSES の値。小さいほど先)
+    priority: int = 0
+
+
 class FetcherBaseCommand(BaseCommand):
     """
     PokeAPIなどからデータを非同期でフェッチし、
@@ -38,30 +100,503 @@ class FetcherBaseCommand(BaseCommand):
     【特徴】
     - Python の asyncio を活用した非同期 HTTP リクエスト (via aiohttp)
     - pathlib.Path を使用したパス操作
-    - Djangoのタイムゾーンを取り入れたログフォーマット (TZFormatter)
+    - Djangoのタイムゾーンを取り入れた JSON Lines のステージログ (JsonLinesFormatter)
+    - ログの書き込みは QueueHandler / QueueListener で別スレッドに任せ、イベントループでファイル I/O をしない
+    - アイテムごとの統計 (バイト数・レイテンシ・ステータス) はメモリ上で集計し、ステージごとに 1 レコードだけ書く
     - ステージ管理 (01xxx.log, 02xxx.log, ... と stage_tracker.log)
+    - FetchScheduler による同時実行数の制御と、全エンドポイント共通のコネクションプール
+    - アイテム単位のジャーナル (01xxx.journal, ...) による中断からの再開 (--resume)
+    - 保存形式は 1 件 1 ファイル (files) か、圧縮パック (pack) を選べる (--storage)
+    - JSON の整形・検証・圧縮は既定ではその場で行う。--decode-workers N でプロセスプール (spawn) に逃がせる
+    - 複数グループを 1 つのスケジューラで同時にフェッチし、参照用の小さなエンドポイントを優先する (--priority)
+
+    グループごとのコマンド (fetch_pokemon など) は group_name と endpoints ({サブエンドポイント名: 一覧URL}) を
+    定義するだけのプリセット。任意のグループの組み合わせは fetch_all で指定する。
     """
 
     max_stage: int = 99  # ステージ番号の最大値
+    group_name: str = ""
+    endpoints: Dict[str, str] = {}
+
+    default_concurrency: int = 16  # グローバルな同時リクエスト数の既定値
+    default_per_host: int = 8  # ホストごとの同時接続数の既定値
+
+    # --storage で選べる保存形式
+    STORAGE_CLASSES = {
+        JsonFileStore.format_name: JsonFileStore,
+        PackStore.format_name: PackStore,
+    }
+
+    def add_arguments(self, parser) -> None:
+        """
+        コマンドライン引数: 対象 (add_target_arguments) と同時実行数などのオプション
+        """
+        self.add_target_arguments(parser)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=self.default_concurrency,
+            help="Maximum number of in-flight requests across all endpoints.",
+        )
+        parser.add_argument(
+            "--per-host",
+            type=int,
+            default=self.default_per_host,
+            help="Maximum number of in-flight requests per host.",
+        )
+        parser.add_argument(
+            "--max-retries",
+            type=int,
+            default=RetryPolicy.max_retries,
+            help="Retries for 429/5xx/connection errors (jittered exponential backoff).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Resume an interrupted stage: only fetch items that are missing or failed.",
+        )
+        parser.add_argument(
+            "--storage",
+            choices=sorted(self.STORAGE_CLASSES),
+            default=JsonFileStore.format_name,
+            help="'files': one indented JSON file per item. 'pack': compressed append-only pack.seg/pack.idx per sub-endpoint.",
+        )
+        parser.add_argument(
+            "--raw",
+            action="store_true",
+            help="Store response bodies byte-for-byte instead of re-encoding them with indent=4.",
+        )
+        parser.add_argument(
+            "--validate",
+            action="store_true",
+            help="With --raw: parse each body in the worker pool and check its id against the URL.",
+        )
+        parser.add_argument(
+            "--decode-workers",
+            type=int,
+            default=0,
+            help="Worker processes (spawned) for JSON re-encoding/validation/compression. 0 = on the event loop.",
+        )
+        parser.add_argument(
+            "--base-url",
+            default=POKEAPI_BASE_URL,
+            help="API base URL, e.g. a local stand-in started with 'manage.py pokeapi_mock'.",
+        )
+        parser.add_argument(
+            "--log-level",
+            choices=["debug", "info", "warning", "error"],
+            default="info",
+            help="Stage log level. 'debug' also logs the list endpoints' responses.",
+        )
+        parser.add_argument(
+            "--priority",
+            action="append",
+            default=[],
+            metavar="GROUP/SUB=CLASS",
+            help=f"Override a sub-endpoint's priority class ({', '.join(PRIORITY_CLASSES)}). Repeatable.",
+        )
+
+    def add_target_arguments(self, parser) -> None:
+        """
+        フェッチ対象の引数: [all|サブエンドポイント名]
+        """
+        parser.add_argument(
+            "sub_name",
+            nargs="?",
+            default="all",
+            help=f"Endpoint category ({', '.join(self.endpoints)}) or 'all'.",
+        )
+
+    async def handle_async(self, *args, **options) -> None:
+        """
+        非同期エントリーポイント:
+        1) sub_name == "all" -> endpoints 全部
+        2) 特定のサブエンドポイントのみ
+        """
+        sub_name: str = options.get("sub_name", "all")
+        if sub_name != "all" and sub_name not in self.endpoints:
+            raise CommandError(f"不正なカテゴリ: {sub_name}")
+        spec = self.group_name if sub_name == "all" else f"{self.group_name}/{sub_name}"
+
+        base_url: str = options.get("base_url") or POKEAPI_BASE_URL
+        await self.run_fetch(self.resolve_targets([spec], base_url), **options)
+
+    def resolve_targets(self, specs: List[str], base_url: str) -> List[Tuple[str, str, str]]:
+        """
+        "all" / "{group}" / "{group}/{sub}" の指定を (group_name, sub_name, 一覧URL) のリストにする。
+        重複は除き、指定順を保つ。
+        """
+        pairs: List[Tuple[str, str]] = []
+        for spec in specs:
+            if spec == "all":
+                pairs.extend((group, sub) for group, endpoints in ENDPOINT_GROUPS.items() for sub in endpoints)
+                continue
+            group, _, sub = spec.partition("/")
+            if group not in ENDPOINT_GROUPS:
+                raise CommandError(f"不正なグループ: {group}")
+            if not sub:
+                pairs.extend((group, name_) for name_ in ENDPOINT_GROUPS[group])
+            elif sub in ENDPOINT_GROUPS[group]:
+                pairs.append((group, sub))
+            else:
+                raise CommandError(f"不正なカテゴリ: {spec}")
+
+        return [
+            (group, sub, rebase_url(ENDPOINT_GROUPS[group][sub], base_url))
+            for group, sub in dict.fromkeys(pairs)
+        ]
+
+    def parse_priority_overrides(self, values: List[str]) -> Dict[Tuple[str, str], int]:
+        """
+        --priority の "group/sub=class" を {(group, sub): 優先度} にする。
+        """
+        overrides: Dict[Tuple[str, str], int] = {}
+        for value in values:
+            spec, _, class_name = value.partition("=")
+            group, _, sub = spec.partition("/")
+            if sub not in ENDPOINT_GROUPS.get(group, {}):
+                raise CommandError(f"--priority の対象が不正です: {spec}")
+            if class_name not in PRIORITY_CLASSES:
+                raise CommandError(
+                    f"--priority のクラスが不正です: {class_name} ({', '.join(PRIORITY_CLASSES)} のいずれか)"
+                )
+            overrides[(group, sub)] = PRIORITY_CLASSES[class_name]
+        return overrides
+
+    def priority_for(self, group_name: str, sub_name: str) -> int:
+        """
+        サブエンドポイントの優先度。--priority の指定があればそちらを使う。
+        """
+        overrides = getattr(self, "priority_overrides", {})
+        return overrides.get((group_name, sub_name), endpoint_priority(group_name, sub_name))
+
+    def create_scheduler(self, **options) -> FetchScheduler:
+        """
+        オプション (--concurrency, --per-host, --max-retries, --decode-workers) から FetchScheduler を作る。
+        ベンチマーク (fetch_benchmark) から参照できるように self.scheduler にも残す。
+        """
+        try:
+            scheduler = FetchScheduler(
+                concurrency=options.get("concurrency") or self.default_concurrency,
+                per_host=options.get("per_host") or self.default_per_host,
+                retry_policy=RetryPolicy(max_retries=max(0, options.get("max_retries", RetryPolicy.max_retries))),
+                decode_workers=options.get("decode_workers", 0) or 0,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.scheduler = scheduler
+        self.endpoint_stats: List[EndpointStats] = []
+        return scheduler
+
+    async def run_fetch(self, targets: List[Tuple[str, str, str]], **options) -> None:
+        """
+        (group_name, sub_name, 一覧URL) のリストをまとめてフェッチする。
+        全ターゲットが 1 つの FetchScheduler (1 セッション, 1 キュー) を共有する。
+        """
+        scheduler = self.create_scheduler(**options)
+        # 優先度の高いものから一覧を取りに行く（アイテムの順序は scheduler の優先度付きキューが決める）
+        targets = sorted(targets, key=lambda target: self.priority_for(target[0], target[1]))
+        async with scheduler:
+            await asyncio.gather(
+                *(
+                    self.fetch_endpoint(
+                        scheduler,
+                        group_name,
+                        sub_name,
+                        list_endpoint,
+                        resume=options.get("resume", False),
+                        storage=options.get("storage") or JsonFileStore.format_name,
+                        raw=options.get("raw", False),
+                        validate=options.get("validate", False),
+                    )
+                    for group_name, sub_name, list_endpoint in targets
+                )
+            )
+        self.write_scheduler_summary(scheduler)
+
+    def write_scheduler_summary(self, scheduler: FetchScheduler) -> None:
+        """
+        スループット・イベントループ遅延・同時実行数の絞り込みを標準出力にまとめる。
+        """
+        total, elapsed, rate = scheduler.throughput()
+        self.stdout.write(
+            f"{total} 件を {elapsed:.1f} 秒で処理しました ({rate:.1f} items/s, "
+            f"concurrency={scheduler.concurrency}, per_host={scheduler.per_host}, 失敗={scheduler.failed})"
+        )
+        self.stdout.write(scheduler.lag_monitor.summary())
+        limiter = scheduler.limiter
+        if limiter is not None and limiter.decreases:
+            self.stdout.write(
+                f"混雑により同時実行数を {limiter.decreases} 回絞りました "
+                f"(最小 {limiter.lowest_limit:.1f} / 終了時 {limiter.current_limit})"
+            )
+
+    def open_stage(
+        self,
+        scheduler: FetchScheduler,
+        group_name: str,
+        sub_name: str,
+        storage: str = JsonFileStore.format_name,
+        raw: bool = False,
+        validate: bool = False,
+        follow: Optional[Callable[[bytes], List[str]]] = None,
+    ) -> FetchStage:
+        """
+        サブエンドポイントの現在のステージを決め、ロガー・台帳・保存先をまとめた FetchStage を返す。
+        """
+        current_stage = self.get_current_stage(group_name, sub_name)
+
+        # リセット判定
+        if current_stage > self.max_stage:
+            self.reset_stages(group_name, sub_name)
+            current_stage = 1
+
+        logger = self.setup_logger(group_name, sub_name, current_stage)
+
+        json_dir = self.get_json_dir(group_name, sub_name)
+        json_dir.mkdir(parents=True, exist_ok=True)
+
+        stage = FetchStage(
+            group_name=group_name,
+            sub_name=sub_name,
+            stage=current_stage,
+            json_dir=json_dir,
+            logger=logger,
+            manifest=FetchManifest(json_dir),
+            store=self.STORAGE_CLASSES[storage](json_dir),
+            scheduler=scheduler,
+            stats=EndpointStats(name=f"{group_name}/{sub_name}"),
+            raw=raw,
+            validate=validate,
+            follow=follow,
+            priority=self.priority_for(group_name, sub_name),
+        )
+        self.endpoint_stats.append(stage.stats)
+        return stage
+
+    async def fetch_endpoint(
+        self,
+        scheduler: FetchScheduler,
+        group_name: str,
+        sub_name: str,
+        list_endpoint: str,
+        resume: bool = False,
+        storage: str = JsonFileStore.format_name,
+        raw: bool = False,
+        validate: bool = False,
+    ) -> None:
+        """
+        個別のエンドポイントの一覧を取得し、各アイテムを fetch_items でフェッチする。
+        """
+        stage = self.open_stage(scheduler, group_name, sub_name, storage=storage, raw=raw, validate=validate)
+        logger = stage.logger
+        logger.info(
+            "フェッチ開始: sub_name=%s, stage=%d, endpoint=%s",
+            sub_name,
+            stage.stage,
+            list_endpoint,
+            extra={"event": "stage_start", "fields": {"sub_name": sub_name, "stage": stage.stage, "endpoint": list_endpoint}},
+        )
+
+        try:
+            # 一覧の取得はキューを通さず直接行う（アイテムのフェッチのみキューに積む）
+            resp = await scheduler.fetch(list_endpoint, stage.stats)
+            logger.debug("GET %s - status=%d", list_endpoint, resp.status)
+            data = await scheduler.run_cpu(codec.parse_json, resp.body)
+        except (aiohttp.ClientError, ValueError) as e:
+            logger.error(f"{list_endpoint} の取得に失敗しました: {e}")
+            self.stderr.write("リストの取得に失敗しました。ログを確認してください。")
+            stage.store.close()
+            return
+
+        await self.fetch_items(stage, data.get("results", []), resume=resume, prune=True)
+
+    async def fetch_items(
+        self,
+        stage: FetchStage,
+        items: List[Dict[str, Any]],
+        resume: bool = False,
+        prune: bool = False,
+    ) -> None:
+        """
+        アイテム ({"name", "url"}) を scheduler のキューに積んで保存し、ステージを締める。
+
+        - resume=True の場合、現在のステージのジャーナルで完了済みかつファイルが残っている
+          アイテムはスキップする（stage.follow があれば、保存済みのデータから参照先だけ拾う）
+        - prune=True の場合、items に無い ID を台帳と保存データから取り除く（一覧全体を渡したときだけ使う）
+        """
+        group_name = stage.group_name
+        sub_name = stage.sub_name
+        current_stage = stage.stage
+        logger = stage.logger
+        scheduler = stage.scheduler
+
+        # 標準出力にまとめて出すためのバッファ
+        stdout_messages = []
+
+        total_items = len(items)
+        logger.info("対象アイテム数: %d 件", total_items, extra={"event": "items", "fields": {"count": total_items}})
+        logger.debug("items preview: %s (・・・)", items[:3])  # 先頭3件だけデバッグログに表示
+
+        if total_items == 0:
+            logger.warning(f"サブエンドポイント '{sub_name}' にアイテムが存在しません。")
+            self.stdout.write(f"サブエンドポイント '{sub_name}' にアイテムが存在しません。")
+            stage.store.close()
+            return
+
+        stage.journal = FetchJournal(
+            self.get_journal_path(group_name, sub_name, current_stage),
+            resume=resume,
+        )
+        pending_items = []
+        skipped_items = []
+        for item in items:
+            if resume and self.is_resumable_done(item, stage):
+                skipped_items.append(item)
+            else:
+                pending_items.append(item)
+        if resume:
+            logger.info(
+                "再開: 完了済み %d 件をスキップ, 残り %d 件",
+                len(skipped_items),
+                len(pending_items),
+                extra={"event": "resume", "fields": {"skipped": len(skipped_items), "pending": len(pending_items)}},
+            )
+            self.stdout.write(
+                f"{sub_name}: 完了済み {len(skipped_items)} 件をスキップし、{len(pending_items)} 件を再開します。"
+            )
+
+        # フェッチジョブをキューに積む
+        futures = [
+            scheduler.submit(self.fetch_item, item, stage, priority=stage.priority)
+            for item in pending_items
+        ]
+
+        try:
+            # スキップしたアイテムも参照先はたどる
+            if stage.follow is not None and skipped_items:
+                await asyncio.gather(
+                    *(
+                        self.follow_references(stage, id_num, None)
+                        for id_num in (self.extract_id_from_url(item.get("url", "")) for item in skipped_items)
+                        if id_num is not None
+                    )
+                )
+
+            # tqdm で進捗表示
+            for future in tqdm(
+                asyncio.as_completed(futures),
+                total=len(pending_items),
+                desc=f"{sub_name} をフェッチ中",
+                unit="アイテム"
+            ):
+                try:
+                    result_msg: Optional[str] = await future
+                    if result_msg:
+                        # 返却されたメッセージは成功・失敗を問わず stdout バッファへ
+                        stdout_messages.append(result_msg)
+                except Exception as e:
+                    # 予期しないエラーをキャッチ
+                    error_msg = f"予期しないエラー: {e}"
+                    logger.error(error_msg)
+                    # ここでも stdout バッファへ追加
+                    stdout_messages.append(error_msg)
+
+            if prune:
+                # 一覧から消えた ID は台帳とファイルから取り除く
+                listed_ids = [
+                    id_num
+                    for id_num in (self.extract_id_from_url(item.get("url", "")) for item in items)
+                    if id_num is not None
+                ]
+                for key in stage.manifest.prune(listed_ids):
+                    stage.store.remove(int(key))
+        finally:
+            # 中断されてもそこまでのバリデータと完了 ID は残す
+            stage.store.close()
+            stage.manifest.save()
+            stage.journal.close()
+
+        # tqdm終了後にバッファしていたメッセージを一括出力
+        if stdout_messages:
+            self.stdout.write("\n".join(stdout_messages))
+
+        # アイテムごとの記録はせず、集計値をステージごとに 1 レコードで書く
+        summary = stage.manifest.summary()
+        logger.info(
+            "ステージ集計: %s",
+            summary,
+            extra={
+                "event": "stage_summary",
+                "fields": {
+                    "sub_name": sub_name,
+                    "stage": current_stage,
+                    "items": total_items,
+                    "requests": stage.stats.as_dict(),
+                    "diff": stage.manifest.as_dict(),
+                },
+            },
+        )
+        self.stdout.write(f"{sub_name}: {summary}")
+
+        logger.info(
+            "フェッチ完了: sub_name=%s (stage=%d), dir=%s",
+            sub_name,
+            current_stage,
+            stage.json_dir,
+            extra={
+                "event": "stage_finish",
+                "fields": {"sub_name": sub_name, "stage": current_stage, "priority": stage.priority},
+            },
+        )
+        self.stdout.write(f"{sub_name} (stage={current_stage}) => {stage.json_dir}")
+
+        self.update_stage(group_name, sub_name, current_stage)
+
+    def is_resumable_done(self, item: Dict[str, Any], stage: FetchStage) -> bool:
+        """
+        ジャーナル上で完了済み、かつ保存データが残っているアイテムなら True。
+        """
+        id_num = self.extract_id_from_url(item.get("url", ""))
+        if id_num is None or stage.journal is None:
+            return False
+        return stage.journal.is_completed(id_num) and stage.store.exists(id_num)
+
+    async def fetch_item(self, item: Dict[str, Any], stage: FetchStage) -> Optional[str]:
+        """
+        fetch_and_save を実行し、その結果をジャーナルに記録する。
+        """
+        id_num = self.extract_id_from_url(item.get("url", ""))
+        try:
+            result_msg = await self.fetch_and_save(item, stage)
+        except Exception:
+            if id_num is not None and stage.journal is not None:
+                stage.journal.record(id_num, ok=False)
+            raise
+        if id_num is not None and stage.journal is not None:
+            stage.journal.record(id_num, ok=result_msg is None)
+        return result_msg
 
     async def fetch_and_save(
         self,
-        session: aiohttp.ClientSession,
         item: Dict[str, Any],
-        json_dir: Path,
-        logger: logging.Logger
+        stage: FetchStage,
     ) -> Optional[str]:
         """
-        個別のリソースをフェッチし、JSON に保存する。
-        成功時は「特定条件(IDが100の倍数)でのメッセージ文字列」、
-        それ以外は None、失敗時はエラーメッセージ文字列を返す。
+        個別のリソースを条件付きリクエストでフェッチし、内容が変わっていれば stage.store に保存する。
+        成功時は None、失敗時はエラーメッセージ文字列を返す。
+
+        - 前回の ETag / Last-Modified があれば If-None-Match / If-Modified-Since を付けて送る
+        - 304 もしくはレスポンスボディのハッシュが台帳と一致した場合は書き換えない
+        - 429 / 5xx などの一時的なエラーは stage.scheduler.fetch が再試行する
+        - ボディはイベントループ上ではデコードしない。整形・圧縮・検証は stage.scheduler.run_cpu で行う
 
-        :param session: aiohttp.ClientSession
         :param item: { "name": str, "url": str } を想定
-        :param json_dir: JSONファイルの保存先ディレクトリ
-        :param logger: ロガー
+        :param stage: 保存先ディレクトリ・ロガー・台帳・スケジューラをまとめた FetchStage
         :return: メッセージ文字列 or None
         """
+        logger = stage.logger
         name: str = item.get("name", "unknown")
         url: str = item.get("url", "")
         if not url:
@@ -69,44 +604,94 @@ class FetcherBaseCommand(BaseCommand):
             logger.error(msg)
             return msg
 
-        # 開始時点のデバッグログ
-        logger.debug(f"[fetch_and_save] Fetching item='{name}', url='{url}'")
+        # ID抽出
+        id_num = self.extract_id_from_url(url)
+        if id_num is None:
+            msg = f"{name} の ID を URL={url} から抽出できません。"
+            logger.error(msg)
+            return msg
+
+        manifest = stage.manifest
+        store = stage.store
+
+        # 保存データが残っている場合のみ条件付きリクエストにする
+        headers = manifest.conditional_headers(id_num) if store.exists(id_num) else {}
 
         # URL からデータをフェッチ
         try:
-            async with session.get(url) as response:
-                # レスポンスステータス等をdebugログに残す
-                logger.debug(
-                    f"[fetch_and_save] GET {url} - status={response.status}"
-                )
-                response.raise_for_status()
-                data = await response.json()
+            response = await stage.scheduler.fetch(url, stage.stats, headers=headers)
+            if response.status == 304:
+                manifest.mark_not_modified(id_num)
+                return await self.follow_references(stage, id_num, None)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
         except aiohttp.ClientError as exc:
             msg = f"取得失敗: {name} ({url}): {exc}"
             logger.error(msg)
             return msg
 
-        # ID抽出
-        id_num = self.extract_id_from_url(url)
-        if id_num is None:
-            msg = f"{name} の ID を URL={url} から抽出できません。"
+        # 保存形式に依存しないよう、ハッシュは上流のレスポンスボディそのものから取る
+        sha256 = manifest.content_hash(response.body)
+        if manifest.is_unchanged(id_num, sha256) and store.exists(id_num):
+            manifest.record(id_num, sha256, etag, last_modified)
+            return await self.follow_references(stage, id_num, response.body)
+
+        # 変換（整形・圧縮）と検証はワーカープロセスで行う
+        try:
+            if stage.raw and stage.validate:
+                payload_id = await stage.scheduler.run_cpu(codec.extract_payload_id, response.body)
+                if payload_id is not None and payload_id != id_num:
+                    msg = f"ID 不一致: {name} ({url}) の本文の id={payload_id}"
+                    logger.error(msg)
+                    return msg
+            encoder = store.encoder(stage.raw)
+            encoded = (
+                await stage.scheduler.run_cpu(encoder, response.body)
+                if encoder is not None
+                else response.body
+            )
+        except ValueError as exc:
+            msg = f"JSON として不正です: {name} ({url}): {exc}"
             logger.error(msg)
             return msg
 
-        file_path = json_dir / f"{id_num:05d}.json"
-
-        # JSONファイル書き込み
+        # 書き込み
         try:
-            async with aiofiles.open(file_path, "w", encoding="utf-8") as afp:
-                await afp.write(json.dumps(data, ensure_ascii=False, indent=4))
+            await store.write_encoded(id_num, encoded)
         except OSError as exc:
-            msg = f"{file_path} に書き込めませんでした: {exc}"
+            msg = f"{stage.json_dir} (id={id_num:05d}) に書き込めませんでした: {exc}"
             logger.error(msg)
             return msg
+        manifest.record(id_num, sha256, etag, last_modified)
 
-        # 成功したアイテムも debug ログに残す
-        logger.debug(f"[fetch_and_save] Successfully wrote to {file_path}")
+        return await self.follow_references(stage, id_num, response.body)
 
+    async def follow_references(
+        self,
+        stage: FetchStage,
+        id_num: int,
+        body: Optional[bytes],
+    ) -> Optional[str]:
+        """
+        stage.follow があれば、ボディから参照先の URL を取り出して stage.discovered に加える。
+        body=None (304 や再開時のスキップ) の場合は保存済みのデータから取り出す。
+        成功時は None、失敗時はエラーメッセージ文字列を返す。
+        """
+        if stage.follow is None:
+            return None
+        if body is None:
+            body = await stage.store.read_bytes(id_num)
+            if body is None:
+                msg = f"保存データがありません: {stage.sub_name} id={id_num:05d}"
+                stage.logger.error(msg)
+                return msg
+        try:
+            urls = await stage.scheduler.run_cpu(stage.follow, body)
+        except (ValueError, KeyError, TypeError) as exc:
+            msg = f"参照先を取り出せません: {stage.sub_name} id={id_num:05d}: {exc}"
+            stage.logger.error(msg)
+            return msg
+        stage.discovered.update(urls)
         return None
 
     def extract_id_from_url(self, url: str) -> Optional[int]:
@@ -137,6 +722,13 @@ class FetcherBaseCommand(BaseCommand):
         """
         return Path(settings.BASE_DIR) / "log" / "raw" / group_name / sub_name
 
+    def get_journal_path(self, group_name: str, sub_name: str, current_stage: int) -> Path:
+        """
+        ステージごとのジャーナルファイルのパスを返す。
+        例: BASE_DIR/log/raw/{group_name}/{sub_name}/01{sub_name}.journal
+        """
+        return self.get_log_dir(group_name, sub_name) / f"{current_stage:02d}{sub_name}.journal"
+
     def get_current_stage(self, group_name: str, sub_name: str) -> int:
         """
         stage_tracker.log を読み、現在のステージ番号を返す。存在しなければ 1。
@@ -174,7 +766,7 @@ class FetcherBaseCommand(BaseCommand):
 
     def reset_stages(self, group_name: str, sub_name: str) -> None:
         """
-        01{sub_name}.log ~ 99{sub_name}.log および stage_tracker.log を削除し、ステージをリセット。
+        01{sub_name}.log ~ 99{sub_name}.log とジャーナル、および stage_tracker.log を削除し、ステージをリセット。
         """
         log_dir = self.get_log_dir(group_name, sub_name)
         if not log_dir.exists():
@@ -185,18 +777,25 @@ class FetcherBaseCommand(BaseCommand):
         if tracker_path.exists():
             tracker_path.unlink()
 
-        # 01{sub_name}.log ~ 99{sub_name}.log を削除
+        # 01{sub_name}.log ~ 99{sub_name}.log と同番号のジャーナルを削除
         for stage_num in range(1, self.max_stage + 1):
             log_filename = f"{stage_num:02d}{sub_name}.log"
             file_path = log_dir / log_filename
             if file_path.exists():
                 file_path.unlink()
+            journal_path = self.get_journal_path(group_name, sub_name, stage_num)
+            if journal_path.exists():
+                journal_path.unlink()
 
         self.stdout.write(f"{sub_name} のログファイルをリセットしました。ステージを1に戻します。")
 
     def setup_logger(self, group_name: str, sub_name: str, current_stage: int) -> logging.Logger:
         """
         ステージごとのログファイル (01{sub_name}.log など) をセットアップし、Logger を返す。
+
+        Logger には QueueHandler だけを付け、ファイルへの書き込みは QueueListener のスレッドが行う。
+        コルーチンの中からログを書いてもイベントループはファイル I/O で止まらない。
+        リスナーは handle の終了時 (stop_log_listeners) に止め、溜まったレコードを書き切る。
         """
         log_dir = self.get_log_dir(group_name, sub_name)
         log_dir.mkdir(parents=True, exist_ok=True)
@@ -206,35 +805,47 @@ class FetcherBaseCommand(BaseCommand):
 
         logger_name = f"{group_name}_{sub_name}_logger"
         logger = logging.getLogger(logger_name)
-        # すでにハンドラがあればクリア
+        # すでにハンドラがあればクリア（前回のリスナーは止めて書き切る）
+        previous = self.log_listeners.pop(logger_name, None)
+        if previous is not None:
+            previous.stop()
         if logger.hasHandlers():
             logger.handlers.clear()
-        logger.setLevel(logging.DEBUG)
-
-        # タイムゾーン対応フォーマッタを使用
-        formatter = TZFormatter(
-            fmt="%(asctime)s [%(levelname)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S %Z"
-        )
+        logger.setLevel(getattr(logging, self.log_level.upper()))
+        logger.propagate = False
 
+        # タイムゾーン対応の JSON Lines フォーマッタを使用
         file_handler = logging.FileHandler(stage_log_path, encoding="utf-8")
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(logging.DEBUG)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(JsonLinesFormatter())
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, file_handler)
+        listener.start()
+        self.log_listeners[logger_name] = listener
 
         return logger
 
-    async def handle_async(self, *args, **options) -> None:
+    def stop_log_listeners(self) -> None:
         """
-        非同期タスクのエントリーポイント。サブクラスで実装する。
+        すべてのステージログのリスナーを止め、キューに残ったレコードを書き切ってファイルを閉じる。
         """
-        raise NotImplementedError("サブクラスで handle_async を実装してください。")
+        for listener in self.log_listeners.values():
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        self.log_listeners.clear()
 
     def handle(self, *args, **options) -> None:
         """
         同期メソッド → 非同期メソッドへ移行。
         """
+        self.log_level = options.get("log_level") or "info"
+        self.priority_overrides = self.parse_priority_overrides(options.get("priority") or [])
+        self.log_listeners: Dict[str, QueueListener] = {}
         try:
             asyncio.run(self.handle_async(*args, **options))
         except Exception as e:
             self.stderr.write(f"エラーが発生しました: {e}")
+        finally:
+            self.stop_log_listeners()
@@ -0,0 +1,190 @@
+# fetch_benchmark.py
+
+from __future__ import annotations
+
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.management import call_command, load_command_class
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from pokedex.fetch.retry import EndpointStats
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Command(BaseCommand):
+    """
+    ローカルの PokeAPI モック (pokeapi_mock) を別プロセスで起動し、
+    fetch_pokemon / fetch_move / fetch_games (--commands で fetch_all も) をそれに向けて実行して性能を比べるコマンド。
+
+    出力先は一時ディレクトリ (BASE_DIR を差し替え) なので、手元の data/ や log/ は汚さない。
+    items/s、リクエストの p50/p99 レイテンシ、Python ヒープのピーク (tracemalloc) を表示する。
+
+    Usage:
+      python manage.py fetch_benchmark
+      python manage.py fetch_benchmark --commands fetch_pokemon --items 500 --latency 0.05 --rate-429 0.01
+      python manage.py fetch_benchmark --fixtures data/raw -- --concurrency 32 --storage pack
+      python manage.py fetch_benchmark --commands fetch_all
+    """
+
+    help = "Benchmark the fetch commands against a local PokeAPI stand-in."
+
+    FETCH_COMMANDS = ["fetch_pokemon", "fetch_move", "fetch_games", "fetch_all"]
+    DEFAULT_COMMANDS = ["fetch_pokemon", "fetch_move", "fetch_games"]
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--commands",
+            nargs="+",
+            choices=self.FETCH_COMMANDS,
+            default=self.DEFAULT_COMMANDS,
+        )
+        parser.add_argument("--items", type=int, default=200, help="Synthetic items per resource.")
+        parser.add_argument("--moves", type=int, default=80, help="Length of synthetic pokemon 'moves' arrays.")
+        parser.add_argument("--latency", type=float, default=0.02)
+        parser.add_argument("--jitter", type=float, default=0.01)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--rate-429", type=float, default=0.0)
+        parser.add_argument("--fixtures", default=None, help="Serve this data/raw directory instead of synthetic data.")
+        parser.add_argument("--no-tracemalloc", action="store_true", help="Skip peak-memory tracing (it slows the run).")
+        parser.add_argument(
+            "fetch_args",
+            nargs="*",
+            help="Extra options passed to each fetch command (put them after '--').",
+        )
+
+    def handle(self, *args, **options) -> None:
+        port = self.free_port()
+        base_url = f"http://127.0.0.1:{port}/api/v2"
+        server = self.start_mock(port, options)
+        try:
+            self.wait_for_port(port, server)
+            results = [
+                self.run_one(name, base_url, options)
+                for name in options["commands"]
+            ]
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+        self.report(results)
+
+    # --------------------------------------------------
+    # モックサーバー
+    # --------------------------------------------------
+    def free_port(self) -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def start_mock(self, port: int, options: Dict) -> subprocess.Popen:
+        manage_py = Path(settings.BASE_DIR) / "manage.py"
+        command = [
+            sys.executable, str(manage_py), "pokeapi_mock",
+            "--port", str(port),
+            "--items", str(options["items"]),
+            "--moves", str(options["moves"]),
+            "--latency", str(options["latency"]),
+            "--jitter", str(options["jitter"]),
+            "--error-rate", str(options["error_rate"]),
+            "--rate-429", str(options["rate_429"]),
+        ]
+        if options["fixtures"]:
+            command += ["--fixtures", str(Path(options["fixtures"]).resolve())]
+        return subprocess.Popen(command, env=os.environ.copy(), stdout=subprocess.DEVNULL)
+
+    def wait_for_port(self, port: int, server: subprocess.Popen, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("モックサーバーの起動に失敗しました。")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("モックサーバーが時間内に起動しませんでした。")
+
+    # --------------------------------------------------
+    # 計測
+    # --------------------------------------------------
+    def run_one(self, name: str, base_url: str, options: Dict) -> Dict:
+        command = load_command_class("pokedex", name)
+        use_tracemalloc = not options["no_tracemalloc"]
+
+        with tempfile.TemporaryDirectory(prefix="fetch_benchmark_") as tmp_dir, override_settings(BASE_DIR=tmp_dir):
+            if use_tracemalloc:
+                tracemalloc.start()
+            started = time.perf_counter()
+            call_command(
+                command, "all", "--base-url", base_url, *options["fetch_args"],
+                stdout=io.StringIO(), stderr=io.StringIO(),
+            )
+            elapsed = time.perf_counter() - started
+            peak = 0
+            if use_tracemalloc:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+        # 件数とレイテンシは create_scheduler が残す scheduler / endpoint_stats から読む
+        # (fetch_all も 1 つのスケジューラで全対象を取るので同じ)。残っていなければ 0 と表示せずに止める
+        scheduler = getattr(command, "scheduler", None)
+        if scheduler is None:
+            raise CommandError(
+                f"{name} はスケジューラを残さなかったため、計測できません (create_scheduler を使ってください)。"
+            )
+        stats: List[EndpointStats] = command.endpoint_stats
+        merged = EndpointStats(name=name)
+        for stat in stats:
+            merged.requests += stat.requests
+            merged.attempts += stat.attempts
+            merged.retries += stat.retries
+            merged.failures += stat.failures
+            merged.latencies.extend(stat.latencies)
+
+        items = scheduler.completed + scheduler.failed
+        return {
+            "name": name,
+            "items": items,
+            "elapsed": elapsed,
+            "rate": items / elapsed if elapsed > 0 else 0.0,
+            "p50": merged.percentile(0.5),
+            "p99": merged.percentile(0.99),
+            "retries": merged.retries,
+            "failures": merged.failures,
+            "peak": peak,
+            "lag": scheduler.lag_monitor.summary(),
+        }
+
+    def report(self, results: List[Dict]) -> None:
+        header = f"{'command':<15}{'items':>8}{'sec':>9}{'items/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'retries':>9}{'fail':>6}{'peak MB':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for r in results:
+            self.stdout.write(
+                f"{r['name']:<15}{r['items']:>8}{r['elapsed']:>9.2f}{r['rate']:>10.1f}"
+                f"{r['p50'] * 1000:>9.1f}{r['p99'] * 1000:>9.1f}{r['retries']:>9}{r['failures']:>6}"
+                f"{r['peak'] / 1024 / 1024:>9.1f}"
+            )
+        for r in results:
+            if r["lag"]:
+                self.stdout.write(f"{r['name']}: {r['lag']}")
+        if resource is not None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux は KB、macOS は bytes
+            scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+            self.stdout.write(f"process max RSS: {maxrss / scale:.1f} MB")
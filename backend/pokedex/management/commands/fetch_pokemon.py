@@ -2,39 +2,35 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, List
 
 import aiohttp
-import asyncio
 from django.core.management.base import CommandError
-from tqdm import tqdm
 
-from .fetch_base_command import FetcherBaseCommand
+from pokedex.fetch import codec
+from pokedex.fetch.crawl import SPECIES_CRAWL, parse_id_ranges
+from pokedex.fetch.endpoints import POKEAPI_BASE_URL, POKEMON_ENDPOINTS, rebase_url
+from pokedex.fetch.store import JsonFileStore
 
-# Pokemon グループに属するエンドポイントをまとめる
-POKEMON_ENDPOINTS = {
-    "pokemon-pokemon": "https://pokeapi.co/api/v2/pokemon?limit=100000&offset=0",
-    "pokemon-form": "https://pokeapi.co/api/v2/pokemon-form?limit=100000&offset=0",
-    "pokemon-species": "https://pokeapi.co/api/v2/pokemon-species?limit=100000&offset=0",
-    "pokemon-abilities": "https://pokeapi.co/api/v2/ability?limit=100000&offset=0",
-    "pokemon-characteristics": "https://pokeapi.co/api/v2/characteristic?limit=100000&offset=0",
-    "pokemon-egg-group": "https://pokeapi.co/api/v2/egg-group?limit=100000&offset=0",
-    "pokemon-gender": "https://pokeapi.co/api/v2/gender?limit=100000&offset=0",
-    "pokemon-grows": "https://pokeapi.co/api/v2/growth-rate?limit=100000&offset=0",
-    "pokemon-nature": "https://pokeapi.co/api/v2/nature?limit=100000&offset=0",
-    "pokemon-habitat": "https://pokeapi.co/api/v2/pokemon-habitat?limit=100000&offset=0",
-    "pokemon-stat": "https://pokeapi.co/api/v2/stat?limit=100000&offset=0",
-    "pokemon-type": "https://pokeapi.co/api/v2/type?limit=100000&offset=0",
-}
+from .fetch_base_command import FetcherBaseCommand
 
 
 class Command(FetcherBaseCommand):
     """
     pokemonグループに属するエンドポイントをフェッチするコマンド。
+    fetch_all の pokemon グループ分のプリセット (fetch_all pokemon と同じ)。
+
+    --targeted を付けると、一覧全体ではなく all_register が参照するものだけを依存関係に沿ってたどる。
+    pokemon-species -> varieties の pokemon -> forms の pokemon-form の順に段ごとにフェッチし、
+    各段では前の段で見つかった URL (重複は除く) だけを取りに行く。
 
     Usage:
       python manage.py fetch_pokemon all
       python manage.py fetch_pokemon pokemon-ailment
+      python manage.py fetch_pokemon all --concurrency 32 --per-host 16
+      python manage.py fetch_pokemon pokemon-pokemon --resume
+      python manage.py fetch_pokemon --targeted
+      python manage.py fetch_pokemon --targeted --species-ids 1-151,386
       ...
     """
     help: str = (
@@ -42,113 +38,102 @@ class Command(FetcherBaseCommand):
         "Specify a sub-endpoint or 'all'."
     )
     group_name: str = "pokemon"
+    endpoints = POKEMON_ENDPOINTS
 
     def add_arguments(self, parser) -> None:
-        """
-        コマンドライン引数: [all|サブエンドポイント名]
-        """
+        super().add_arguments(parser)
         parser.add_argument(
-            "sub_name",
-            nargs="?",
-            default="all",
-            help="Endpoint category (pokemon-pokemon,pokemon-form,pokemon-species...) or 'all'.",
+            "--targeted",
+            action="store_true",
+            help="Only fetch species, the pokemon in their varieties, and those pokemon's forms.",
+        )
+        parser.add_argument(
+            "--species-ids",
+            default=None,
+            help="With --targeted: species IDs to start from, e.g. '1-151,386'. Default: the whole species list.",
         )
 
     async def handle_async(self, *args, **options) -> None:
-        """
-        非同期エントリーポイント:
-        1) sub_name == "all" -> POKEMON_ENDPOINTS 全部
-        2) 特定のサブエンドポイントのみ
-        """
-        sub_name: str = options.get("sub_name", "all")
-        if sub_name == "all":
-            tasks = [self.fetch_endpoint(name_) for name_ in POKEMON_ENDPOINTS]
-            await asyncio.gather(*tasks)
-        else:
-            if sub_name not in POKEMON_ENDPOINTS:
-                raise CommandError(f"不正なカテゴリ: {sub_name}")
-            await self.fetch_endpoint(sub_name)
-
-    async def fetch_endpoint(self, sub_name: str) -> None:
-        """
-        個別のエンドポイント (pokemon, pokemon-formなど) を取得してファイル保存。
-        """
-        list_endpoint = POKEMON_ENDPOINTS[sub_name]
-        current_stage = self.get_current_stage(self.group_name, sub_name)
-
-        # リセット判定
-        if current_stage > self.max_stage:
-            self.reset_stages(self.group_name, sub_name)
-            current_stage = 1
-
-        logger = self.setup_logger(self.group_name, sub_name, current_stage)
-
-        json_dir = self.get_json_dir(self.group_name, sub_name)
-        json_dir.mkdir(parents=True, exist_ok=True)
+        if not options.get("targeted"):
+            if options.get("species_ids"):
+                raise CommandError("--species-ids は --targeted と一緒に指定してください。")
+            await super().handle_async(*args, **options)
+            return
+        await self.run_targeted(**options)
 
-        logger.info(
-            "フェッチ開始: sub_name=%s, stage=%d, endpoint=%s",
-            sub_name,
-            current_stage,
-            list_endpoint,
-        )
+    async def run_targeted(self, **options) -> None:
+        """
+        SPECIES_CRAWL の段を順にフェッチする。
+        起点は species の一覧（--species-ids があればその ID の URL）で、
+        以降の段は前の段のボディから取り出した URL だけを対象にする。
 
-        # 標準出力にまとめて出すためのバッファ
-        stdout_messages = []
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                # まず一覧を取得
-                async with session.get(list_endpoint) as resp:
-                    logger.debug(f"GET {list_endpoint} - status={resp.status}")
-                    resp.raise_for_status()
-                    data = await resp.json()
-
-                items = data.get("results", [])
-                total_items = len(items)
-                logger.info("対象アイテム数: %d 件", total_items)
-                logger.debug(f"items preview: {items[:3]} (・・・)")  # 先頭3件だけデバッグログに表示
-
-                # フェッチタスクの作成
-                tasks = [
-                    self.fetch_and_save(session, item, json_dir, logger)
-                    for item in items
+        一部だけをたどるため、pokemon / pokemon-form では一覧に無い ID の削除 (prune) はしない。
+        species も --species-ids 指定時は削除しない。
+        """
+        base_url: str = options.get("base_url") or POKEAPI_BASE_URL
+        resume: bool = options.get("resume", False)
+        stage_options = {
+            "storage": options.get("storage") or JsonFileStore.format_name,
+            "raw": options.get("raw", False),
+            "validate": options.get("validate", False),
+        }
+
+        species_ids = None
+        if options.get("species_ids"):
+            try:
+                species_ids = parse_id_ranges(options["species_ids"])
+            except ValueError as exc:
+                raise CommandError(f"--species-ids が不正です: {exc}") from exc
+
+        scheduler = self.create_scheduler(**options)
+        async with scheduler:
+            items: List[Dict[str, str]] = []
+            for index, step in enumerate(SPECIES_CRAWL):
+                stage = self.open_stage(
+                    scheduler, self.group_name, step.sub_name, follow=step.follow, **stage_options
+                )
+                stage.logger.info(
+                    "依存クロール開始: sub_name=%s, stage=%d, resource=%s",
+                    step.sub_name,
+                    stage.stage,
+                    step.resource,
+                    extra={
+                        "event": "stage_start",
+                        "fields": {"sub_name": step.sub_name, "stage": stage.stage, "resource": step.resource},
+                    },
+                )
+
+                prune = False
+                if index == 0:
+                    if species_ids is not None:
+                        items = [
+                            {"name": "", "url": f"{base_url.rstrip('/')}/{step.resource}/{id_num}/"}
+                            for id_num in species_ids
+                        ]
+                    else:
+                        list_endpoint = rebase_url(self.endpoints[step.sub_name], base_url)
+                        try:
+                            resp = await scheduler.fetch(list_endpoint, stage.stats)
+                            data = await scheduler.run_cpu(codec.parse_json, resp.body)
+                        except (aiohttp.ClientError, ValueError) as e:
+                            stage.logger.error(f"{list_endpoint} の取得に失敗しました: {e}")
+                            stage.store.close()
+                            raise CommandError("リストの取得に失敗しました。ログを確認してください。") from e
+                        items = data.get("results", [])
+                        prune = True
+
+                await self.fetch_items(stage, items, resume=resume, prune=prune)
+
+                # 見つかった参照先を ID 順に並べ、次の段の対象にする
+                items = [
+                    {"name": "", "url": rebase_url(url, base_url)}
+                    for url in sorted(stage.discovered, key=self.url_sort_key)
                 ]
+                if step.follow is not None:
+                    self.stdout.write(f"{step.sub_name}: 参照先 {len(items)} 件")
 
-                # tqdm で進捗表示（ポケモンのフェッチは大変なので、進捗バー必須！）
-                for task in tqdm(
-                    asyncio.as_completed(tasks),
-                    total=total_items,
-                    desc=f"{sub_name} をフェッチ中",
-                    unit="アイテム"
-                ):
-                    try:
-                        result_msg: Optional[str] = await task
-                        if result_msg:
-                            # 返却されたメッセージは成功・失敗を問わず stdout バッファへ
-                            stdout_messages.append(result_msg)
-                    except Exception as e:
-                        # 予期しないエラーをキャッチ
-                        error_msg = f"予期しないエラー: {e}"
-                        logger.error(error_msg)
-                        # ここでも stdout バッファへ追加
-                        stdout_messages.append(error_msg)
-
-        except aiohttp.ClientError as e:
-            logger.error(f"{list_endpoint} の取得に失敗しました: {e}")
-            self.stderr.write("リストの取得に失敗しました。ログを確認してください。")
-            return
-
-        # tqdm終了後にバッファしていたメッセージを一括出力
-        if stdout_messages:
-            self.stdout.write("\n".join(stdout_messages))
-
-        logger.info(
-            "フェッチ完了: sub_name=%s (stage=%d), dir=%s",
-            sub_name,
-            current_stage,
-            json_dir,
-        )
-        self.stdout.write(f"{sub_name} (stage={current_stage}) => {json_dir}")
+        self.write_scheduler_summary(scheduler)
 
-        self.update_stage(self.group_name, sub_name, current_stage)
+    def url_sort_key(self, url: str) -> int:
+        id_num = self.extract_id_from_url(url)
+        return id_num if id_num is not None else 0
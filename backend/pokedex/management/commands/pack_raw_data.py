@@ -0,0 +1,76 @@
+# pack_raw_data.py
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from pokedex.fetch.store import PackStore
+
+
+class Command(BaseCommand):
+    """
+    既存の data/raw/{group}/{sub}/*.json をパック形式 (pack.seg / pack.idx) に変換するコマンド。
+    変換後も JSON ファイルは残す（--delete-files で削除）。読み込み (--raw-format auto) は最後に書き込んだ形式を使うので、
+    変換後はパックを読み、その後 --storage files でフェッチし直せば JSON ファイルを読む (store.resolve_layout)。
+
+    Usage:
+      python manage.py pack_raw_data pokemon/pokemon-pokemon
+      python manage.py pack_raw_data pokemon/pokemon-species pokemon/pokemon-form --delete-files
+    """
+
+    help = "Convert data/raw/<group>/<sub>/*.json into the compressed pack format."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "targets",
+            nargs="+",
+            help="Sub-endpoint directories relative to data/raw (e.g. pokemon/pokemon-pokemon).",
+        )
+        parser.add_argument(
+            "--delete-files",
+            action="store_true",
+            help="Delete the *.json files after they have been packed.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        raw_root = Path(settings.BASE_DIR) / "data" / "raw"
+        for target in options["targets"]:
+            json_dir = raw_root / target
+            if not json_dir.is_dir():
+                raise CommandError(f"ディレクトリがありません: {json_dir}")
+            self.pack_directory(json_dir, delete_files=options["delete_files"])
+
+    def pack_directory(self, json_dir: Path, delete_files: bool = False) -> None:
+        json_files = sorted(json_dir.glob("*.json"))
+        before_bytes = sum(path.stat().st_size for path in json_files)
+
+        store = PackStore(json_dir)
+        packed = []
+        try:
+            for json_file in tqdm(json_files, desc=f"{json_dir.name} をパック中"):
+                try:
+                    id_num = int(json_file.stem)
+                    with json_file.open("r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (ValueError, OSError) as e:
+                    self.stderr.write(f"[ERROR] {json_file}: {e}")
+                    continue
+                store.put(id_num, data)
+                packed.append(json_file)
+        finally:
+            store.close()
+
+        if delete_files:
+            for json_file in packed:
+                json_file.unlink()
+
+        after_bytes = store.segment_path.stat().st_size + store.index_path.stat().st_size
+        self.stdout.write(
+            f"{json_dir}: {len(packed)} 件, {before_bytes / 1024 / 1024:.1f} MB -> "
+            f"{after_bytes / 1024 / 1024:.1f} MB"
+        )
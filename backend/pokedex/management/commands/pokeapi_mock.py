@@ -0,0 +1,57 @@
+# pokeapi_mock.py
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pokedex.fetch.mock_server import MockConfig, run_mock_server
+
+
+class Command(BaseCommand):
+    """
+    PokeAPI のローカル代用サーバーを起動するコマンド。
+
+    Usage:
+      python manage.py pokeapi_mock
+      python manage.py pokeapi_mock --port 8765 --latency 0.05 --jitter 0.02 --error-rate 0.02 --rate-429 0.01
+      python manage.py pokeapi_mock --fixtures data/raw
+      python manage.py fetch_pokemon all --base-url http://127.0.0.1:8765/api/v2
+    """
+
+    help = "Serve the PokeAPI list/item endpoints locally from fixtures or synthetic data."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--host", default=MockConfig.host)
+        parser.add_argument("--port", type=int, default=MockConfig.port)
+        parser.add_argument("--latency", type=float, default=MockConfig.latency, help="Base delay per request (seconds).")
+        parser.add_argument("--jitter", type=float, default=MockConfig.jitter, help="Extra uniform random delay (seconds).")
+        parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate, help="Probability of a 500/503 response.")
+        parser.add_argument("--rate-429", type=float, default=MockConfig.rate_429, help="Probability of a 429 response.")
+        parser.add_argument("--retry-after", type=float, default=MockConfig.retry_after, help="Retry-After seconds sent with 429.")
+        parser.add_argument("--items", type=int, default=MockConfig.items, help="Synthetic items per resource.")
+        parser.add_argument("--moves", type=int, default=MockConfig.moves, help="Length of synthetic pokemon 'moves' arrays.")
+        parser.add_argument("--seed", type=int, default=MockConfig.seed)
+        parser.add_argument("--fixtures", default=None, help="A data/raw directory to serve instead of synthetic data.")
+
+    def handle(self, *args, **options) -> None:
+        fixtures = Path(options["fixtures"]) if options["fixtures"] else None
+        if fixtures is not None and not fixtures.is_dir():
+            raise CommandError(f"fixtures ディレクトリがありません: {fixtures}")
+
+        config = MockConfig(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            rate_429=options["rate_429"],
+            retry_after=options["retry_after"],
+            items=options["items"],
+            moves=options["moves"],
+            seed=options["seed"],
+            fixtures=fixtures,
+        )
+        self.stdout.write(f"PokeAPI モックを起動します: {config.base_url}")
+        run_mock_server(config)
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, unique=True)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Move',
+            fields=[
+                ('move_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('ja', models.CharField(blank=True, max_length=100, null=True)),
+                ('type', models.CharField(blank=True, max_length=24, null=True)),
+                ('damage_class', models.CharField(blank=True, max_length=16, null=True)),
+                ('power', models.IntegerField(blank=True, null=True)),
+                ('accuracy', models.IntegerField(blank=True, null=True)),
+                ('pp', models.IntegerField(blank=True, null=True)),
+                ('priority', models.IntegerField(blank=True, null=True)),
+                ('generation', models.IntegerField(blank=True, null=True)),
+                ('move_json_file', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Pokemon',
+            fields=[
+                ('unique_id', models.CharField(max_length=10, primary_key=True, serialize=False, unique=True)),
+                ('species_id', models.CharField(max_length=4)),
+                ('pokemon_id', models.CharField(max_length=5)),
+                ('form_id', models.CharField(max_length=5)),
+                ('ja', models.CharField(max_length=100)),
+                ('en', models.CharField(max_length=100)),
+                ('sub_ja', models.CharField(blank=True, max_length=100, null=True)),
+                ('sub_en', models.CharField(blank=True, max_length=100, null=True)),
+                ('type_first', models.CharField(blank=True, max_length=24, null=True)),
+                ('type_second', models.CharField(blank=True, max_length=24, null=True)),
+                ('ability_01', models.CharField(blank=True, max_length=24, null=True)),
+                ('ability_02', models.CharField(blank=True, max_length=24, null=True)),
+                ('ability_03', models.CharField(blank=True, max_length=24, null=True)),
+                ('is_pokemon_img', models.BooleanField(blank=True, null=True)),
+                ('is_form_img', models.BooleanField(blank=True, null=True)),
+                ('front_default_url', models.CharField(blank=True, max_length=200, null=True)),
+                ('front_shiny_url', models.CharField(blank=True, max_length=200, null=True)),
+                ('base_h', models.IntegerField(blank=True, null=True)),
+                ('base_a', models.IntegerField(blank=True, null=True)),
+                ('base_b', models.IntegerField(blank=True, null=True)),
+                ('base_c', models.IntegerField(blank=True, null=True)),
+                ('base_d', models.IntegerField(blank=True, null=True)),
+                ('base_s', models.IntegerField(blank=True, null=True)),
+                ('base_t', models.IntegerField(blank=True, null=True)),
+                ('group', models.IntegerField(blank=True, null=True)),
+                ('original', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_01', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_02', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_03', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_04', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_05', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_06', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_07', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_08', models.BooleanField(blank=True, null=True)),
+                ('exist_generation_09', models.BooleanField(blank=True, null=True)),
+                ('move_generation_01', models.JSONField(blank=True, null=True)),
+                ('move_generation_02', models.JSONField(blank=True, null=True)),
+                ('move_generation_03', models.JSONField(blank=True, null=True)),
+                ('move_generation_04', models.JSONField(blank=True, null=True)),
+                ('move_generation_05', models.JSONField(blank=True, null=True)),
+                ('move_generation_06', models.JSONField(blank=True, null=True)),
+                ('move_generation_07', models.JSONField(blank=True, null=True)),
+                ('move_generation_08', models.JSONField(blank=True, null=True)),
+                ('move_generation_09', models.JSONField(blank=True, null=True)),
+                ('national_dex', models.IntegerField(blank=True, null=True)),
+                ('paldea_dex', models.IntegerField(blank=True, null=True)),
+                ('kitakami_dex', models.IntegerField(blank=True, null=True)),
+                ('blueberry_dex', models.IntegerField(blank=True, null=True)),
+                ('species_json_file', models.CharField(max_length=255)),
+                ('pokemon_json_file', models.CharField(max_length=255)),
+                ('form_json_file', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PokemonMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pokemon_id', models.CharField(max_length=5)),
+                ('generation', models.PositiveSmallIntegerField()),
+                ('learn_method', models.CharField(max_length=32)),
+                ('level', models.PositiveSmallIntegerField(default=0)),
+                ('move', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learners', to='pokedex.move')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['move', 'generation', 'pokemon_id'], name='pokemonmove_move_gen')],
+                'constraints': [models.UniqueConstraint(fields=('pokemon_id', 'generation', 'move', 'learn_method', 'level'), name='pokemonmove_unique_entry')],
+            },
+        ),
+    ]
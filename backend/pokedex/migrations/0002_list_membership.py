@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+import re
+
+from django.db import migrations, models
+
+# この時点の pokedex.register.regions の判定をそのまま写したもの。
+# 判定を変えても、このマイグレーションの結果は変わらない（変えた判定は次の all_register が反映する）
+LATIN_PATTERN = re.compile(r"[A-Za-z]")
+
+
+def in_national(row):
+    return bool(row["original"]) and not LATIN_PATTERN.search(row["sub_ja"] or "")
+
+
+def in_galar(row):
+    sub_ja = row["sub_ja"] or ""
+    return (
+        bool(row["exist_generation_08"])
+        and "メガ" not in sub_ja
+        and (not LATIN_PATTERN.search(sub_ja) or sub_ja == "gmax")
+    )
+
+
+def in_paldea(row):
+    sub_ja = row["sub_ja"] or ""
+    return bool(row["exist_generation_09"]) and "メガ" not in sub_ja and not LATIN_PATTERN.search(sub_ja)
+
+
+MEMBERSHIP = {"in_national": in_national, "in_galar": in_galar, "in_paldea": in_paldea}
+
+
+def fill_membership(apps, schema_editor):
+    # 既存の行の in_<地方> を求める（次の all_register を待たずに一覧が空にならないように）。画像の無いものは載せない
+    Pokemon = apps.get_model("pokedex", "Pokemon")
+    rows = []
+    values = Pokemon.objects.values(
+        "unique_id", "sub_ja", "original", "exist_generation_08", "exist_generation_09", "front_default_url"
+    )
+    for row in values.iterator():
+        image = bool(row["front_default_url"])
+        rows.append(Pokemon(
+            unique_id=row["unique_id"],
+            **{field: image and predicate(row) for field, predicate in MEMBERSHIP.items()},
+        ))
+    Pokemon.objects.bulk_update(rows, list(MEMBERSHIP), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokedex', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pokemon',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='in_galar',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='in_national',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='in_paldea',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(condition=models.Q(('in_national', True)), fields=['ja', 'unique_id', 'base_h', 'base_a', 'base_b', 'base_c', 'base_d', 'base_s', 'base_t', 'in_national'], name='pokemon_national_ja'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(condition=models.Q(('in_galar', True)), fields=['ja', 'unique_id', 'base_h', 'base_a', 'base_b', 'base_c', 'base_d', 'base_s', 'base_t', 'in_galar'], name='pokemon_galar_ja'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(condition=models.Q(('in_paldea', True)), fields=['ja', 'unique_id', 'base_h', 'base_a', 'base_b', 'base_c', 'base_d', 'base_s', 'base_t', 'in_paldea'], name='pokemon_paldea_ja'),
+        ),
+        migrations.RunPython(fill_membership, migrations.RunPython.noop),
+    ]
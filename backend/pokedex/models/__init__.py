@@ -0,0 +1,3 @@
+from pokedex.models.data_version import DataVersion
+from pokedex.models.move import Move, PokemonMove
+from pokedex.models.pokemon import Pokemon
@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class DataVersion(models.Model):
+    """
+    登録済みデータの版。all_register が入力 (生データ・レコード生成のコード) の指紋を name ごとに保存し、
+    次回の指紋が同じなら DB への反映を省く。
+    """
+
+    # name の値。書く側 (all_register など) も読む側 (api.cache) もここを参照する
+    POKEMON = "pokemon"
+    MOVES = "moves"
+
+    name = models.CharField(max_length=50, unique=True, primary_key=True)
+    fingerprint = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.fingerprint[:12]})"
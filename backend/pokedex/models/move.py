@@ -0,0 +1,51 @@
+from django.db import models
+
+
+class Move(models.Model):
+    # PokeAPI の move の ID と名前 (例: 33, "tackle")
+    move_id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+    ja = models.CharField(max_length=100, null=True, blank=True)
+
+    type = models.CharField(max_length=24, null=True, blank=True)  # Pokemon.type_first と同じ 1 文字の日本語
+    damage_class = models.CharField(max_length=16, null=True, blank=True)  # physical / special / status
+    power = models.IntegerField(null=True, blank=True)
+    accuracy = models.IntegerField(null=True, blank=True)
+    pp = models.IntegerField(null=True, blank=True)
+    priority = models.IntegerField(null=True, blank=True)
+    generation = models.IntegerField(null=True, blank=True)  # 初登場の世代
+
+    move_json_file = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"{self.ja or self.name} ({self.move_id})"
+
+
+class PokemonMove(models.Model):
+    """
+    pokemon (Pokemon.pokemon_id) が、ある世代で、ある覚え方・レベルで覚える技 1 件。
+
+    Pokemon は all_register --swap でテーブルごと入れ替わるため外部キーにはせず、pokemon_id で結び付ける。
+    """
+
+    pokemon_id = models.CharField(max_length=5)
+    move = models.ForeignKey(Move, on_delete=models.CASCADE, related_name="learners")
+    generation = models.PositiveSmallIntegerField()
+    learn_method = models.CharField(max_length=32)
+    level = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # pokemon の世代ごとの技一覧 (pokemon_id, generation) もこの索引で引ける
+            models.UniqueConstraint(
+                fields=["pokemon_id", "generation", "move", "learn_method", "level"],
+                name="pokemonmove_unique_entry",
+            ),
+        ]
+        indexes = [
+            # 「技 X を世代 N で覚える pokemon」を索引だけで引く
+            models.Index(fields=["move", "generation", "pokemon_id"], name="pokemonmove_move_gen"),
+        ]
+
+    def __str__(self):
+        return f"{self.pokemon_id} {self.move_id} (gen {self.generation}, {self.learn_method} {self.level})"
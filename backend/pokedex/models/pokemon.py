@@ -45,8 +45,9 @@ class Pokemon(models.Model):
     exist_generation_08 = models.BooleanField(null=True, blank=True)  # sword-shield
     exist_generation_09 = models.BooleanField(null=True, blank=True)  # scarlet-violet
 
-    # 各世代で覚える技の情報を、リスト（JSON形式）として保持
-    move_generation_01 = models.JSONField(null=True, blank=True)  # 第1世代の技（例：['tackle', 'growl', ...]）
+    # 各世代で覚える技の情報を、整数の配列（JSON形式）として保持（all_register が learnset.generation_fields で作る）
+    # [技ID, 覚え方ID, レベル, ...] の繰り返し。名前は learnset.decode と Move で引く
+    move_generation_01 = models.JSONField(null=True, blank=True)  # 第1世代の技（例：[33, 1, 1, 45, 1, 1, ...]）
     move_generation_02 = models.JSONField(null=True, blank=True)  # 第2世代の技
     move_generation_03 = models.JSONField(null=True, blank=True)  # 第3世代の技
     move_generation_04 = models.JSONField(null=True, blank=True)  # 第4世代の技
@@ -65,5 +66,35 @@ class Pokemon(models.Model):
     pokemon_json_file = models.CharField(max_length=255)
     form_json_file = models.CharField(max_length=255)
 
+    # all_register が生成したレコード内容の SHA-1。差分登録で変わった行だけを更新するために使う
+    content_hash = models.CharField(max_length=40, null=True, blank=True)
+
+    # 各地方の一覧に載るか（all_register が regions.membership で求める。画像の無いものは False）
+    in_national = models.BooleanField(null=True, blank=True)
+    in_galar = models.BooleanField(null=True, blank=True)
+    in_paldea = models.BooleanField(null=True, blank=True)
+
+    class Meta:
+        # 一覧は in_<地方>=True で絞って (ja, unique_id) 順に並べ、種族値の範囲で絞る。
+        # in_<地方> の行だけを持つ部分索引 (ja, unique_id, 種族値...) なら、並べ替えをせず、種族値の条件も索引の中だけで
+        # 判定できる（件数を数える COUNT は表を読まずに済む）。確認は manage.py check_query_plans
+        # SQLite では filter(in_<地方>=True) が WHERE "in_<地方>" になり、(in_<地方>, ja) の索引の等号には
+        # 使われないため、同じ式を条件にした部分索引にしている（末尾の in_<地方> は COUNT を索引だけで済ませるため）
+        indexes = [
+            models.Index(
+                fields=["ja", "unique_id", "base_h", "base_a", "base_b", "base_c", "base_d", "base_s", "base_t", f"in_{region}"],
+                condition=models.Q(**{f"in_{region}": True}),
+                name=f"pokemon_{region}_ja",
+            )
+            for region in ("national", "galar", "paldea")
+        ]
+
     def __str__(self):
         return f"{self.ja} ({self.unique_id})"
+
+    @classmethod
+    def record_fields(cls):
+        """
+        all_register のレコードが持つ列 (content_hash 以外の全列)。content_hash はこの列の値から求める。
+        """
+        return [field.attname for field in cls._meta.concrete_fields if field.attname != "content_hash"]
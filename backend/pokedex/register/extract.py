@@ -0,0 +1,194 @@
+# extract.py
+#
+# fetch と register の間の抽出ステージ。data/raw/pokemon/* の各ドキュメントを loader.PROJECTIONS で
+# all_register が読むフィールドだけにし、サブエンドポイントごとに 1 つの行区切りファイル
+# (data/extract/pokemon/<サブエンドポイント>.jsonl) に書く。
+#
+#   1 行目       {"format": "pokedex-extract", "version": EXTRACT_VERSION, "source": <射影のコードの SHA-1>}
+#   2 行目以降   <5桁ID> \t <元データのスタンプ> \t <射影したデータのコンパクト JSON>
+#
+# スタンプは JSON ファイルなら (サイズ, 更新時刻)、パックなら圧縮済みペイロードの (長さ, CRC32)。
+# 再抽出ではスタンプが変わった ID だけを読み直し、それ以外の行はパースせずにそのまま書き写す。
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pokedex.fetch.store import PackReader, PackStore, resolve_layout
+from pokedex.register import learnset, loader
+
+# 行の形式を変えたら上げる。版が違うファイルは全件抽出し直す
+EXTRACT_VERSION = 2
+# 射影 (loader.PROJECTIONS / learnset) のコード。どれかのソースが変わったら全件抽出し直す
+# (all_register の input_fingerprint と同じく、ファイルの中身で判定するので版を上げ忘れても古い行を使わない)
+PROJECTION_SOURCES = (loader, learnset, sys.modules[__name__])
+EXTRACT_FORMAT = "pokedex-extract"
+EXTRACT_SUFFIX = ".jsonl"
+
+
+@dataclass
+class ExtractStats:
+    name: str
+    total: int = 0
+    reused: int = 0
+    extracted: int = 0
+    removed: int = 0
+    digest: str = ""  # 生データのスタンプ全体の SHA-1 (all_register の入力の指紋に使う)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def extract_path(extract_dir: Path, name: str) -> Path:
+    return extract_dir / f"{name}{EXTRACT_SUFFIX}"
+
+
+@lru_cache(maxsize=None)
+def projection_digest() -> str:
+    """
+    PROJECTION_SOURCES のソースの SHA-1。
+    """
+    sha1 = hashlib.sha1()
+    for module in PROJECTION_SOURCES:
+        sha1.update(Path(module.__file__).read_bytes())
+    return sha1.hexdigest()
+
+
+def _header() -> bytes:
+    return loader.dumps_canonical(
+        {"format": EXTRACT_FORMAT, "version": EXTRACT_VERSION, "source": projection_digest()}
+    ) + b"\n"
+
+
+def source_stamps(directory: Path, raw_format: str = "auto") -> Dict[str, str]:
+    """
+    {5桁ID: スタンプ} を返す。JSON ファイルは stat だけ、パックは圧縮済みのまま CRC32 を取る（展開はしない）。
+    """
+    if resolve_layout(directory, raw_format) == PackStore.format_name:
+        with PackReader(directory) as reader:
+            stamps = {}
+            for id_num in reader.ids():
+                compressed = reader.get_compressed(id_num)
+                stamps[f"{id_num:05d}"] = f"p{len(compressed)}:{zlib.crc32(compressed):08x}"
+            return stamps
+
+    stamps = {}
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json") and entry.is_file():
+            stat = entry.stat()
+            stamps[entry.name[: -len(".json")]] = f"f{stat.st_size}:{stat.st_mtime_ns}"
+    return stamps
+
+
+def stamps_digest(stamps: Dict[str, str]) -> str:
+    """
+    {5桁ID: スタンプ} 全体の SHA-1 を返す。どれか 1 件でも増減・変更があれば変わる。
+    """
+    sha1 = hashlib.sha1()
+    for id_str in sorted(stamps):
+        sha1.update(f"{id_str}\t{stamps[id_str]}\n".encode())
+    return sha1.hexdigest()
+
+
+def read_lines(path: Path) -> Dict[str, Tuple[str, bytes]]:
+    """
+    既存の抽出ファイルを {5桁ID: (スタンプ, JSON の bytes)} として読む（JSON はパースしない）。
+    ファイルが無い・版や射影のコードが違う場合は空を返す（全件抽出し直しになる）。
+    """
+    if not path.exists():
+        return {}
+    lines: Dict[str, Tuple[str, bytes]] = {}
+    with path.open("rb") as f:
+        if f.readline() != _header():
+            return {}
+        for line in f:
+            parts = line.rstrip(b"\n").split(b"\t", 2)
+            if len(parts) == 3:
+                lines[parts[0].decode()] = (parts[1].decode(), parts[2])
+    return lines
+
+
+def refresh(
+    name: str,
+    directory: Path,
+    output_path: Path,
+    raw_format: str = "auto",
+    parser: str = "json",
+    workers: int = 1,
+    chunk_size: int = 32,
+    rebuild: bool = False,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> ExtractStats:
+    """
+    directory (サブエンドポイント name の生データ) の抽出ファイルを、変わった ID だけ読み直して書き直す。
+    何も変わっていなければファイルには触らない。
+    """
+    stats = ExtractStats(name)
+    stamps = source_stamps(directory, raw_format) if directory.is_dir() else {}
+    previous = {} if rebuild else read_lines(output_path)
+
+    changed = sorted(id_str for id_str, stamp in stamps.items() if previous.get(id_str, ("",))[0] != stamp)
+    stats.total = len(stamps)
+    stats.removed = len(previous.keys() - stamps.keys())
+    if not changed and not stats.removed and output_path.exists() and not rebuild:
+        stats.reused = len(stamps)
+        stats.digest = stamps_digest(stamps)
+        return stats
+
+    # 変わった ID だけを loader のワーカーで読み、射影する
+    use_pack = resolve_layout(directory, raw_format) == PackStore.format_name
+    jobs = []
+    for start in range(0, len(changed), chunk_size):
+        chunk = changed[start:start + chunk_size]
+        if use_pack:
+            jobs.append((name, loader.load_pack_ids, (str(directory), [int(id_str) for id_str in chunk], parser, name)))
+        else:
+            jobs.append((name, loader.load_files, ([str(directory / f"{id_str}.json") for id_str in chunk], parser, name)))
+
+    changed_ids = set(changed)
+    extracted: Dict[str, bytes] = {}
+
+    def collect(_: str, result: loader.LoadResult) -> None:
+        loaded, errors = result
+        for id_str, data in loaded:
+            extracted[id_str] = loader.dumps_compact(data)
+        stats.errors.extend(errors)
+        if on_progress is not None:
+            on_progress(len(loaded) + len(errors))
+
+    loader.run_jobs(jobs, workers, collect)
+
+    # 一時ファイルに ID 順で書いてから置き換える（途中で止まっても前のファイルが残る）
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    written: Dict[str, str] = {}
+    with tmp_path.open("wb") as out:
+        out.write(_header())
+        for id_str in sorted(stamps):
+            if id_str in extracted:
+                payload = extracted[id_str]
+                stats.extracted += 1
+            elif id_str in previous and id_str not in changed_ids:
+                payload = previous[id_str][1]
+                stats.reused += 1
+            else:
+                continue  # 読めなかった ID (errors に記録済み)。行を書かないので次回また読み直す
+            out.write(id_str.encode() + b"\t" + stamps[id_str].encode() + b"\t" + payload + b"\n")
+            written[id_str] = stamps[id_str]
+    os.replace(tmp_path, output_path)
+    # 読めなかった ID は含めない（次回読み直せたときに指紋が変わるように）
+    stats.digest = stamps_digest(written)
+    return stats
+
+
+def load(path: Path, parser: str = "json") -> Dict[str, dict]:
+    """
+    抽出ファイルを {5桁ID: 射影済みデータ} として読む。
+    """
+    loads = loader.get_loads(parser)
+    return {id_str: loads(payload) for id_str, (_, payload) in read_lines(path).items()}
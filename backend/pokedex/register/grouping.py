@@ -0,0 +1,75 @@
+# grouping.py
+#
+# group / original の割り当て。all_register (生成したレコード) と all_set_original (DB の行) の両方から、
+# {フィールド名: 値} の辞書の列に対してメモリ上だけで行う。Django には依存させない。
+#
+# - species ごとに、特性・タイプ・種族値 (と キョダイマックスかどうか) が同じものを 1 つのグループにし、
+#   species 内で 1 から番号を振る（並び順は species_id -> pokemon_id -> form_id）
+# - 各グループで original=True にするのは、unique_id の末尾が "00" のもの。
+#   無ければ unique_id が最小のもの。それ以外は original=False
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+GROUP_KEY_FIELDS = (
+    "ability_01",
+    "ability_02",
+    "ability_03",
+    "type_first",
+    "type_second",
+    "base_h",
+    "base_a",
+    "base_b",
+    "base_c",
+    "base_d",
+    "base_s",
+)
+# assign_groups が読むフィールド
+GROUPING_FIELDS = ("unique_id", "species_id", "pokemon_id", "form_id", "sub_ja") + GROUP_KEY_FIELDS
+
+
+def _to_int_safe(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return 999999
+
+
+def record_order(record: dict) -> Tuple[int, int, int]:
+    """
+    species_id -> pokemon_id -> form_id の数値順（all_register のレコードの並び順と同じ）。
+    """
+    return (
+        _to_int_safe(record.get("species_id", "999999")),
+        _to_int_safe(record.get("pokemon_id", "999999")),
+        _to_int_safe(record.get("form_id", "999999")),
+    )
+
+
+def group_key(record: dict) -> tuple:
+    # sub_ja が "gmax" のものは、同じ能力値でも別のグループにする
+    sub_ja_key = record.get("sub_ja") if record.get("sub_ja") == "gmax" else None
+    return tuple(record.get(field_name) for field_name in GROUP_KEY_FIELDS) + (sub_ja_key,)
+
+
+def assign_groups(records: Iterable[dict]) -> Dict[str, Tuple[int, bool]]:
+    """
+    {unique_id: (group, original)} を返す。records の並び順には依存しない。
+    """
+    by_species: Dict[str, List[dict]] = {}
+    for record in sorted(records, key=record_order):
+        by_species.setdefault(record.get("species_id"), []).append(record)
+
+    assignments: Dict[str, Tuple[int, bool]] = {}
+    for species_records in by_species.values():
+        groups: Dict[tuple, List[dict]] = {}
+        for record in species_records:
+            groups.setdefault(group_key(record), []).append(record)
+
+        for group_number, members in enumerate(groups.values(), start=1):
+            unique_ids = [record["unique_id"] for record in members]
+            originals = {unique_id for unique_id in unique_ids if unique_id[-2:] == "00"} or {min(unique_ids)}
+            for unique_id in unique_ids:
+                assignments[unique_id] = (group_number, unique_id in originals)
+    return assignments
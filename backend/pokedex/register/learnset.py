@@ -0,0 +1,133 @@
+# learnset.py
+#
+# pokemon の moves を 1 回だけ走査して、世代ごとの登場フラグ (exist_generation_0X) と
+# 覚える技の一覧 (move_generation_0X。技IDの整数配列) を同時に作る。
+# --project ではワーカー (loader の射影) の中で計算して moves ごと捨てるため、Django に依存させない。
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# 世代ごとの対象バージョングループ（モデルのコメントと同じ。リメイク作品などは含めない）
+GENERATION_VERSION_GROUPS: Dict[int, List[str]] = {
+    1: ["red-blue", "yellow"],
+    2: ["gold-silver", "crystal"],
+    3: ["ruby-sapphire", "emerald"],
+    4: ["diamond-pearl", "platinum"],
+    5: ["black-white", "black-2-white-2"],
+    6: ["x-y"],
+    7: ["sun-moon", "ultra-sun-ultra-moon"],
+    8: ["sword-shield"],
+    9: ["scarlet-violet"],
+}
+
+# バージョングループ名 -> 世代 の逆引き
+VERSION_GROUP_GENERATION: Dict[str, int] = {
+    version_group: generation
+    for generation, version_groups in GENERATION_VERSION_GROUPS.items()
+    for version_group in version_groups
+}
+
+
+# 射影済みの pokemon データで、generation_fields の結果を持つキー
+PRECOMPUTED_KEY = "generation_fields"
+
+
+def exist_field(generation: int) -> str:
+    return f"exist_generation_{generation:02d}"
+
+
+def move_field(generation: int) -> str:
+    return f"move_generation_{generation:02d}"
+
+
+# --------------------------------------------------
+# move_generation_0X の形式
+#
+#   [技ID, 覚え方ID, レベル, 技ID, 覚え方ID, レベル, ...] という整数だけの平らな配列。
+#   並びは 覚え方 -> レベル -> 技ID の順（レベルアップ技がレベル順に並ぶ）。
+#   技の名前は持たず、技ID (PokeAPI の move ID = Move.move_id) で引く。
+#   覚え方は PokeAPI の move-learn-method の ID (LEARN_METHOD_IDS)。知らない覚え方は 0
+# --------------------------------------------------
+LEARN_METHOD_IDS: Dict[str, int] = {
+    "level-up": 1,
+    "egg": 2,
+    "tutor": 3,
+    "machine": 4,
+    "stadium-surfing-pikachu": 5,
+    "light-ball-egg": 6,
+    "colosseum-purification": 7,
+    "xd-shadow": 8,
+    "xd-purification": 9,
+    "form-change": 10,
+    "zygarde-cube": 11,
+}
+LEARN_METHOD_NAMES: Dict[int, str] = {method_id: name for name, method_id in LEARN_METHOD_IDS.items()}
+ENTRY_WIDTH = 3
+
+
+def encode(entries: Iterable[Tuple[int, int, int]]) -> List[int]:
+    """
+    (覚え方ID, レベル, 技ID) の集まりを move_generation_0X の配列にする。
+    """
+    packed: List[int] = []
+    for method_id, level, move_id in sorted(entries):
+        packed.extend((move_id, method_id, level))
+    return packed
+
+
+def decode(packed: Optional[List[int]], move_names: Optional[Dict[int, Any]] = None) -> List[dict]:
+    """
+    move_generation_0X の配列を {"move_id", "method", "level"} の辞書のリストに戻す。
+    move_names ({技ID: 名前}) を渡すと "move" (名前) も付ける。辞書に無い技は None
+    """
+    if not packed:
+        return []
+    decoded = []
+    for start in range(0, len(packed), ENTRY_WIDTH):
+        move_id, method_id, level = packed[start:start + ENTRY_WIDTH]
+        entry = {"move_id": move_id, "method": LEARN_METHOD_NAMES.get(method_id, "other"), "level": level}
+        if move_names is not None:
+            entry["move"] = move_names.get(move_id)
+        decoded.append(entry)
+    return decoded
+
+
+def move_ids(packed: Optional[List[int]]) -> List[int]:
+    return list(packed[::ENTRY_WIDTH]) if packed else []
+
+
+def move_id_from_url(url: str) -> int:
+    # "https://pokeapi.co/api/v2/move/33/" -> 33 (取れなければ 0)
+    tail = url.rstrip("/").rsplit("/", 1)[-1] if url else ""
+    return int(tail) if tail.isdigit() else 0
+
+
+def generation_fields(moves: List[dict]) -> dict:
+    """
+    moves (PokeAPI の pokemon.moves) を 1 回だけ走査し、次のフィールドを作る。
+
+    - exist_generation_0X: その世代のバージョングループに 1 件でも技があるか
+    - move_generation_0X: その世代で覚える技の一覧を encode した整数の配列。
+      同じ世代の複数バージョングループに出てくる同じ組み合わせは 1 件にまとめる。技が無い世代は None
+    """
+    generation_of = VERSION_GROUP_GENERATION.get
+    method_id_of = LEARN_METHOD_IDS.get
+    learnsets: Dict[int, Set[Tuple[int, int, int]]] = {generation: set() for generation in GENERATION_VERSION_GROUPS}
+    for move in moves:
+        move_id = move_id_from_url(move["move"].get("url", ""))
+        for version_info in move["version_group_details"]:
+            generation = generation_of(version_info["version_group"]["name"])
+            if generation is not None:
+                learnsets[generation].add((
+                    method_id_of(version_info["move_learn_method"]["name"], 0),
+                    version_info["level_learned_at"] or 0,
+                    move_id,
+                ))
+
+    fields: dict = {}
+    for generation, entries in learnsets.items():
+        fields[exist_field(generation)] = bool(entries)
+    for generation, entries in learnsets.items():
+        fields[move_field(generation)] = encode(entries) if entries else None
+    return fields
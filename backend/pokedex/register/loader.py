@@ -0,0 +1,213 @@
+# loader.py
+#
+# data/raw の JSON を all_register 用に読み込む処理。
+# ProcessPoolExecutor のワーカーで実行するため、Django に依存しないモジュールレベルの関数だけを置く。
+
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from pokedex.fetch.store import PackReader
+from pokedex.register import learnset
+
+try:
+    import orjson
+except ImportError:  # orjson は任意。無ければ標準の json を使う
+    orjson = None
+
+# (5桁ID, データ) のリストと、(場所, エラーメッセージ) のリスト
+LoadResult = Tuple[List[Tuple[str, Any]], List[Tuple[str, str]]]
+
+
+def available_parsers() -> List[str]:
+    return ["json"] + (["orjson"] if orjson is not None else [])
+
+
+def default_parser() -> str:
+    return "orjson" if orjson is not None else "json"
+
+
+def get_loads(parser: str) -> Callable[[bytes], Any]:
+    if parser == "orjson":
+        if orjson is None:
+            raise ValueError("orjson がインストールされていません。")
+        return orjson.loads
+    return json.loads
+
+
+def dumps_indented(data: Any) -> bytes:
+    """
+    json.dumps(data, ensure_ascii=False, indent=2) と同じバイト列を返す（orjson があれば orjson で書く）。
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def dumps_compact(data: Any) -> bytes:
+    """
+    1 行に収まるコンパクトな JSON (キーの順序はそのまま) を返す。
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_canonical(data: Any) -> bytes:
+    """
+    json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")) と同じバイト列を返す
+    （content_hash 用。orjson があれば orjson で書く）。
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def record_hash(record: dict) -> str:
+    """
+    レコード (Pokemon.record_fields() の全列) の内容の SHA-1。Pokemon.content_hash に入れる（キーの順序に依存しない）。
+    all_register と all_set_original の両方がこれで求める。
+    """
+    return hashlib.sha1(dumps_canonical(record)).hexdigest()
+
+
+# --------------------------------------------------
+# 射影: generate_records (move は all_register_moves) が参照するフィールドだけを残す
+# --------------------------------------------------
+def project_species(data: dict) -> dict:
+    return {
+        "name": data.get("name", ""),
+        "names": [
+            name_info for name_info in data.get("names", [])
+            if name_info.get("language", {}).get("name") == "ja-Hrkt"
+        ],
+        "pokedex_numbers": data.get("pokedex_numbers", []),
+        "varieties": [
+            {"pokemon": {"url": variety.get("pokemon", {}).get("url", "")}}
+            for variety in data.get("varieties", [])
+        ],
+    }
+
+
+def project_pokemon(data: dict) -> dict:
+    """
+    moves は世代ごとのフラグと覚える技の一覧にしか使わないため、ここで learnset.generation_fields を計算して
+    moves 自体は捨てる（読み込みと同じワーカーで 1 回だけ走査する）。
+    """
+    return {
+        "id": data.get("id"),
+        "forms": [{"url": form.get("url", "")} for form in data.get("forms", [])],
+        "types": data.get("types", []),
+        "abilities": data.get("abilities", []),
+        "stats": [{"base_stat": stat.get("base_stat")} for stat in data.get("stats", [])],
+        "sprites": {"front_default": data.get("sprites", {}).get("front_default")},
+        learnset.PRECOMPUTED_KEY: learnset.generation_fields(data.get("moves", [])),
+    }
+
+
+def project_form(data: dict) -> dict:
+    return {
+        "name": data.get("name", ""),
+        "form_name": data.get("form_name", "---"),
+        "form_names": [
+            name_info for name_info in data.get("form_names", [])
+            if name_info.get("language", {}).get("name") == "ja-Hrkt"
+        ],
+        "sprites": {"front_default": data.get("sprites", {}).get("front_default")},
+    }
+
+
+def project_move(data: dict) -> dict:
+    return {
+        "id": data.get("id"),
+        "name": data.get("name", ""),
+        "names": [
+            name_info for name_info in data.get("names", [])
+            if name_info.get("language", {}).get("name") in ("ja-Hrkt", "ja")
+        ],
+        "type": {"name": (data.get("type") or {}).get("name")},
+        "damage_class": {"name": (data.get("damage_class") or {}).get("name")},
+        "power": data.get("power"),
+        "accuracy": data.get("accuracy"),
+        "pp": data.get("pp"),
+        "priority": data.get("priority"),
+        "generation": {"name": (data.get("generation") or {}).get("name")},
+    }
+
+
+PROJECTIONS: Dict[str, Callable[[dict], dict]] = {
+    "pokemon-species": project_species,
+    "pokemon-pokemon": project_pokemon,
+    "pokemon-form": project_form,
+    "move": project_move,
+}
+
+
+def _decode(raw: bytes, loads: Callable[[bytes], Any], projection: Optional[str]) -> Any:
+    data = loads(raw)
+    if projection is not None and isinstance(data, dict):
+        data = PROJECTIONS[projection](data)
+    return data
+
+
+# --------------------------------------------------
+# ワーカーで実行する読み込み関数
+# --------------------------------------------------
+def load_files(paths: List[str], parser: str = "json", projection: Optional[str] = None) -> LoadResult:
+    """
+    *.json ファイルのまとまりを読み込む。projection を指定すると PROJECTIONS で必要なフィールドだけにする。
+    """
+    loads = get_loads(parser)
+    loaded: List[Tuple[str, Any]] = []
+    errors: List[Tuple[str, str]] = []
+    for path_str in paths:
+        path = Path(path_str)
+        try:
+            loaded.append((path.stem, _decode(path.read_bytes(), loads, projection)))
+        except Exception as e:
+            errors.append((path_str, str(e)))
+    return loaded, errors
+
+
+def load_pack_ids(
+    directory: str,
+    ids: List[int],
+    parser: str = "json",
+    projection: Optional[str] = None,
+) -> LoadResult:
+    """
+    パック (pack.seg) から指定した ID のまとまりを読み込む。
+    """
+    loads = get_loads(parser)
+    loaded: List[Tuple[str, Any]] = []
+    errors: List[Tuple[str, str]] = []
+    with PackReader(Path(directory)) as reader:
+        for id_num in ids:
+            try:
+                loaded.append((f"{id_num:05d}", _decode(reader.get_bytes(id_num), loads, projection)))
+            except Exception as e:
+                errors.append((f"{directory} (id={id_num})", str(e)))
+    return loaded, errors
+
+
+def run_jobs(
+    jobs: Sequence[Tuple[Hashable, Callable[..., LoadResult], tuple]],
+    workers: int,
+    collect: Callable[[Hashable, LoadResult], None],
+) -> None:
+    """
+    (キー, 読み込み関数, 引数) のジョブを実行し、終わったものから collect(キー, 結果) を呼ぶ。
+    workers <= 1 ならこのプロセスで順に実行する。
+    """
+    if workers <= 1:
+        for key, func, args in jobs:
+            collect(key, func(*args))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, *args): key for key, func, args in jobs}
+        for future in as_completed(futures):
+            collect(futures[future], future.result())
@@ -0,0 +1,67 @@
+# regions.py
+#
+# 地方ごとの一覧 (api の National / Galar / Paldea) に載るかどうかを、登録時に 1 回だけ判定する。
+# all_register がレコードごとに membership() を呼び、結果を Pokemon の in_<地方> 列 (索引付き) に入れる。
+# ビューは in_<地方>=True で絞るだけなので、リクエストごとに正規表現を行ごとに評価しなくてよい。
+#
+# 地方を増やすときは、判定関数を REGIONS に足し、Pokemon に in_<地方> 列と索引を足す。
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict
+
+# 判定に使うフィールド (all_set_original が DB から読む)
+MEMBERSHIP_FIELDS = ("sub_ja", "original", "exist_generation_08", "exist_generation_09", "front_default_url")
+
+# sub_ja に英字が含まれるもの (メガシンカ以外の特別なフォルムなど) は一覧に載せない
+LATIN_PATTERN = re.compile(r"[A-Za-z]")
+
+
+def _sub_ja(record: dict) -> str:
+    return record.get("sub_ja") or ""
+
+
+def has_image(record: dict) -> bool:
+    return bool(record.get("front_default_url"))
+
+
+def in_national(record: dict) -> bool:
+    # original=True かつ sub_ja に英字が含まれないもの
+    return bool(record.get("original")) and not LATIN_PATTERN.search(_sub_ja(record))
+
+
+def in_galar(record: dict) -> bool:
+    # 剣盾に登場し、メガシンカではなく、sub_ja に英字が含まれないもの（キョダイマックスは載せる）
+    sub_ja = _sub_ja(record)
+    return (
+        bool(record.get("exist_generation_08"))
+        and "メガ" not in sub_ja
+        and (not LATIN_PATTERN.search(sub_ja) or sub_ja == "gmax")
+    )
+
+
+def in_paldea(record: dict) -> bool:
+    # SV に登場し、メガシンカではなく、sub_ja に英字が含まれないもの
+    sub_ja = _sub_ja(record)
+    return bool(record.get("exist_generation_09")) and "メガ" not in sub_ja and not LATIN_PATTERN.search(sub_ja)
+
+
+# 地方名 -> 判定関数。列名は region_field(地方名)
+REGIONS: Dict[str, Callable[[dict], bool]] = {
+    "national": in_national,
+    "galar": in_galar,
+    "paldea": in_paldea,
+}
+
+
+def region_field(region: str) -> str:
+    return f"in_{region}"
+
+
+def membership(record: dict) -> Dict[str, bool]:
+    """
+    {in_<地方>: 一覧に載るか} を返す。画像の無いものはどの一覧にも載せない。
+    """
+    image = has_image(record)
+    return {region_field(region): image and predicate(record) for region, predicate in REGIONS.items()}
@@ -0,0 +1,184 @@
+# stream.py
+#
+# all_register のストリーミング結合用。species を順にたどりながら、参照された pokemon / form を
+# その都度ディスク (ファイル or パック) から読み、件数上限付きの LRU にだけ保持する。
+
+from __future__ import annotations
+
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Tuple
+
+from pokedex.fetch.store import PackReader, PackStore, resolve_layout
+from pokedex.register import loader
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+class MemoryBudget:
+    """
+    tracemalloc で Python ヒープの使用量を測り、上限 (バイト) を超えていないかを判定する。
+    limit_bytes=None なら計測だけを行う。
+    """
+
+    def __init__(self, limit_bytes: Optional[int] = None) -> None:
+        self.limit_bytes = limit_bytes
+        self._peak = 0
+        self._started_here = not tracemalloc.is_tracing()
+        if self._started_here:
+            tracemalloc.start()
+
+    def current(self) -> int:
+        return tracemalloc.get_traced_memory()[0]
+
+    def peak(self) -> int:
+        if tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        return self._peak
+
+    def exceeded(self) -> bool:
+        return self.limit_bytes is not None and self.current() > self.limit_bytes
+
+    def stop(self) -> None:
+        """
+        計測を止める。止めた後も peak() は止める直前の値を返す。
+        """
+        self.peak()
+        if self._started_here and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class DocumentCache:
+    """
+    件数上限付きの LRU キャッシュ。
+
+    budget があれば、追加のたびに使用量を確かめ、上限を超えていれば古いものから捨てる。
+    全部捨てても上限を超えている場合は MemoryLimitExceeded を送出する。
+    """
+
+    def __init__(self, max_items: int, budget: Optional[MemoryBudget] = None) -> None:
+        self.max_items = max(1, max_items)
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        if key in self._items:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+
+        self.misses += 1
+        value = load()
+        self._items[key] = value
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        if self.budget is not None and self.budget.exceeded():
+            # 直前に読んだもの以外を古い順に手放す
+            while len(self._items) > 1 and self.budget.exceeded():
+                self._items.popitem(last=False)
+            if self.budget.exceeded():
+                raise MemoryLimitExceeded(
+                    f"メモリ使用量 {self.budget.current() / 1024 / 1024:.1f} MB が上限 "
+                    f"{self.budget.limit_bytes / 1024 / 1024:.1f} MB を超えました。"
+                )
+        return value
+
+
+class LazyDocumentMap(Mapping):
+    """
+    {5桁ID: データ} の Mapping として振る舞い、値は参照されたときに読み込む。
+    読み込んだデータは DocumentCache (LRU) にだけ保持し、追い出されたら解放される。
+
+    generate_records は dict の代わりにこれを受け取れる (keys / [] / get しか使わないため)。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Path,
+        cache: DocumentCache,
+        raw_format: str = "auto",
+        parser: str = "json",
+        projection: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.directory = directory
+        self.cache = cache
+        self.projection = projection
+        self.errors: List[Tuple[str, str]] = []
+        self._loads = loader.get_loads(parser)
+        self._reader: Optional[PackReader] = None
+        if resolve_layout(directory, raw_format) == PackStore.format_name:
+            self._reader = PackReader(directory)
+            self._keys = [f"{id_num:05d}" for id_num in self._reader.ids()]
+        else:
+            self._keys = sorted(path.stem for path in directory.glob("*.json"))
+        self._key_set = frozenset(self._keys)
+
+    def __getitem__(self, key: str) -> dict:
+        if key not in self._key_set:
+            raise KeyError(key)
+        data = self.cache.get((self.name, key), lambda: self._load(key))
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _load(self, key: str) -> Optional[dict]:
+        """
+        1 件読み込む。壊れている場合は errors に記録して None を返す（キャッシュには None が入る）。
+        """
+        try:
+            if self._reader is not None:
+                raw = self._reader.get_bytes(int(key))
+                where = f"{self.directory / PackStore.SEGMENT_NAME} (id={int(key)})"
+            else:
+                path = self.directory / f"{key}.json"
+                raw = path.read_bytes()
+                where = str(path)
+        except (OSError, KeyError, ValueError) as e:
+            self.errors.append((f"{self.directory} ({key})", str(e)))
+            return None
+        try:
+            data = self._loads(raw)
+        except ValueError as e:
+            self.errors.append((where, str(e)))
+            return None
+        if self.projection is not None and isinstance(data, dict):
+            data = loader.PROJECTIONS[self.projection](data)
+        return data
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+def open_lazy_maps(
+    directories: Dict[str, Path],
+    cache: DocumentCache,
+    raw_format: str = "auto",
+    parser: str = "json",
+    project: bool = False,
+) -> Dict[str, LazyDocumentMap]:
+    return {
+        name: LazyDocumentMap(
+            name,
+            directory,
+            cache,
+            raw_format=raw_format,
+            parser=parser,
+            projection=name if project else None,
+        )
+        for name, directory in directories.items()
+    }
@@ -0,0 +1,157 @@
+# swap.py
+#
+# all_register の影テーブル (shadow table) への構築と、本番テーブルとの入れ替え。
+#
+#   pokedex_pokemon__shadow  新しいデータを組み立てる表（読み手からは見えない）
+#   pokedex_pokemon          API が読む表
+#   pokedex_pokemon__old     直前の版。--rollback で即座に戻せるように残す
+#
+# 入れ替えは 1 トランザクション内の RENAME だけで行うため、読み手は旧版か新版のどちらか一方しか見ない。
+# SQLite では WAL モードにして、構築・入れ替え中も読み手がロック待ちにならないようにする。
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple, Type
+
+from django.db import connection, models
+from django.db.migrations.executor import MigrationExecutor
+
+SHADOW_SUFFIX = "__shadow"
+OLD_SUFFIX = "__old"
+
+# (モデル, テーブル名) -> 動的に作ったモデル。同じ名前のモデルを二度登録しないようにキャッシュする
+_table_models: Dict[Tuple[Type[models.Model], str], Type[models.Model]] = {}
+
+
+def enable_wal() -> None:
+    """
+    SQLite なら WAL モードにする（設定は DB ファイルに残る）。他のデータベースでは何もしない。
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+
+def table_model(model: Type[models.Model], db_table: str) -> Type[models.Model]:
+    """
+    model と同じ列を持ち、db_table を読み書きする managed=False のモデルを返す。
+    影テーブルは読み込みを速くするため、主キー以外のインデックスを付けずに作る。
+    """
+    key = (model, db_table)
+    if key in _table_models:
+        return _table_models[key]
+
+    meta = type(
+        "Meta",
+        (),
+        {"db_table": db_table, "managed": False, "app_label": model._meta.app_label},
+    )
+    attrs = {"__module__": model.__module__, "Meta": meta}
+    for field in model._meta.local_fields:
+        cloned = field.clone()
+        if not cloned.primary_key:
+            cloned.db_index = False
+        attrs[field.name] = cloned
+
+    class_name = model.__name__ + "".join(part.capitalize() for part in db_table.split("__")[1:])
+    table_cls = type(class_name, (models.Model,), attrs)
+    _table_models[key] = table_cls
+    return table_cls
+
+
+def table_exists(db_table: str) -> bool:
+    with connection.cursor() as cursor:
+        return db_table in connection.introspection.table_names(cursor)
+
+
+def unapplied_migrations(app_label: str) -> List[str]:
+    """
+    app_label のマイグレーションのうち、まだ適用されていないものの名前を返す（依存する他のアプリの分も含む）。
+    """
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes(app_label))
+    return [f"{migration.app_label}.{migration.name}" for migration, backwards in plan if not backwards]
+
+
+def create_shadow(model: Type[models.Model], copy_rows: bool = True) -> Type[models.Model]:
+    """
+    影テーブルを作り直し、そのモデルを返す。copy_rows=True なら現在の行をそのまま写す
+    （差分登録をかけるため、および all_set_original が付けた列を引き継ぐため）。
+    """
+    live_table = model._meta.db_table
+    shadow = table_model(model, live_table + SHADOW_SUFFIX)
+    shadow_table = shadow._meta.db_table
+
+    with connection.schema_editor() as editor:
+        if table_exists(shadow_table):
+            editor.delete_model(shadow)
+        editor.create_model(shadow)
+        if copy_rows:
+            columns = ", ".join(editor.quote_name(field.column) for field in model._meta.local_fields)
+            editor.execute(
+                f"INSERT INTO {editor.quote_name(shadow_table)} ({columns}) "
+                f"SELECT {columns} FROM {editor.quote_name(live_table)}"
+            )
+    return shadow
+
+
+def swap_in(model: Type[models.Model]) -> None:
+    """
+    影テーブルを本番に入れ替える。本番だった表は __old として残す（前の __old は捨てる）。
+    """
+    live_table = model._meta.db_table
+    shadow_table = live_table + SHADOW_SUFFIX
+    old_table = live_table + OLD_SUFFIX
+    if not table_exists(shadow_table):
+        raise RuntimeError(f"影テーブル {shadow_table} がありません。")
+
+    with connection.schema_editor(atomic=True) as editor:
+        if table_exists(old_table):
+            editor.delete_model(table_model(model, old_table))
+        _drop_secondary_indexes(editor, live_table)
+        _rename(editor, live_table, old_table)
+        _rename(editor, shadow_table, live_table)
+        _create_secondary_indexes(editor, model)
+
+
+def rollback(model: Type[models.Model]) -> None:
+    """
+    __old と本番を入れ替える。もう一度呼ぶと元に戻る。
+    """
+    live_table = model._meta.db_table
+    old_table = live_table + OLD_SUFFIX
+    tmp_table = live_table + SHADOW_SUFFIX
+    if not table_exists(old_table):
+        raise RuntimeError(f"戻せる版 ({old_table}) がありません。")
+
+    with connection.schema_editor(atomic=True) as editor:
+        if table_exists(tmp_table):
+            editor.delete_model(table_model(model, tmp_table))
+        _drop_secondary_indexes(editor, live_table)
+        _rename(editor, live_table, tmp_table)
+        _rename(editor, old_table, live_table)
+        _rename(editor, tmp_table, old_table)
+        _create_secondary_indexes(editor, model)
+
+
+def _rename(editor, old_name: str, new_name: str) -> None:
+    editor.execute(
+        editor.sql_rename_table % {"old_table": editor.quote_name(old_name), "new_table": editor.quote_name(new_name)}
+    )
+
+
+def _drop_secondary_indexes(editor, db_table: str) -> None:
+    """
+    主キー・UNIQUE 以外のインデックスを落とす。インデックス名はデータベース全体で一意なので、
+    入れ替え後の本番テーブルに同じ名前で作り直す前に、旧テーブルから外しておく。
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, db_table)
+    for name, info in constraints.items():
+        if info.get("index") and not info.get("primary_key") and not info.get("unique"):
+            editor.execute(editor.sql_delete_index % {"table": editor.quote_name(db_table), "name": editor.quote_name(name)})
+
+
+def _create_secondary_indexes(editor, model: Type[models.Model]) -> None:
+    for statement in editor._model_indexes_sql(model):
+        editor.execute(statement)
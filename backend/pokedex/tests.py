@@ -0,0 +1,1778 @@
+# tests.py
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from unittest import mock
+
+import aiohttp
+from aiohttp import web
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from pokedex.fetch import codec
+from pokedex.fetch.crawl import parse_id_ranges
+from pokedex.fetch.journal import FetchJournal
+from pokedex.fetch.manifest import FetchManifest
+from pokedex.fetch.mock_server import MockConfig, MockPokeAPI
+from pokedex.fetch.retry import AdaptiveLimiter, EndpointStats, RetryPolicy, parse_retry_after
+from pokedex.fetch.scheduler import FetchScheduler
+from pokedex.fetch.store import (
+    LAYOUT_FILE_NAME,
+    JsonFileStore,
+    PackReader,
+    PackStore,
+    load_pack_index,
+    resolve_layout,
+)
+from pokedex.management.commands.check_query_plans import QUERY_SHAPES, Command as CheckQueryPlansCommand
+from pokedex.models.pokemon import Pokemon
+from pokedex.models.data_version import DataVersion
+from pokedex.models.move import Move, PokemonMove
+from pokedex.register import extract, grouping, learnset, loader, regions, swap
+from pokedex.register.stream import DocumentCache, LazyDocumentMap, MemoryBudget, MemoryLimitExceeded
+
+NAMES = ["フシギダネ", "ヒトカゲ", "ゼニガメ", "ピカチュウ", "イーブイ", "ミュウ"]
+SUB_NAMES = ["", "メガ", "gmax", "ガラルのすがた"]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockServer:
+    """
+    MockPokeAPI (manage.py pokeapi_mock と同じアプリ) を別スレッドのイベントループで動かす。
+    フェッチのコマンドは asyncio.run で自分のループを回すので、サーバーは別のループに置く。
+
+    Usage:
+        server = MockServer(items=5)
+        server.start()
+        ...  # server.base_url に向けてフェッチ。server.api.counters で受けたリクエストを見る
+        server.stop()
+    """
+
+    def __init__(self, api_class=MockPokeAPI, **config) -> None:
+        self.api = api_class(MockConfig(port=free_port(), **config))
+        self.base_url = self.api.config.base_url
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = web.AppRunner(self.api.create_app())
+
+    def start(self) -> None:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=10)
+
+    async def _start(self) -> None:
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.api.config.host, self.api.config.port).start()
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+
+
+class TempDirMixin:
+    """
+    一時ディレクトリを BASE_DIR (フェッチの保存先) とカレントディレクトリ (all_register の data/) にする。
+    tqdm の進捗表示も止める。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix="pokedex_test_"))
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        previous_cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        self.addCleanup(os.chdir, previous_cwd)
+        settings_override = override_settings(BASE_DIR=self.tmp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        env_patch = mock.patch.dict(os.environ, {"TQDM_DISABLE": "1"})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def raw_dir(self, group_name: str, sub_name: str) -> Path:
+        return self.tmp_dir / "data" / "raw" / group_name / sub_name
+
+
+class MockServerMixin(TempDirMixin):
+    """
+    テストごとに MockServer を起動する。mock_config はモックの設定 (MockConfig のフィールド)、
+    api_class は障害を差し込むときの MockPokeAPI のサブクラス。
+    """
+
+    mock_config: dict = {"items": 4, "moves": 3}
+    api_class = MockPokeAPI
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.server = MockServer(self.api_class, **self.mock_config)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def fetch(self, command: str, *args: str) -> str:
+        """
+        モックに向けてフェッチのコマンドを実行し、標準出力を返す（エラーの出力があれば失敗）。
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(command, *args, "--base-url", self.server.base_url, stdout=stdout, stderr=stderr)
+        self.assertEqual(stderr.getvalue(), "")
+        return stdout.getvalue()
+
+
+def ja_name(name: str) -> list:
+    return [{"language": {"name": "ja-Hrkt"}, "name": name}]
+
+
+def learned(move_id: int, method: str, level: int, *version_groups: str) -> dict:
+    return {
+        "move": {"name": f"move-{move_id}", "url": f"https://pokeapi.co/api/v2/move/{move_id}/"},
+        "version_group_details": [
+            {"level_learned_at": level, "move_learn_method": {"name": method}, "version_group": {"name": name}}
+            for name in version_groups
+        ],
+    }
+
+
+def raw_pokemon(id_num: int, forms: list, abilities: list, stats: list, moves: list) -> dict:
+    return {
+        "id": id_num,
+        "name": f"pokemon-{id_num}",
+        "forms": [{"name": "", "url": f"https://pokeapi.co/api/v2/pokemon-form/{form}/"} for form in forms],
+        "types": [{"slot": 1, "type": {"name": "grass"}}, {"slot": 2, "type": {"name": "poison"}}],
+        "abilities": [{"slot": slot, "ability": {"name": name}} for slot, name in abilities],
+        "stats": [{"base_stat": value} for value in stats],
+        "sprites": {"front_default": f"https://example.invalid/{id_num}.png", "back_default": None},
+        "moves": moves,
+        "weight": 69,
+    }
+
+
+def raw_form(id_num: int, name: str, form_name: str = "", sub_ja: Optional[str] = None) -> dict:
+    return {
+        "id": id_num,
+        "name": name,
+        "form_name": form_name,
+        "form_names": ja_name(sub_ja) if sub_ja is not None else [],
+        "sprites": {"front_default": f"https://example.invalid/form-{id_num}.png"},
+    }
+
+
+def raw_dataset() -> Dict[str, Dict[int, dict]]:
+    """
+    all_register / all_extract / all_register_moves 用の小さな生データ {サブエンドポイント名: {ID: データ}}。
+
+    - species 1: pokemon 1 (form 1) と、種族値の違うメガシンカ pokemon 10033 (form 10033)
+    - species 4: pokemon 4 が form 4 / 10004 (gmax) / 10005 (種族値の同じ別の姿) を持つ
+    - move 22 / 33
+    """
+    return {
+        "pokemon-species": {
+            1: {
+                "id": 1,
+                "name": "bulbasaur",
+                "names": ja_name("フシギダネ") + [{"language": {"name": "en"}, "name": "Bulbasaur"}],
+                "pokedex_numbers": [
+                    {"entry_number": 1, "pokedex": {"name": "national"}},
+                    {"entry_number": 164, "pokedex": {"name": "blueberry"}},
+                ],
+                "varieties": [
+                    {"is_default": True, "pokemon": {"url": "https://pokeapi.co/api/v2/pokemon/1/"}},
+                    {"is_default": False, "pokemon": {"url": "https://pokeapi.co/api/v2/pokemon/10033/"}},
+                ],
+            },
+            4: {
+                "id": 4,
+                "name": "charmander",
+                "names": ja_name("ヒトカゲ"),
+                "pokedex_numbers": [{"entry_number": 4, "pokedex": {"name": "national"}}],
+                "varieties": [{"is_default": True, "pokemon": {"url": "https://pokeapi.co/api/v2/pokemon/4/"}}],
+            },
+        },
+        "pokemon-pokemon": {
+            1: raw_pokemon(
+                1, [1], [(1, "overgrow"), (3, "chlorophyll")], [45, 49, 49, 65, 65, 45],
+                [learned(22, "level-up", 7, "red-blue", "scarlet-violet"), learned(33, "level-up", 1, "red-blue")],
+            ),
+            10033: raw_pokemon(
+                10033, [10033], [(1, "thick-fat")], [80, 100, 123, 122, 120, 80],
+                [learned(22, "machine", 0, "x-y")],
+            ),
+            4: raw_pokemon(
+                4, [4, 10004, 10005], [(1, "blaze"), (3, "solar-power")], [39, 52, 43, 60, 50, 65],
+                [learned(33, "egg", 0, "sword-shield"), learned(999, "level-up", 1, "sword-shield")],
+            ),
+        },
+        "pokemon-form": {
+            1: raw_form(1, "bulbasaur"),
+            10033: raw_form(10033, "venusaur-mega", "mega", "メガフシギバナ"),
+            4: raw_form(4, "charmander"),
+            10004: raw_form(10004, "charmander-gmax", "gmax"),
+            10005: raw_form(10005, "charmander-alt", "alt", "べつのすがた"),
+        },
+        "move": {
+            22: {
+                "id": 22,
+                "name": "vine-whip",
+                "names": ja_name("つるのムチ") + [{"language": {"name": "en"}, "name": "Vine Whip"}],
+                "type": {"name": "grass"},
+                "damage_class": {"name": "physical"},
+                "power": 45,
+                "accuracy": 100,
+                "pp": 25,
+                "priority": 0,
+                "generation": {"name": "generation-i"},
+            },
+            33: {
+                "id": 33,
+                "name": "tackle",
+                "names": ja_name("たいあたり"),
+                "type": {"name": "normal"},
+                "damage_class": {"name": "physical"},
+                "power": 40,
+                "accuracy": 100,
+                "pp": 35,
+                "priority": 0,
+                "generation": {"name": "generation-i"},
+            },
+        },
+    }
+
+
+class RawDataMixin(TempDirMixin):
+    """
+    raw_dataset() を一時ディレクトリの data/raw に書く。
+    """
+
+    def write_raw(self, layout: str = JsonFileStore.format_name, dataset: Optional[dict] = None) -> dict:
+        dataset = dataset if dataset is not None else raw_dataset()
+        for sub_name, documents in dataset.items():
+            json_dir = self.raw_dir("move" if sub_name == "move" else "pokemon", sub_name)
+            if layout == PackStore.format_name:
+                store = PackStore(json_dir)
+                for id_num, data in documents.items():
+                    store.put(id_num, data)
+                store.close()
+            else:
+                json_dir.mkdir(parents=True, exist_ok=True)
+                for id_num, data in documents.items():
+                    (json_dir / f"{id_num:05d}.json").write_text(
+                        json.dumps(data, ensure_ascii=False, indent=4), encoding="utf-8"
+                    )
+                (json_dir / LAYOUT_FILE_NAME).write_text(layout + "\n", encoding="utf-8")
+        return dataset
+
+    def call(self, command: str, *args: str) -> str:
+        """
+        コマンドを実行して標準出力を返す（エラーの出力があれば失敗）。
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(command, *args, stdout=stdout, stderr=stderr)
+        self.assertEqual(stderr.getvalue(), "")
+        return stdout.getvalue()
+
+    def merged(self) -> bytes:
+        return (self.tmp_dir / "data" / "merged" / "pokedex_check.json").read_bytes()
+
+
+def make_pokemon(index: int) -> Pokemon:
+    # 同じ ja を複数の行に持たせ、(ja, unique_id) の並びとカーソルの境界も索引で引けるか見る
+    record = {
+        "unique_id": f"{index:05d}-{index % 3:02d}",
+        "species_id": f"{index:04d}",
+        "pokemon_id": f"{index:05d}",
+        "form_id": f"{index:05d}",
+        "ja": NAMES[index % len(NAMES)],
+        "en": f"mon{index}",
+        "sub_ja": SUB_NAMES[index % len(SUB_NAMES)],
+        "front_default_url": f"https://example.com/{index}.png" if index % 7 else None,
+        "original": index % 2 == 0,
+        "exist_generation_08": index % 3 != 0,
+        "exist_generation_09": index % 4 != 0,
+        "base_h": 40 + index,
+        "base_a": 50 + index,
+        "base_b": 60 + index,
+        "base_c": 70 + index,
+        "base_d": 80 + index,
+        "base_s": 90 + index,
+        "base_t": 390 + index * 6,
+        "species_json_file": f"{index:05d}.json",
+        "pokemon_json_file": f"{index:05d}.json",
+        "form_json_file": f"{index:05d}.json",
+    }
+    record.update(regions.membership(record))
+    return Pokemon(**record)
+
+
+class QueryPlanTests(TestCase):
+    """
+    マイグレーションで作った表に対し、地方の一覧が発行する SQL が索引を使うこと (check_query_plans と同じ判定)。
+    Pokemon.Meta.indexes やマイグレーションから索引が消えると失敗する。
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Pokemon.objects.bulk_create(make_pokemon(index) for index in range(1, 61))
+
+    def setUp(self) -> None:
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN は SQLite のみ")
+        self.command = CheckQueryPlansCommand()
+
+    def test_indexes_exist(self) -> None:
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Pokemon._meta.db_table)
+        for index in Pokemon._meta.indexes:
+            with self.subTest(index=index.name):
+                self.assertIn(index.name, constraints)
+
+    def test_list_queries_use_index(self) -> None:
+        shapes = QUERY_SHAPES + self.command.cursor_shapes()
+        self.assertTrue(any(name.startswith("national cursor") for name, _, _ in shapes))
+        for name, view_class, params in shapes:
+            queries = self.command.view_queries(view_class, params)
+            self.assertTrue(queries, name)
+            for sql in queries:
+                with self.subTest(shape=name, sql=sql.split(" FROM ")[0][:40]):
+                    plan = self.command.explain(sql)
+                    self.assertTrue(self.command.uses_index(plan, Pokemon._meta.db_table), "\n".join(plan))
+
+    def test_time_queries_reports_p50_and_p99(self) -> None:
+        samples = iter([0.0, 1.0, 1.0, 2.0, 2.0, 5.0, 5.0, 9.0])  # 1 回あたり 1, 1, 3, 4 秒
+        with mock.patch(
+            "pokedex.management.commands.check_query_plans.time.perf_counter", side_effect=lambda: next(samples)
+        ):
+            p50, p99 = self.command.time_queries(["SELECT 1"], repeat=4)
+        self.assertEqual(p50, 2.0)
+        # p99 は標本の最大値を超えない
+        self.assertLessEqual(p99, 4.0)
+        self.assertGreater(p99, 3.0)
+
+
+class FetchSchedulerTests(MockServerMixin, SimpleTestCase):
+    """
+    FetchScheduler: 同時実行数の上限、優先度順の取り出し、ホストごとの接続数の上限。
+    """
+
+    mock_config = {"items": 12, "moves": 3, "latency": 0.02}
+
+    def test_worker_pool_bounds_concurrency(self) -> None:
+        async def main():
+            in_flight = 0
+            peak = 0
+
+            async def job(index: int) -> int:
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return index
+
+            async with FetchScheduler(concurrency=3, per_host=3) as scheduler:
+                results = await asyncio.gather(*(scheduler.submit(job, index) for index in range(10)))
+            return results, peak, scheduler
+
+        results, peak, scheduler = asyncio.run(main())
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(peak, 3)
+        self.assertEqual((scheduler.completed, scheduler.failed), (10, 0))
+
+    def test_priority_order(self) -> None:
+        # ワーカー 1 つを止めている間に積んだジョブは、priority の小さい順・同じなら投入順に実行される
+        async def main():
+            order = []
+            gate = asyncio.Event()
+
+            async def record(name: str) -> None:
+                order.append(name)
+
+            async with FetchScheduler(concurrency=1, per_host=1) as scheduler:
+                blocker = scheduler.submit(gate.wait)
+                await asyncio.sleep(0)
+                futures = [
+                    scheduler.submit(record, "heavy", priority=2),
+                    scheduler.submit(record, "reference-a", priority=0),
+                    scheduler.submit(record, "normal", priority=1),
+                    scheduler.submit(record, "reference-b", priority=0),
+                ]
+                gate.set()
+                await asyncio.gather(blocker, *futures)
+            return order
+
+        self.assertEqual(asyncio.run(main()), ["reference-a", "reference-b", "normal", "heavy"])
+
+    def test_failed_job_does_not_stop_the_others(self) -> None:
+        async def main():
+            async def job(index: int) -> int:
+                if index == 2:
+                    raise ValueError("boom")
+                return index
+
+            async with FetchScheduler(concurrency=2, per_host=2) as scheduler:
+                results = await asyncio.gather(
+                    *(scheduler.submit(job, index) for index in range(5)), return_exceptions=True
+                )
+            return results, scheduler
+
+        results, scheduler = asyncio.run(main())
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual([result for result in results if not isinstance(result, Exception)], [0, 1, 3, 4])
+        self.assertEqual((scheduler.completed, scheduler.failed), (4, 1))
+
+    def test_shared_pool_limits_per_host(self) -> None:
+        # 2 つのリソースを 1 つのスケジューラで取っても、同じホストへの同時接続は per_host まで
+        async def main():
+            stats = EndpointStats(name="test")
+            async with FetchScheduler(concurrency=8, per_host=2) as scheduler:
+                urls = [
+                    f"{self.server.base_url}/{resource}/{id_num}/"
+                    for resource in ("pokemon-species", "move")
+                    for id_num in range(1, 7)
+                ]
+                responses = await asyncio.gather(*(scheduler.fetch(url, stats) for url in urls))
+            return responses, stats
+
+        responses, stats = asyncio.run(main())
+        self.assertEqual({response.status for response in responses}, {200})
+        self.assertEqual(stats.requests, 12)
+        self.assertEqual(self.server.api.peak_in_flight, 2)
+
+
+class FetchManifestTests(MockServerMixin, SimpleTestCase):
+    """
+    台帳 (.manifest) による条件付きリクエスト: 2 回目は If-None-Match を送り、304 なら書き換えない。
+    """
+
+    def test_record_and_prune(self) -> None:
+        manifest = FetchManifest(self.tmp_dir)
+        self.assertTrue(manifest.record(1, "a", '"e1"', None))
+        self.assertTrue(manifest.record(2, "b", None, "Wed, 01 Jan 2025 00:00:00 GMT"))
+        manifest.save()
+
+        manifest = FetchManifest(self.tmp_dir)
+        self.assertEqual(manifest.conditional_headers(1), {"If-None-Match": '"e1"'})
+        self.assertEqual(manifest.conditional_headers(2), {"If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"})
+        self.assertEqual(manifest.conditional_headers(3), {})
+        self.assertFalse(manifest.record(1, "a", '"e1"', None))
+        self.assertTrue(manifest.record(2, "c", None, None))
+        self.assertEqual(manifest.prune([1, 2, 3]), [])
+        self.assertEqual(manifest.prune([2]), ["00001"])
+        self.assertEqual(manifest.as_dict(), {"new": [], "changed": ["00002"], "removed": ["00001"], "unchanged_count": 1})
+
+    def test_broken_manifest_is_discarded(self) -> None:
+        (self.tmp_dir / FetchManifest.FILE_NAME).write_text("{not json", encoding="utf-8")
+        self.assertEqual(FetchManifest(self.tmp_dir).entries, {})
+
+    def test_refetch_is_conditional(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        first = self.fetch("fetch_move", "move")
+        self.assertIn("move: 新規 4 件 / 変更 0 件 / 変更なし 0 件 / 削除 0 件", first)
+        self.assertEqual(sorted(path.name for path in json_dir.glob("*.json")), [f"{i:05d}.json" for i in range(1, 5)])
+        mtimes = {path.name: path.stat().st_mtime_ns for path in json_dir.glob("*.json")}
+
+        # 2 回目: 全件 304 で、ファイルは書き換えない
+        second = self.fetch("fetch_move", "move")
+        self.assertIn("move: 新規 0 件 / 変更 0 件 / 変更なし 4 件 / 削除 0 件", second)
+        self.assertEqual(self.server.api.counters["not_modified"], 4)
+        self.assertEqual({path.name: path.stat().st_mtime_ns for path in json_dir.glob("*.json")}, mtimes)
+
+        # 上流で 1 件変わり、1 件消えた
+        bodies = self.server.api.bodies["move"]
+        bodies[2] = json.dumps({"id": 2, "name": "move-2-renamed"}).encode()
+        del bodies[4]
+        third = self.fetch("fetch_move", "move")
+        self.assertIn("move: 新規 0 件 / 変更 1 件 / 変更なし 2 件 / 削除 1 件", third)
+        self.assertEqual(json.loads((json_dir / "00002.json").read_text(encoding="utf-8"))["name"], "move-2-renamed")
+        self.assertFalse((json_dir / "00004.json").exists())
+        self.assertEqual(sorted(FetchManifest(json_dir).entries), ["00001", "00002", "00003"])
+
+    def test_missing_file_is_fetched_unconditionally(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        self.fetch("fetch_move", "move")
+        (json_dir / "00003.json").unlink()
+        self.fetch("fetch_move", "move")
+        # 消えたファイルには If-None-Match を付けずに取り直す（304 で空のままにならない）
+        self.assertEqual(self.server.api.counters["not_modified"], 3)
+        self.assertTrue((json_dir / "00003.json").exists())
+
+
+class FlakyPokeAPI(MockPokeAPI):
+    """
+    最初の failures 件のリクエストに 429 (Retry-After 付き) を返すモック。
+    """
+
+    failures = 0
+    retry_after = "0"
+
+    async def simulate(self):
+        self.counters["requests"] += 1
+        if self.failures > 0:
+            self.failures -= 1
+            self.counters["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": self.retry_after})
+        return None
+
+
+class RetryPolicyTests(SimpleTestCase):
+    def test_full_jitter_within_ceiling(self) -> None:
+        policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+        for attempt, ceiling in ((0, 0.5), (1, 1.0), (2, 2.0), (3, 4.0), (10, 4.0)):
+            delays = [policy.backoff(attempt) for _ in range(200)]
+            with self.subTest(attempt=attempt):
+                self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+                # 固定の待ち時間ではなく散らばる
+                self.assertGreater(len(set(delays)), 100)
+
+    def test_retry_after_takes_precedence(self) -> None:
+        policy = RetryPolicy(base_delay=0.5, max_delay=30.0)
+        self.assertEqual(policy.backoff(0, "7"), 7.0)
+        self.assertEqual(policy.backoff(5, "120"), 30.0)  # max_delay で頭打ち
+        retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=20), usegmt=True)
+        self.assertAlmostEqual(policy.backoff(0, retry_at), 20.0, delta=2.0)
+        # 解釈できない値はバックオフに戻る
+        self.assertLessEqual(policy.backoff(0, "soon"), 0.5)
+
+    def test_parse_retry_after(self) -> None:
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("later"))
+        self.assertEqual(parse_retry_after(" 3 "), 3.0)
+        self.assertEqual(parse_retry_after("-5"), 0.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)  # 過去の日時
+
+
+class AdaptiveLimiterTests(SimpleTestCase):
+    def test_multiplicative_decrease_and_additive_increase(self) -> None:
+        limiter = AdaptiveLimiter(max_limit=8, cooldown=0)
+        limiter.on_failure()
+        self.assertEqual(limiter.current_limit, 4)
+        limiter.on_success(latency=limiter.latency_target + 1)  # 遅すぎる応答も混雑とみなす
+        self.assertEqual(limiter.current_limit, 2)
+        for _ in range(5):
+            limiter.on_failure()
+        self.assertEqual(limiter.current_limit, 1)  # min_limit より下げない
+        self.assertEqual(limiter.lowest_limit, 1.0)
+
+        # 成功ごとに 1/limit ずつ増える（limit 回の成功でおおよそ +1）
+        limiter.on_success(latency=0.01)
+        self.assertEqual(limiter.limit, 2.0)
+        limiter.on_success(latency=0.01)
+        self.assertEqual(limiter.limit, 2.5)
+        self.assertEqual(limiter.current_limit, 2)
+        for _ in range(100):
+            limiter.on_success(latency=0.01)
+        self.assertEqual(limiter.current_limit, 8)  # max_limit より上げない
+
+    def test_cooldown_collapses_a_burst_of_failures(self) -> None:
+        limiter = AdaptiveLimiter(max_limit=16, cooldown=60)
+        for _ in range(10):
+            limiter.on_failure()
+        self.assertEqual((limiter.current_limit, limiter.decreases), (8, 1))
+
+    def test_limits_in_flight(self) -> None:
+        async def main():
+            limiter = AdaptiveLimiter(max_limit=4, cooldown=0)
+            limiter.on_failure()
+            in_flight = 0
+            peak = 0
+
+            async def request() -> None:
+                nonlocal in_flight, peak
+                async with limiter:
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                    await asyncio.sleep(0.01)
+                    in_flight -= 1
+
+            await asyncio.gather(*(request() for _ in range(10)))
+            return peak
+
+        self.assertEqual(asyncio.run(main()), 2)
+
+
+class FetchRetryTests(MockServerMixin, SimpleTestCase):
+    """
+    FetchScheduler.fetch: 429 を Retry-After に従って再試行し、そのたびに同時実行数を絞る。
+    """
+
+    api_class = FlakyPokeAPI
+
+    def fetch_one(self, max_retries: int):
+        policy = RetryPolicy(max_retries=max_retries, base_delay=30.0)
+
+        async def main():
+            stats = EndpointStats(name="test")
+            async with FetchScheduler(concurrency=4, per_host=4, retry_policy=policy) as scheduler:
+                try:
+                    response = await scheduler.fetch(f"{self.server.base_url}/move/1/", stats)
+                except aiohttp.ClientResponseError as exc:
+                    response = exc
+            return response, stats, scheduler.limiter
+
+        with mock.patch.object(policy, "backoff", wraps=policy.backoff) as backoff:
+            started = time.perf_counter()
+            response, stats, limiter = asyncio.run(main())
+            elapsed = time.perf_counter() - started
+        return response, stats, limiter, backoff, elapsed
+
+    def test_retries_after_429(self) -> None:
+        self.server.api.failures = 2
+        response, stats, limiter, backoff, elapsed = self.fetch_one(max_retries=3)
+        self.assertEqual(response.status, 200)
+        self.assertEqual((stats.requests, stats.attempts, stats.retries, stats.failures), (1, 3, 2, 0))
+        self.assertEqual(stats.statuses, {429: 2, 200: 1})
+        # Retry-After: 0 に従い、base_delay (30 秒) のバックオフでは待たない
+        self.assertEqual([call.args for call in backoff.call_args_list], [(0, "0"), (1, "0")])
+        self.assertLess(elapsed, 5)
+        # 429 で同時実行数を半分に絞る（減少は cooldown の間 1 回まで）
+        self.assertEqual((limiter.decreases, limiter.lowest_limit), (1, 2.0))
+
+    def test_gives_up_after_max_retries(self) -> None:
+        self.server.api.failures = 10
+        response, stats, _, _, _ = self.fetch_one(max_retries=1)
+        self.assertIsInstance(response, aiohttp.ClientResponseError)
+        self.assertEqual(response.status, 429)
+        self.assertEqual((stats.attempts, stats.retries, stats.failures), (2, 1, 1))
+        self.assertEqual(self.server.api.failures, 8)
+
+    def test_fetch_command_survives_throttling(self) -> None:
+        self.server.api.failures = 3
+        output = self.fetch("fetch_move", "move")
+        self.assertIn("move: 新規 4 件", output)
+        self.assertIn("混雑により同時実行数を", output)
+        self.assertEqual(self.server.api.counters["throttled"], 3)
+
+
+class RecordingPokeAPI(MockPokeAPI):
+    """
+    受けたリクエストのパス (/api/v2/move/3/ など) を順に記録するモック。
+    """
+
+    def create_app(self) -> web.Application:
+        self.paths = []
+
+        @web.middleware
+        async def record(request: web.Request, handler):
+            self.paths.append(request.path)
+            return await handler(request)
+
+        app = super().create_app()
+        app.middlewares.append(record)
+        return app
+
+    def item_ids(self, resource: str) -> list:
+        prefix = f"/api/v2/{resource}/"
+        return sorted(int(path[len(prefix):].strip("/")) for path in self.paths if path.startswith(prefix) and path != prefix)
+
+
+class FetchJournalTests(TempDirMixin, SimpleTestCase):
+    def test_last_line_wins_and_partial_lines_are_ignored(self) -> None:
+        path = self.tmp_dir / "01move.journal"
+        path.write_text("ok 00001\nfail 00002\nok 00002\nok 00003\nfail 00003\nok", encoding="utf-8")
+        journal = FetchJournal(path, resume=True)
+        self.addCleanup(journal.close)
+        self.assertEqual(journal.completed_ids, {"00001", "00002"})
+        self.assertTrue(journal.is_completed(2))
+        self.assertFalse(journal.is_completed(3))
+
+        journal.record(3, ok=True)
+        journal.close()
+        # 書きかけの行は切り詰めてから追記する
+        self.assertTrue(path.read_text(encoding="utf-8").endswith("fail 00003\nok 00003\n"))
+        self.assertEqual(FetchJournal(path, resume=True).completed_ids, {"00001", "00002", "00003"})
+
+    def test_without_resume_starts_over(self) -> None:
+        path = self.tmp_dir / "01move.journal"
+        path.write_text("ok 00001\n", encoding="utf-8")
+        journal = FetchJournal(path)
+        journal.record(2, ok=False)
+        journal.close()
+        self.assertEqual(path.read_text(encoding="utf-8"), "fail 00002\n")
+
+
+class FetchResumeTests(MockServerMixin, SimpleTestCase):
+    """
+    --resume: 中断したステージのジャーナルで完了済み、かつファイルが残っているアイテムは取り直さない。
+    """
+
+    api_class = RecordingPokeAPI
+
+    def test_resume_skips_completed_items(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        self.fetch("fetch_move", "move")
+        self.assertEqual(self.server.api.item_ids("move"), [1, 2, 3, 4])
+
+        # ステージ 2 の途中で止まった状態を作る: 1〜3 は完了、3 はファイルが消えている、4 は未着手
+        journal_path = self.tmp_dir / "log" / "raw" / "move" / "move" / "02move.journal"
+        journal_path.write_text("ok 00001\nok 00002\nok 00003\nok 0", encoding="utf-8")
+        (json_dir / "00003.json").unlink()
+        self.server.api.paths.clear()
+
+        output = self.fetch("fetch_move", "move", "--resume")
+        self.assertIn("move: 完了済み 2 件をスキップし、2 件を再開します。", output)
+        self.assertEqual(self.server.api.item_ids("move"), [3, 4])
+        self.assertTrue((json_dir / "00003.json").exists())
+        self.assertEqual(FetchJournal(journal_path, resume=True).completed_ids, {"00001", "00002", "00003", "00004"})
+
+    def test_without_resume_fetches_everything(self) -> None:
+        self.fetch("fetch_move", "move")
+        journal_path = self.tmp_dir / "log" / "raw" / "move" / "move" / "02move.journal"
+        journal_path.write_text("ok 00001\nok 00002\n", encoding="utf-8")
+        self.server.api.paths.clear()
+
+        output = self.fetch("fetch_move", "move")
+        self.assertNotIn("完了済み", output)
+        self.assertEqual(self.server.api.item_ids("move"), [1, 2, 3, 4])
+
+
+class PackStoreTests(TempDirMixin, SimpleTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.json_dir = self.tmp_dir / "move"
+
+    def write(self, records: dict) -> None:
+        store = PackStore(self.json_dir)
+        for id_num, data in records.items():
+            store.put(id_num, data)
+        store.close()
+
+    def test_round_trip(self) -> None:
+        records = {id_num: {"id": id_num, "name": f"わざ{id_num}", "power": None} for id_num in (3, 1, 10001)}
+        self.write(records)
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(reader.ids(), [1, 3, 10001])
+            self.assertEqual(dict(reader.items()), records)
+            self.assertNotIn(2, reader)
+            with self.assertRaises(KeyError):
+                reader.load(2)
+        self.assertEqual(resolve_layout(self.json_dir), PackStore.format_name)
+
+    def test_overwrite_and_remove(self) -> None:
+        self.write({1: {"v": 1}, 2: {"v": 2}, 3: {"v": 3}})
+        store = PackStore(self.json_dir)
+        store.put(1, {"v": "new"})
+        store.remove(2)
+        store.remove(99)  # 無い ID は何もしない
+        self.assertEqual(asyncio.run(store.read_bytes(1)), b'{"v":"new"}')
+        self.assertIsNone(asyncio.run(store.read_bytes(2)))
+        store.close()
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(dict(reader.items()), {1: {"v": "new"}, 3: {"v": 3}})
+
+    def test_compacts_when_mostly_dead(self) -> None:
+        self.write({id_num: {"v": id_num} for id_num in range(1, 11)})
+        store = PackStore(self.json_dir)
+        for id_num in range(1, 9):
+            store.remove(id_num)
+        store.close()
+        # 8 / 10 が削除済みなので詰め直され、有効なレコードだけが残る
+        segment = self.json_dir / PackStore.SEGMENT_NAME
+        entries = load_pack_index(self.json_dir)
+        self.assertEqual(sorted(entries), [9, 10])
+        self.assertEqual(segment.stat().st_size, sum(PackStore.RECORD_HEADER.size + n for _, n in entries.values()))
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(reader.load(10), {"v": 10})
+
+    def test_truncated_tail_is_recovered(self) -> None:
+        self.write({1: {"v": 1}, 2: {"v": 2}, 3: {"v": 3}})
+        segment = self.json_dir / PackStore.SEGMENT_NAME
+        valid_size = segment.stat().st_size
+        # 最後のレコードを書いている途中で落ちた状態 (ヘッダーと本文の一部だけ)
+        with segment.open("ab") as f:
+            f.write(PackStore.RECORD_HEADER.pack(4, 100) + b"\x78\x9c")
+        (self.json_dir / PackStore.INDEX_NAME).write_bytes(PackStore.INDEX_MAGIC + b"\x04\x00")
+
+        # 読み手はインデックスが壊れていてもセグメントを走査し、書きかけのレコードを読まない
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(dict(reader.items()), {1: {"v": 1}, 2: {"v": 2}, 3: {"v": 3}})
+
+        # 書き手は開き直すと末尾を切り詰め、その後ろに追記する
+        store = PackStore(self.json_dir)
+        self.assertEqual(segment.stat().st_size, valid_size)
+        store.put(4, {"v": 4})
+        store.close()
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(reader.ids(), [1, 2, 3, 4])
+            self.assertEqual(reader.load(4), {"v": 4})
+
+    def test_stale_index_falls_back_to_scan(self) -> None:
+        self.write({1: {"v": 1}, 2: {"v": 2}})
+        index = self.json_dir / PackStore.INDEX_NAME
+        # セグメントと食い違うインデックス (長さが違う)
+        index.write_bytes(PackStore.INDEX_MAGIC + PackStore.INDEX_ENTRY.pack(1, 0, 999))
+        with PackReader(self.json_dir) as reader:
+            self.assertEqual(reader.ids(), [1, 2])
+
+    def test_layout_without_marker(self) -> None:
+        json_dir = self.json_dir
+        json_dir.mkdir()
+        self.assertEqual(resolve_layout(json_dir), JsonFileStore.format_name)
+        (json_dir / PackStore.SEGMENT_NAME).write_bytes(b"")
+        self.assertEqual(resolve_layout(json_dir), PackStore.format_name)
+
+
+class StorageLayoutTests(MockServerMixin, SimpleTestCase):
+    def test_fetch_into_pack_and_back_to_files(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        self.fetch("fetch_move", "move", "--storage", "pack")
+        self.assertEqual(resolve_layout(json_dir), PackStore.format_name)
+        with PackReader(json_dir) as reader:
+            self.assertEqual(reader.ids(), [1, 2, 3, 4])
+            self.assertEqual(reader.load(2), json.loads(self.server.api.bodies["move"][2]))
+        self.assertEqual(list(json_dir.glob("*.json")), [])
+
+        # 同じディレクトリへ files で書き直すと、pack.seg が残っていても読み手は files を読む
+        self.fetch("fetch_move", "move", "--storage", "files")
+        self.assertTrue(PackStore.exists_in(json_dir))
+        self.assertEqual((json_dir / LAYOUT_FILE_NAME).read_text(encoding="utf-8"), "files\n")
+        self.assertEqual(resolve_layout(json_dir), JsonFileStore.format_name)
+        self.assertEqual(resolve_layout(json_dir, "pack"), PackStore.format_name)
+        self.assertEqual(len(list(json_dir.glob("*.json"))), 4)
+
+    def test_file_writes_leave_no_temporaries(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        self.fetch("fetch_move", "move")
+        self.assertEqual(list(json_dir.glob("*.tmp")), [])
+        self.assertEqual(
+            json.loads((json_dir / "00001.json").read_text(encoding="utf-8")),
+            json.loads(self.server.api.bodies["move"][1]),
+        )
+
+
+class DecodeWorkersTests(MockServerMixin, SimpleTestCase):
+    """
+    --decode-workers: 既定 (0) はその場で整形し、N を渡すと spawn のプロセスプールで同じ結果を作る。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        # スケジューラはプールを待たずに閉じる。起動中の子プロセスが一時ディレクトリ (cwd) の削除に出会わないよう待つ
+        self.addCleanup(self.join_children)
+
+    def join_children(self) -> None:
+        for child in multiprocessing.active_children():
+            child.join(timeout=30)
+
+    def run_cpu(self, decode_workers: int):
+        body = self.server.api.bodies["move"][1]
+
+        async def main():
+            async with FetchScheduler(concurrency=1, per_host=1, decode_workers=decode_workers) as scheduler:
+                pool = scheduler._cpu_pool
+                results = await asyncio.gather(
+                    scheduler.run_cpu(codec.pretty_json, body),
+                    scheduler.run_cpu(codec.extract_payload_id, body),
+                )
+            return pool, results
+
+        return asyncio.run(main())
+
+    def test_inline_by_default(self) -> None:
+        pool, results = self.run_cpu(0)
+        self.assertIsNone(pool)
+        self.assertEqual(results, [codec.pretty_json(self.server.api.bodies["move"][1]), 1])
+
+    def test_spawn_pool(self) -> None:
+        pool, results = self.run_cpu(2)
+        self.assertEqual(pool._mp_context.get_start_method(), "spawn")
+        self.assertEqual(results, [codec.pretty_json(self.server.api.bodies["move"][1]), 1])
+
+    def test_fetch_with_pool_writes_same_files(self) -> None:
+        json_dir = self.raw_dir("move", "move")
+        self.fetch("fetch_move", "move")
+        inline = {path.name: path.read_bytes() for path in json_dir.glob("*.json")}
+        shutil.rmtree(self.tmp_dir / "data")
+        shutil.rmtree(self.tmp_dir / "log")
+
+        self.fetch("fetch_move", "move", "--decode-workers", "2")
+        self.assertEqual({path.name: path.read_bytes() for path in json_dir.glob("*.json")}, inline)
+
+
+class TargetedCrawlTests(MockServerMixin, SimpleTestCase):
+    """
+    fetch_pokemon --targeted: species -> varieties (pokemon) -> forms (pokemon-form) の参照だけをたどる。
+    """
+
+    api_class = RecordingPokeAPI
+    mock_config = {"items": 6, "moves": 1}
+
+    def setUp(self) -> None:
+        super().setUp()
+        base = self.server.base_url
+        bodies = self.server.api.bodies
+        # species 2 は pokemon 2 と 5 を、pokemon 5 は form 5 と 6 を持つ
+        species = json.loads(bodies["pokemon-species"][2])
+        species["varieties"].append({"is_default": False, "pokemon": {"name": "p5", "url": f"{base}/pokemon/5/"}})
+        bodies["pokemon-species"][2] = json.dumps(species).encode()
+        pokemon = json.loads(bodies["pokemon"][5])
+        pokemon["forms"].append({"name": "f6", "url": f"{base}/pokemon-form/6/"})
+        bodies["pokemon"][5] = json.dumps(pokemon).encode()
+
+    def stored_ids(self, sub_name: str) -> list:
+        return sorted(int(path.stem) for path in self.raw_dir("pokemon", sub_name).glob("*.json"))
+
+    def test_species_ids(self) -> None:
+        output = self.fetch("fetch_pokemon", "--targeted", "--species-ids", "2-3")
+        api = self.server.api
+        self.assertEqual(api.item_ids("pokemon-species"), [2, 3])
+        self.assertEqual(api.item_ids("pokemon"), [2, 3, 5])
+        self.assertEqual(api.item_ids("pokemon-form"), [2, 3, 5, 6])
+        # 起点の ID を指定したときは一覧を取りに行かない
+        self.assertFalse(any(path.rstrip("/").endswith("-species") for path in api.paths))
+        self.assertIn("pokemon-species: 参照先 3 件", output)
+        self.assertIn("pokemon-pokemon: 参照先 4 件", output)
+        self.assertEqual(self.stored_ids("pokemon-species"), [2, 3])
+        self.assertEqual(self.stored_ids("pokemon-pokemon"), [2, 3, 5])
+        self.assertEqual(self.stored_ids("pokemon-form"), [2, 3, 5, 6])
+
+    def test_whole_species_list(self) -> None:
+        del self.server.api.bodies["pokemon-species"][5]
+        del self.server.api.bodies["pokemon-species"][6]
+        self.fetch("fetch_pokemon", "--targeted")
+        # pokemon 5 と form 5 / 6 は species 2 から、それ以外は同じ ID の species からたどる。pokemon 6 はどこからも参照されない
+        self.assertEqual(self.server.api.item_ids("pokemon-species"), [1, 2, 3, 4])
+        self.assertEqual(self.server.api.item_ids("pokemon"), [1, 2, 3, 4, 5])
+        self.assertEqual(self.stored_ids("pokemon-form"), [1, 2, 3, 4, 5, 6])
+
+    def test_invalid_species_ids(self) -> None:
+        stderr = io.StringIO()
+        call_command("fetch_pokemon", "--targeted", "--species-ids", "3-1", "--base-url", self.server.base_url, stderr=stderr)
+        self.assertIn("--species-ids が不正です", stderr.getvalue())
+        self.assertEqual(self.server.api.paths, [])
+
+    def test_parse_id_ranges(self) -> None:
+        self.assertEqual(parse_id_ranges("1-3, 10,2,,386-387"), [1, 2, 3, 10, 386, 387])
+        for spec in ("", "0-2", "a", "5-1"):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                parse_id_ranges(spec)
+
+
+class FetchAllTests(MockServerMixin, SimpleTestCase):
+    """
+    fetch_all: 複数グループを 1 つのスケジューラでフェッチし、参照用の小さなエンドポイントを先に終える。
+    """
+
+    api_class = RecordingPokeAPI
+
+    def item_order(self) -> list:
+        return [path.split("/")[3] for path in self.server.api.paths if path.rstrip("/").split("/")[-1].isdigit()]
+
+    def test_reference_data_first(self) -> None:
+        self.fetch("fetch_all", "move/move", "game/version", "--concurrency", "1")
+        self.assertEqual(self.item_order(), ["version"] * 4 + ["move"] * 4)
+        self.assertEqual(len(list(self.raw_dir("game", "version").glob("*.json"))), 4)
+        self.assertEqual(len(list(self.raw_dir("move", "move").glob("*.json"))), 4)
+
+    def test_priority_override(self) -> None:
+        self.fetch(
+            "fetch_all", "move/move", "game/version", "--concurrency", "1",
+            "--priority", "move/move=reference", "--priority", "game/version=heavy",
+        )
+        self.assertEqual(self.item_order(), ["move"] * 4 + ["version"] * 4)
+
+    def test_invalid_targets(self) -> None:
+        for args in (("fetch_all", "--priority", "move/nope=heavy"), ("fetch_all", "--priority", "move/move=urgent")):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                call_command(*args, "--base-url", self.server.base_url)
+        stderr = io.StringIO()
+        call_command("fetch_all", "nope", "--base-url", self.server.base_url, stderr=stderr)
+        self.assertIn("不正なグループ: nope", stderr.getvalue())
+        self.assertEqual(self.server.api.paths, [])
+
+
+class LoaderTests(RawDataMixin, SimpleTestCase):
+    """
+    all_register の読み込み: ファイル / パック、json / orjson、射影、プロセスプールのどれでも同じデータになる。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.dataset = self.write_raw()
+        self.pokemon_dir = self.raw_dir("pokemon", "pokemon-pokemon")
+
+    def paths(self) -> list:
+        return sorted(str(path) for path in self.pokemon_dir.glob("*.json"))
+
+    def test_parsers_agree(self) -> None:
+        expected = sorted((f"{id_num:05d}", data) for id_num, data in self.dataset["pokemon-pokemon"].items())
+        for parser in loader.available_parsers():
+            with self.subTest(parser=parser):
+                loaded, errors = loader.load_files(self.paths(), parser=parser)
+                self.assertEqual((sorted(loaded), errors), (expected, []))
+        if loader.orjson is not None:
+            record = {"unique_id": "00001-00", "ja": "フシギダネ", "move_generation_01": [33, 1, 1], "base_h": None}
+            self.assertEqual(loader.dumps_indented(record), json.dumps(record, ensure_ascii=False, indent=2).encode())
+            self.assertEqual(
+                loader.dumps_canonical(record),
+                json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode(),
+            )
+
+    def test_projection(self) -> None:
+        loaded, _ = loader.load_files([str(self.pokemon_dir / "00001.json")], projection="pokemon-pokemon")
+        pokemon = dict(loaded)["00001"]
+        self.assertNotIn("moves", pokemon)
+        self.assertNotIn("weight", pokemon)
+        self.assertEqual(pokemon["sprites"], {"front_default": "https://example.invalid/1.png"})
+        self.assertEqual(
+            pokemon[learnset.PRECOMPUTED_KEY],
+            learnset.generation_fields(self.dataset["pokemon-pokemon"][1]["moves"]),
+        )
+        loaded, _ = loader.load_files(
+            [str(self.raw_dir("pokemon", "pokemon-species") / "00001.json")], projection="pokemon-species"
+        )
+        # 日本語 (ja-Hrkt) 以外の名前は捨てる
+        self.assertEqual(dict(loaded)["00001"]["names"], ja_name("フシギダネ"))
+
+    def test_pack_matches_files(self) -> None:
+        from_files, _ = loader.load_files(self.paths(), projection="pokemon-pokemon")
+        shutil.rmtree(self.tmp_dir / "data")
+        self.write_raw(PackStore.format_name)
+        from_pack, errors = loader.load_pack_ids(str(self.pokemon_dir), [1, 4, 10033, 7], projection="pokemon-pokemon")
+        self.assertEqual(sorted(from_pack), sorted(from_files))
+        self.assertEqual(len(errors), 1)  # 無い ID (7) はエラーとして返す
+
+    def test_broken_file_is_reported(self) -> None:
+        (self.pokemon_dir / "00004.json").write_text("{", encoding="utf-8")
+        loaded, errors = loader.load_files(self.paths())
+        self.assertEqual([key for key, _ in loaded], ["00001", "10033"])
+        self.assertEqual([where for where, _ in errors], [str(self.pokemon_dir / "00004.json")])
+
+    def test_run_jobs_in_pool(self) -> None:
+        jobs = [(index, loader.load_files, ([path],)) for index, path in enumerate(self.paths())]
+        results = {}
+        for workers in (1, 2):
+            collected = {}
+            loader.run_jobs(jobs, workers, collected.__setitem__)
+            results[workers] = collected
+        self.assertEqual(results[1], results[2])
+        self.assertEqual(len(results[2]), 3)
+
+    def test_record_hash_ignores_key_order(self) -> None:
+        record = {"unique_id": "00001-00", "ja": "フシギダネ", "base_h": 45}
+        self.assertEqual(loader.record_hash(record), loader.record_hash(dict(reversed(list(record.items())))))
+        self.assertNotEqual(loader.record_hash(record), loader.record_hash({**record, "base_h": 46}))
+
+
+class RegisterLoadingTests(RawDataMixin, TestCase):
+    """
+    all_register --source raw: 読み込み方 (--workers / --json-parser / --project / パック) によらず同じレコードを作る。
+    """
+
+    def test_same_records_whatever_the_loader(self) -> None:
+        self.write_raw()
+        self.call("all_register", "--workers", "1")
+        expected = self.merged()
+        self.assertEqual([record["unique_id"] for record in json.loads(expected)], [
+            "00001-00", "00001-01", "00004-00", "00004-01", "00004-02",
+        ])
+
+        variants = [
+            ("--source", "raw", "--workers", "1", "--json-parser", "json"),
+            ("--source", "raw", "--workers", "2", "--project"),
+        ] + [("--source", "raw", "--workers", "1", "--json-parser", parser) for parser in loader.available_parsers()]
+        for args in variants:
+            with self.subTest(args=args):
+                self.call("all_register", *args, "--force")
+                self.assertEqual(self.merged(), expected)
+
+        shutil.rmtree(self.tmp_dir / "data" / "raw")
+        self.write_raw(PackStore.format_name)
+        self.call("all_register", "--source", "raw", "--workers", "2", "--force")
+        self.assertEqual(self.merged(), expected)
+
+
+class DocumentCacheTests(SimpleTestCase):
+    def test_lru(self) -> None:
+        cache = DocumentCache(2)
+        loads = []
+
+        def get(key: str) -> str:
+            return cache.get(key, lambda: loads.append(key) or key.upper())
+
+        self.assertEqual([get("a"), get("b"), get("a"), get("c"), get("b"), get("a")], ["A", "B", "A", "C", "B", "A"])
+        # a を使い直したので c を入れたときに追い出されるのは b
+        self.assertEqual(loads, ["a", "b", "c", "b", "a"])
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+    def test_budget_evicts_then_raises(self) -> None:
+        budget = mock.Mock(limit_bytes=1024 * 1024, **{"current.return_value": 2 * 1024 * 1024})
+        cache = DocumentCache(3, budget=budget)
+        budget.exceeded.return_value = False
+        for key in "abc":
+            cache.get(key, lambda: key)
+        # a は件数の上限で、b はメモリの上限で追い出す（収まったところで止める）
+        budget.exceeded.side_effect = [True, True, False, False]
+        cache.get("d", lambda: "d")
+        self.assertEqual(list(cache._items), ["c", "d"])
+
+        # 直前に読んだもの以外を全部手放しても超えているなら止める
+        budget.exceeded.side_effect = None
+        budget.exceeded.return_value = True
+        with self.assertRaises(MemoryLimitExceeded):
+            cache.get("e", lambda: "e")
+        self.assertEqual(list(cache._items), ["e"])
+
+    def test_memory_budget(self) -> None:
+        budget = MemoryBudget(1)
+        self.addCleanup(budget.stop)
+        retained = [bytes(1024) for _ in range(100)]
+        self.assertTrue(budget.exceeded())
+        self.assertGreater(budget.peak(), 100 * 1024)
+        budget.stop()
+        # 止めた後も止める直前のピークを返す
+        self.assertGreater(budget.peak(), 100 * 1024)
+        del retained
+        self.assertFalse(MemoryBudget().exceeded())
+
+
+class LazyDocumentMapTests(RawDataMixin, SimpleTestCase):
+    def test_files_and_pack(self) -> None:
+        dataset = self.write_raw()
+        form_dir = self.raw_dir("pokemon", "pokemon-form")
+        for layout in (JsonFileStore.format_name, PackStore.format_name):
+            with self.subTest(layout=layout):
+                if layout == PackStore.format_name:
+                    shutil.rmtree(self.tmp_dir / "data")
+                    self.write_raw(layout)
+                cache = DocumentCache(2)
+                forms = LazyDocumentMap("pokemon-form", form_dir, cache)
+                self.addCleanup(forms.close)
+                self.assertEqual(list(forms), ["00001", "00004", "10004", "10005", "10033"])
+                self.assertEqual(len(forms), 5)
+                self.assertEqual(forms["10033"], dataset["pokemon-form"][10033])
+                self.assertEqual(forms.get("10033"), dataset["pokemon-form"][10033])
+                self.assertIsNone(forms.get("00002"))
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+                forms.close()
+
+    def test_projection_and_errors(self) -> None:
+        self.write_raw()
+        pokemon_dir = self.raw_dir("pokemon", "pokemon-pokemon")
+        (pokemon_dir / "00004.json").write_text("{", encoding="utf-8")
+        pokemon = LazyDocumentMap(
+            "pokemon-pokemon", pokemon_dir, DocumentCache(8), projection="pokemon-pokemon"
+        )
+        self.assertIn(learnset.PRECOMPUTED_KEY, pokemon["00001"])
+        # 壊れたファイルは読めないものとして扱い、エラーを残す
+        with self.assertRaises(KeyError):
+            pokemon["00004"]
+        self.assertEqual([where for where, _ in pokemon.errors], [str(pokemon_dir / "00004.json")])
+
+
+class StreamingRegisterTests(RawDataMixin, TestCase):
+    """
+    all_register --streaming: 参照されたものだけを LRU 経由で読み、全件読み込みと同じレコードを作る。
+    """
+
+    def test_same_records_as_full_load(self) -> None:
+        self.write_raw()
+        self.call("all_register", "--workers", "1")
+        expected = self.merged()
+        for args in (("--streaming", "--cache-size", "1"), ("--streaming", "--project"), ("--memory-limit", "512")):
+            with self.subTest(args=args):
+                output = self.call("all_register", *args, "--force")
+                self.assertEqual(self.merged(), expected)
+                self.assertIn("LRU: ヒット", output)
+        self.assertIn("Python ヒープのピーク", output)
+        self.assertIn("上限 512.0 MB", output)
+
+    def test_memory_limit(self) -> None:
+        self.write_raw()
+        with self.assertRaisesMessage(CommandError, "--cache-size を小さくするか"):
+            call_command("all_register", "--memory-limit", "0.0001", stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse((self.tmp_dir / "data" / "merged" / "pokedex_check.json").exists())
+
+    def test_streaming_needs_raw_source(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command("all_register", "--streaming", "--source", "extract", stdout=io.StringIO())
+
+
+class RegisterUpsertTests(RawDataMixin, TestCase):
+    """
+    all_register: content_hash で現在の行と突き合わせ、新規・変更・削除だけを反映する。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.dataset = self.write_raw()
+        self.call("all_register")
+
+    def register(self, *args: str) -> str:
+        return self.call("all_register", "--force", *args)
+
+    def hashes(self) -> dict:
+        return dict(Pokemon.objects.values_list("unique_id", "content_hash"))
+
+    def test_first_run_inserts_everything(self) -> None:
+        records = json.loads(self.merged())
+        self.assertEqual(self.hashes(), {record["unique_id"]: loader.record_hash(record) for record in records})
+        pokemon = Pokemon.objects.get(unique_id="00001-00")
+        self.assertEqual((pokemon.ja, pokemon.type_first, pokemon.base_t, pokemon.blueberry_dex), ("フシギダネ", "草", 318, 164))
+
+    def test_unchanged_rows_are_not_written(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            output = self.register()
+        self.assertIn("登録差分: 新規 0 件 / 変更 0 件 / 変更なし 5 件 / 削除 0 件", output)
+        writes = [q["sql"] for q in context.captured_queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual([sql for sql in writes if "pokedex_pokemon" in sql.split(" WHERE ")[0]], [])
+
+    def test_only_changed_fields_are_updated(self) -> None:
+        before = self.hashes()
+        self.dataset["pokemon-pokemon"][4]["stats"][0]["base_stat"] = 139
+        self.write_raw(dataset=self.dataset)
+        with CaptureQueriesContext(connection) as context:
+            output = self.register()
+        self.assertIn("登録差分: 新規 0 件 / 変更 3 件 / 変更なし 2 件 / 削除 0 件", output)
+        self.assertIn("変更されたフィールド: base_h=3, base_t=3", output)
+        updates = [q["sql"] for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn('"ja"', sql.split(" WHERE ")[0])
+
+        after = self.hashes()
+        self.assertEqual([key for key in before if before[key] != after[key]], ["00004-00", "00004-01", "00004-02"])
+        self.assertEqual(Pokemon.objects.get(unique_id="00004-02").base_h, 139)
+
+    def test_new_and_removed_rows(self) -> None:
+        self.dataset["pokemon-pokemon"][4]["forms"].pop()  # 10005
+        self.write_raw(dataset=self.dataset)
+        output = self.register()
+        self.assertIn("登録差分: 新規 0 件 / 変更 0 件 / 変更なし 4 件 / 削除 1 件", output)
+        self.assertIn("削除: 00004-02", output)
+        self.assertFalse(Pokemon.objects.filter(unique_id="00004-02").exists())
+
+        self.dataset["pokemon-pokemon"][4]["forms"].append({"url": "https://pokeapi.co/api/v2/pokemon-form/10005/"})
+        self.write_raw(dataset=self.dataset)
+        self.assertIn("新規: 00004-02", self.register())
+
+    def test_missing_form_keeps_existing_row(self) -> None:
+        (self.raw_dir("pokemon", "pokemon-form") / "10004.json").unlink()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("all_register", stdout=stdout, stderr=stderr)
+        self.assertIn("Missing form data", stderr.getvalue())
+        self.assertIn("元データが欠けているため、既存の行を残しました: 00004-01", stdout.getvalue())
+        self.assertIn("削除 0 件", stdout.getvalue())
+        # 番号は飛ばさないので、後ろのフォームの unique_id は変わらない
+        self.assertEqual(Pokemon.objects.get(unique_id="00004-02").form_id, "10005")
+        self.assertEqual((self.tmp_dir / "data" / "merged" / "pokedex_check.skipped").read_text(), "00004-01\n")
+
+    def test_full_refresh(self) -> None:
+        Pokemon.objects.filter(unique_id="00001-00").update(ja="?")
+        output = self.register("--full-refresh")
+        self.assertIn("5 件の新しいレコードをデータベースに追加しました。", output)
+        self.assertEqual(Pokemon.objects.get(unique_id="00001-00").ja, "フシギダネ")
+        self.assertEqual(len(self.hashes()), 5)
+
+
+class RegisterSwapTests(RawDataMixin, TransactionTestCase):
+    """
+    all_register --swap / --rollback: 影テーブルに組み立てて本番と入れ替え、前の版に戻せる。
+    スキーマの変更 (テーブル名の変更) を伴うので TransactionTestCase で動かす。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.addCleanup(self.drop_side_tables)
+        self.dataset = self.write_raw()
+        self.call("all_register")
+
+    def drop_side_tables(self) -> None:
+        with connection.schema_editor() as editor:
+            for suffix in (swap.SHADOW_SUFFIX, swap.OLD_SUFFIX):
+                db_table = Pokemon._meta.db_table + suffix
+                if swap.table_exists(db_table):
+                    editor.delete_model(swap.table_model(Pokemon, db_table))
+
+    def names(self, suffix: str = "") -> dict:
+        model = swap.table_model(Pokemon, Pokemon._meta.db_table + suffix) if suffix else Pokemon
+        return dict(model.objects.values_list("unique_id", "sub_ja"))
+
+    def index_names(self) -> set:
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Pokemon._meta.db_table)
+        return {name for name, info in constraints.items() if info["index"]}
+
+    def test_swap_and_rollback(self) -> None:
+        before = self.names()
+        indexes = self.index_names()
+        self.assertTrue({index.name for index in Pokemon._meta.indexes} <= indexes)
+
+        self.dataset["pokemon-form"][10005]["form_names"] = ja_name("あたらしいすがた")
+        self.write_raw(dataset=self.dataset)
+        output = self.call("all_register", "--swap")
+        self.assertIn("変更 1 件", output)
+        self.assertIn("を入れ替えました", output)
+        after = self.names()
+        self.assertEqual(after["00004-02"], "あたらしいすがた")
+        self.assertEqual(self.names(swap.OLD_SUFFIX), before)
+        self.assertFalse(swap.table_exists(Pokemon._meta.db_table + swap.SHADOW_SUFFIX))
+        self.assertEqual(self.index_names(), indexes)
+
+        output = self.call("all_register", "--rollback")
+        self.assertIn("を前の版に戻しました", output)
+        self.assertEqual(self.names(), before)
+        self.assertEqual(self.index_names(), indexes)
+        # 戻した後はどの入力の版か分からないので、次の実行では DB に反映し直す
+        self.assertEqual(DataVersion.objects.get(name=DataVersion.POKEMON).fingerprint, "")
+        self.assertNotIn("DB は既にこの入力の版です", self.call("all_register"))
+        self.assertEqual(self.names(), after)
+
+        # もう一度 --rollback すると入れ替える前 (swap 直後の版) に戻る
+        self.call("all_register", "--rollback")
+        self.assertEqual(self.names(swap.OLD_SUFFIX), after)
+
+    def test_swap_with_full_refresh(self) -> None:
+        Pokemon.objects.filter(unique_id="00001-00").update(ja="?")
+        self.call("all_register", "--swap", "--full-refresh")
+        self.assertEqual(Pokemon.objects.get(unique_id="00001-00").ja, "フシギダネ")
+        self.assertEqual(Pokemon.objects.count(), 5)
+
+    def test_rollback_without_previous_table(self) -> None:
+        with self.assertRaisesMessage(CommandError, "戻せる版"):
+            call_command("all_register", "--rollback", stdout=io.StringIO())
+
+
+class GenerationFieldsTests(SimpleTestCase):
+    """
+    learnset.generation_fields: moves を 1 回たどって、世代ごとの登場フラグと覚える技の一覧を作る。
+    """
+
+    def test_flags_and_learnsets(self) -> None:
+        fields = learnset.generation_fields([
+            learned(22, "level-up", 7, "red-blue", "yellow", "scarlet-violet"),
+            learned(33, "level-up", 1, "yellow"),
+            learned(33, "machine", None, "sword-shield"),
+            learned(14, "unknown-method", 0, "sword-shield"),
+            # リメイク作品のバージョングループは数えない
+            learned(15, "machine", 0, "firered-leafgreen"),
+        ])
+        self.assertEqual(sorted(fields), sorted(
+            [learnset.exist_field(g) for g in range(1, 10)] + [learnset.move_field(g) for g in range(1, 10)]
+        ))
+        self.assertEqual(
+            [generation for generation in range(1, 10) if fields[learnset.exist_field(generation)]], [1, 8, 9]
+        )
+        # 同じ世代の複数のバージョングループに出てくる同じ覚え方は 1 件。覚え方 -> レベル -> 技ID の順
+        self.assertEqual(fields["move_generation_01"], [33, 1, 1, 22, 1, 7])
+        self.assertEqual(fields["move_generation_08"], [14, 0, 0, 33, 4, 0])
+        self.assertEqual(fields["move_generation_09"], [22, 1, 7])
+        self.assertIsNone(fields["move_generation_03"])
+
+    def test_no_moves(self) -> None:
+        fields = learnset.generation_fields([])
+        self.assertFalse(any(fields[learnset.exist_field(generation)] for generation in range(1, 10)))
+        self.assertTrue(all(fields[learnset.move_field(generation)] is None for generation in range(1, 10)))
+
+    def test_version_group_index(self) -> None:
+        self.assertEqual(learnset.VERSION_GROUP_GENERATION["ultra-sun-ultra-moon"], 7)
+        self.assertNotIn("firered-leafgreen", learnset.VERSION_GROUP_GENERATION)
+        self.assertEqual(
+            sorted(learnset.VERSION_GROUP_GENERATION),
+            sorted(name for names in learnset.GENERATION_VERSION_GROUPS.values() for name in names),
+        )
+
+
+class ExtractTests(RawDataMixin, SimpleTestCase):
+    """
+    all_extract: 前回から変わった生データだけを読み直し、残りの行はそのまま書き写す。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.dataset = self.write_raw()
+        self.extract_dir = self.tmp_dir / "data" / "extract" / "pokemon"
+
+    def refresh(self, name: str = "pokemon-pokemon", **kwargs) -> extract.ExtractStats:
+        return extract.refresh(
+            name, self.raw_dir("pokemon", name), extract.extract_path(self.extract_dir, name), **kwargs
+        )
+
+    def counts(self, stats: extract.ExtractStats) -> tuple:
+        return stats.total, stats.extracted, stats.reused, stats.removed
+
+    def test_command_output(self) -> None:
+        output = self.call("all_extract", "--workers", "1")
+        self.assertIn("pokemon-species: 2 件 (抽出 2 / 再利用 0 / 削除 0)", output)
+        self.assertIn("pokemon-form: 5 件 (抽出 5 / 再利用 0 / 削除 0)", output)
+        mtime = extract.extract_path(self.extract_dir, "pokemon-form").stat().st_mtime_ns
+        self.assertIn("pokemon-form: 5 件 (抽出 0 / 再利用 5 / 削除 0)", self.call("all_extract"))
+        # 何も変わっていなければ抽出ファイルに触らない
+        self.assertEqual(extract.extract_path(self.extract_dir, "pokemon-form").stat().st_mtime_ns, mtime)
+
+    def test_only_changed_documents_are_read(self) -> None:
+        first = self.refresh()
+        self.assertEqual(self.counts(first), (3, 3, 0, 0))
+
+        self.dataset["pokemon-pokemon"][4]["stats"][0]["base_stat"] = 139
+        self.write_raw(dataset={"pokemon-pokemon": {4: self.dataset["pokemon-pokemon"][4]}})
+        with mock.patch.object(loader, "load_files", wraps=loader.load_files) as load_files:
+            second = self.refresh()
+        self.assertEqual(self.counts(second), (3, 1, 2, 0))
+        self.assertEqual([call.args[0] for call in load_files.call_args_list], [
+            [str(self.raw_dir("pokemon", "pokemon-pokemon") / "00004.json")],
+        ])
+        self.assertNotEqual(second.digest, first.digest)
+
+        loaded = extract.load(extract.extract_path(self.extract_dir, "pokemon-pokemon"))
+        self.assertEqual(loaded["00004"], loader.project_pokemon(self.dataset["pokemon-pokemon"][4]))
+        self.assertEqual(loaded["00001"], loader.project_pokemon(self.dataset["pokemon-pokemon"][1]))
+
+    def test_removed_and_broken_documents(self) -> None:
+        self.refresh("pokemon-form")
+        form_dir = self.raw_dir("pokemon", "pokemon-form")
+        (form_dir / "10005.json").unlink()
+        (form_dir / "10004.json").write_text("{", encoding="utf-8")
+        stats = self.refresh("pokemon-form")
+        self.assertEqual(self.counts(stats), (4, 0, 3, 1))
+        self.assertEqual([where for where, _ in stats.errors], [str(form_dir / "10004.json")])
+        self.assertEqual(sorted(extract.load(extract.extract_path(self.extract_dir, "pokemon-form"))), [
+            "00001", "00004", "10033",
+        ])
+
+        # 読めなかったものは次回読み直す
+        self.write_raw(dataset={"pokemon-form": {10004: self.dataset["pokemon-form"][10004]}})
+        self.assertEqual(self.counts(self.refresh("pokemon-form")), (4, 1, 3, 0))
+
+    def test_pack_stamps_follow_content(self) -> None:
+        shutil.rmtree(self.tmp_dir / "data" / "raw")
+        self.write_raw(PackStore.format_name)
+        first = self.refresh()
+        # 同じ内容を書き直してもペイロードの CRC32 は同じなので読み直さない
+        store = PackStore(self.raw_dir("pokemon", "pokemon-pokemon"))
+        store.put(1, self.dataset["pokemon-pokemon"][1])
+        store.put(4, {**self.dataset["pokemon-pokemon"][4], "weight": 85})
+        store.close()
+        second = self.refresh()
+        self.assertEqual(self.counts(second), (3, 1, 2, 0))
+        self.assertNotEqual(second.digest, first.digest)
+
+    def test_header_mismatch_rebuilds(self) -> None:
+        self.refresh()
+        path = extract.extract_path(self.extract_dir, "pokemon-pokemon")
+        lines = path.read_bytes().split(b"\n", 1)
+        path.write_bytes(b'{"format":"pokedex-extract","version":0}\n' + lines[1])
+        self.assertEqual(self.counts(self.refresh()), (3, 3, 0, 0))
+        self.assertEqual(self.counts(self.refresh(rebuild=True)), (3, 3, 0, 0))
+
+    def test_missing_raw_directory(self) -> None:
+        shutil.rmtree(self.tmp_dir / "data" / "raw")
+        with self.assertRaisesMessage(CommandError, "ディレクトリがありません"):
+            call_command("all_extract", stdout=io.StringIO())
+
+
+class RegisterFingerprintTests(RawDataMixin, TestCase):
+    """
+    all_register: 入力の指紋 (生データのスタンプ + レコード生成のコード) が前回と同じなら作り直さない。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.dataset = self.write_raw()
+        self.first = self.call("all_register")
+        self.merged_path = self.tmp_dir / "data" / "merged" / "pokedex_check.json"
+
+    def test_unchanged_input_is_skipped(self) -> None:
+        self.assertIn("Done!", self.first)
+        mtime = self.merged_path.stat().st_mtime_ns
+        output = self.call("all_register")
+        self.assertIn("入力に変更はありません (指紋 ", output)
+        self.assertNotIn("登録差分", output)
+        self.assertEqual(self.merged_path.stat().st_mtime_ns, mtime)
+
+        fingerprint = (self.tmp_dir / "data" / "merged" / "pokedex_check.fingerprint").read_text().strip()
+        self.assertEqual(DataVersion.objects.get(name=DataVersion.POKEMON).fingerprint, fingerprint)
+
+    def test_merged_file_is_reused_for_a_stale_database(self) -> None:
+        DataVersion.objects.filter(name=DataVersion.POKEMON).update(fingerprint="other")
+        Pokemon.objects.filter(unique_id="00004-02").delete()
+        mtime = self.merged_path.stat().st_mtime_ns
+        output = self.call("all_register")
+        self.assertIn("入力に変更がないため", output)
+        self.assertIn("登録差分: 新規 1 件", output)
+        self.assertEqual(self.merged_path.stat().st_mtime_ns, mtime)
+
+    def test_rebuilds_when_input_or_code_changes(self) -> None:
+        self.dataset["pokemon-species"][4]["names"] = ja_name("ヒトカゲX")
+        self.write_raw(dataset={"pokemon-species": {4: self.dataset["pokemon-species"][4]}})
+        output = self.call("all_register")
+        self.assertIn("Done!", output)
+        self.assertIn("変更 3 件", output)
+
+        # tqdm は読み込み時に TQDM_DISABLE を読むので、コマンドのモジュールはテストの中で読み込む
+        with mock.patch("pokedex.management.commands.all_register.Command.RECORDS_VERSION", 999):
+            output = self.call("all_register")
+        self.assertIn("Done!", output)
+        self.assertIn("変更なし 5 件", output)
+
+    def test_force_and_interrupted_build(self) -> None:
+        self.assertIn("Done!", self.call("all_register", "--force"))
+        # 確認用 JSON を書き終える前に止まった場合 (指紋のファイルが無い) は作り直す
+        (self.tmp_dir / "data" / "merged" / "pokedex_check.fingerprint").unlink()
+        self.assertIn("Done!", self.call("all_register"))
+
+
+def grouping_record(unique_id: str, pokemon_id: str, form_id: str, sub_ja: str = "", **fields) -> dict:
+    record = {
+        "unique_id": unique_id,
+        "species_id": unique_id[:5],
+        "pokemon_id": pokemon_id,
+        "form_id": form_id,
+        "sub_ja": sub_ja,
+        "ability_01": "blaze",
+        "type_first": "炎",
+        "base_h": 39,
+    }
+    record.update(fields)
+    return record
+
+
+class AssignGroupsTests(SimpleTestCase):
+    def test_groups_and_originals(self) -> None:
+        records = [
+            grouping_record("00006-00", "00006", "00006"),
+            grouping_record("00006-01", "10034", "10034", "メガリザードンX", base_h=78),
+            grouping_record("00006-02", "10035", "10035", "メガリザードンY", base_h=78),
+            grouping_record("00006-03", "00006", "10196", "gmax"),
+            grouping_record("00006-04", "00006", "10300", "べつのすがた"),
+            grouping_record("00025-01", "00025", "10080", "おきがえ", ability_01="static"),
+            grouping_record("00025-02", "00025", "10081", "おきがえ", ability_01="static"),
+        ]
+        expected = {
+            "00006-00": (1, True),
+            # キョダイマックスは能力値が同じでも別のグループ
+            "00006-03": (2, True),
+            # 同じ能力値のメガシンカ X / Y は 1 つのグループで、unique_id の最小のものが original
+            "00006-01": (3, True),
+            "00006-02": (3, False),
+            "00006-04": (1, False),
+            # "-00" が無い species は unique_id の最小のもの
+            "00025-01": (1, True),
+            "00025-02": (1, False),
+        }
+        self.assertEqual(grouping.assign_groups(records), expected)
+        # 並び順に依存しない（番号は species_id -> pokemon_id -> form_id の数値順に振る）
+        self.assertEqual(grouping.assign_groups(reversed(records)), expected)
+
+
+class SetOriginalTests(RawDataMixin, TestCase):
+    """
+    all_set_original: DB の行から all_register と同じ group / original / in_<地方> / content_hash を求め直す。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.write_raw()
+        self.call("all_register")
+
+    def snapshot(self) -> dict:
+        fields = ("group", "original", "in_national", "in_galar", "in_paldea", "content_hash")
+        return {row[0]: row[1:] for row in Pokemon.objects.values_list("unique_id", *fields)}
+
+    def test_matches_register(self) -> None:
+        registered = self.snapshot()
+        self.assertEqual(
+            {unique_id: values[:2] for unique_id, values in registered.items()},
+            {
+                "00001-00": (1, True),
+                "00001-01": (2, True),
+                "00004-00": (1, True),
+                "00004-01": (2, True),
+                "00004-02": (1, False),
+            },
+        )
+        self.assertIn("No records needed updating (5 records checked).", self.call("all_set_original"))
+
+        Pokemon.objects.filter(unique_id="00004-02").update(group=9, original=True, in_national=True)
+        Pokemon.objects.filter(unique_id="00004-00").update(content_hash="stale")
+        with CaptureQueriesContext(connection) as context:
+            output = self.call("all_set_original")
+        self.assertIn("Updated 2 of 5 records", output)
+        # 行ごとのクエリは無く、読み込み 1 回と bulk_update 1 回
+        pokemon_queries = [q["sql"].split()[0] for q in context.captured_queries if '"pokedex_pokemon"' in q["sql"]]
+        self.assertEqual(pokemon_queries, ["SELECT", "UPDATE"])
+        self.assertEqual(self.snapshot(), registered)
+        # 求め直した content_hash は all_register のものと同じなので、次の差分登録は何も書かない
+        self.assertIn("変更なし 5 件", self.call("all_register", "--force"))
+
+
+class RegisterMovesTests(RawDataMixin, TestCase):
+    """
+    all_register_moves: move の生データから Move を、pokemon の抽出ファイルから PokemonMove を登録する。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.dataset = self.write_raw()
+
+    def register(self, *args: str) -> tuple:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("all_register_moves", "--workers", "1", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def learnsets(self) -> list:
+        return list(
+            PokemonMove.objects.order_by("pokemon_id", "generation", "learn_method", "level", "move_id")
+            .values_list("pokemon_id", "move_id", "generation", "learn_method", "level")
+        )
+
+    def test_register(self) -> None:
+        stdout, stderr = self.register()
+        self.assertIn("Move 2 件 / PokemonMove 5 件 (3 pokemon) を登録しました。", stdout)
+        # move データに無い技 (999) の行は登録せずに知らせる
+        self.assertIn("[WARN] move データに無い技 1 種", stderr)
+        self.assertIn("move_id 999", stderr)
+
+        vine_whip = Move.objects.get(move_id=22)
+        self.assertEqual(
+            (vine_whip.name, vine_whip.ja, vine_whip.type, vine_whip.damage_class, vine_whip.power, vine_whip.generation),
+            ("vine-whip", "つるのムチ", "草", "physical", 45, 1),
+        )
+        self.assertEqual(self.learnsets(), [
+            ("00001", 33, 1, "level-up", 1),
+            ("00001", 22, 1, "level-up", 7),
+            ("00001", 22, 9, "level-up", 7),
+            ("00004", 33, 8, "egg", 0),
+            ("10033", 22, 6, "machine", 0),
+        ])
+        self.assertEqual(
+            sorted(Move.objects.get(move_id=33).learners.values_list("pokemon_id", flat=True)), ["00001", "00004"]
+        )
+
+    def test_skips_unchanged_input_and_replaces_rows(self) -> None:
+        self.register()
+        stdout, _ = self.register()
+        self.assertIn("入力に変更はありません", stdout)
+
+        (self.raw_dir("move", "move") / "00033.json").unlink()
+        self.dataset["pokemon-pokemon"][4]["moves"] = []
+        self.write_raw(dataset={"pokemon-pokemon": {4: self.dataset["pokemon-pokemon"][4]}})
+        stdout, stderr = self.register()
+        self.assertIn("Move 1 件 / PokemonMove 3 件", stdout)
+        self.assertIn("move_id 33", stderr)
+        self.assertEqual(list(Move.objects.values_list("move_id", flat=True)), [22])
+        self.assertEqual(sorted({row[1] for row in self.learnsets()}), [22])
+        self.assertEqual(DataVersion.objects.filter(name=DataVersion.MOVES).count(), 1)
+
+        stdout, _ = self.register("--force")
+        self.assertIn("Move 1 件 / PokemonMove 3 件", stdout)
+
+    def test_missing_move_directory(self) -> None:
+        shutil.rmtree(self.raw_dir("move", "move"))
+        with self.assertRaisesMessage(CommandError, "fetch_move move"):
+            self.register()
+
+
+class LearnsetEncodingTests(SimpleTestCase):
+    """
+    move_generation_0X の整数配列: [技ID, 覚え方ID, レベル, ...] を 覚え方 -> レベル -> 技ID の順に並べる。
+    """
+
+    def test_round_trip(self) -> None:
+        entries = [(4, 0, 15), (1, 7, 22), (1, 1, 33), (2, 0, 33), (0, 0, 14)]
+        packed = learnset.encode(entries)
+        self.assertEqual(packed, [14, 0, 0, 33, 1, 1, 22, 1, 7, 33, 2, 0, 15, 4, 0])
+        self.assertTrue(all(isinstance(value, int) for value in packed))
+        self.assertEqual(learnset.decode(packed), [
+            {"move_id": 14, "method": "other", "level": 0},
+            {"move_id": 33, "method": "level-up", "level": 1},
+            {"move_id": 22, "method": "level-up", "level": 7},
+            {"move_id": 33, "method": "egg", "level": 0},
+            {"move_id": 15, "method": "machine", "level": 0},
+        ])
+        self.assertEqual(learnset.move_ids(packed), [14, 33, 22, 33, 15])
+
+    def test_names_and_empty(self) -> None:
+        decoded = learnset.decode([33, 1, 1, 999, 4, 0], move_names={33: "tackle"})
+        self.assertEqual([entry["move"] for entry in decoded], ["tackle", None])
+        for empty in (None, []):
+            self.assertEqual(learnset.decode(empty), [])
+            self.assertEqual(learnset.move_ids(empty), [])
+
+    def test_move_id_from_url(self) -> None:
+        self.assertEqual(learnset.move_id_from_url("https://pokeapi.co/api/v2/move/33/"), 33)
+        self.assertEqual(learnset.move_id_from_url("https://pokeapi.co/api/v2/move/33"), 33)
+        self.assertEqual(learnset.move_id_from_url(""), 0)
+        self.assertEqual(learnset.move_id_from_url("https://pokeapi.co/api/v2/move/tackle/"), 0)
+
+
+class RegionsMembershipTests(SimpleTestCase):
+    def membership(self, **record) -> tuple:
+        record.setdefault("front_default_url", "https://example.invalid/1.png")
+        result = regions.membership(record)
+        return tuple(region for region in regions.REGIONS if result[regions.region_field(region)])
+
+    def test_membership(self) -> None:
+        self.assertEqual(
+            self.membership(sub_ja="", original=True, exist_generation_08=True, exist_generation_09=True),
+            ("national", "galar", "paldea"),
+        )
+        # 全国は original のみ
+        self.assertEqual(self.membership(sub_ja="", original=False, exist_generation_09=True), ("paldea",))
+        # メガシンカは全国にだけ載る（"メガリザードンX" のように英字を含むものは全国にも載らない）
+        self.assertEqual(
+            self.membership(sub_ja="メガフシギバナ", original=True, exist_generation_08=True, exist_generation_09=True),
+            ("national",),
+        )
+        self.assertEqual(self.membership(sub_ja="メガリザードンX", original=True, exist_generation_09=True), ())
+        # 英字の sub_ja は載せない。ただしキョダイマックス (gmax) はガラルに載る
+        self.assertEqual(
+            self.membership(sub_ja="gmax", original=True, exist_generation_08=True, exist_generation_09=True),
+            ("galar",),
+        )
+        self.assertEqual(
+            self.membership(sub_ja="Alola", original=True, exist_generation_08=True, exist_generation_09=True), ()
+        )
+        self.assertEqual(self.membership(sub_ja=None, original=True), ("national",))
+
+    def test_without_image(self) -> None:
+        record = {"sub_ja": "", "original": True, "exist_generation_08": True, "exist_generation_09": True}
+        for url in (None, ""):
+            with self.subTest(url=url):
+                self.assertEqual(self.membership(front_default_url=url, **record), ())
+
+    def test_fields_cover_every_region(self) -> None:
+        self.assertEqual(
+            [field for field in Pokemon.record_fields() if field.startswith("in_")],
+            [regions.region_field(region) for region in regions.REGIONS],
+        )
+
+
+class RegionListTests(RawDataMixin, TestCase):
+    """
+    all_register が求めた in_<地方> で、地方の一覧 (api) が絞られる。
+    """
+
+    def test_lists(self) -> None:
+        self.write_raw()
+        self.call("all_register")
+        expected = {
+            "national": ["00001-00", "00001-01", "00004-00"],
+            "galar": ["00004-00", "00004-01", "00004-02"],
+            "paldea": ["00001-00"],
+        }
+        for region, unique_ids in expected.items():
+            with self.subTest(region=region):
+                response = self.client.get(f"/api/{region}-pokemon/", HTTP_ACCEPT="application/json")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(sorted(row["ids"]["unique_id"] for row in response.json()["results"]), unique_ids)
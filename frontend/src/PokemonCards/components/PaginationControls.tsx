@@ -10,18 +10,27 @@ const PaginationControls: React.FC<PaginationControlsProps> = ({
   limit,
   offset,
   onOffsetChange,
+  cursor,
 }) => {
-  // 現在のページ(1始まり)
-  const currentPage = Math.floor(offset / limit) + 1;
+  // 現在のページ(1始まり)。カーソル方式では親が数えたページ番号
+  const currentPage = cursor ? cursor.page : Math.floor(offset / limit) + 1;
   // 総ページ数
   const totalPages = Math.ceil(totalCount / limit);
 
   const handlePrev = () => {
+    if (cursor) {
+      cursor.onPrev();
+      return;
+    }
     const newOffset = offset - limit;
     onOffsetChange(Math.max(newOffset, 0)); // 負の値にならないように
   };
 
   const handleNext = () => {
+    if (cursor) {
+      cursor.onNext();
+      return;
+    }
     const newOffset = offset + limit;
     // 最大を超えた分は特に制限しない(API が next=nullを返せば分かる)が、ここで防ぐことも可
     onOffsetChange(newOffset);
@@ -33,7 +42,7 @@ const PaginationControls: React.FC<PaginationControlsProps> = ({
         variant="outline"
         size="sm"
         onClick={handlePrev}
-        disabled={currentPage <= 1}
+        disabled={cursor ? !cursor.hasPrevious : currentPage <= 1}
       >
         Prev
       </Button>
@@ -44,7 +53,7 @@ const PaginationControls: React.FC<PaginationControlsProps> = ({
         variant="outline"
         size="sm"
         onClick={handleNext}
-        disabled={currentPage >= totalPages}
+        disabled={cursor ? !cursor.hasNext : currentPage >= totalPages}
       >
         Next
       </Button>
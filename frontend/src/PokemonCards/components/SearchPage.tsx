@@ -13,6 +13,9 @@ import ShowStatuses from "./ShowStatuses";
 import { toaster } from "@/components/ui/toaster";
 
 const LIMIT = 48; // 1ページあたりの件数を48に
+// NEXT_PUBLIC_USE_CURSOR_PAGINATION=true なら API のカーソル方式 (?pagination=cursor) でページを送る。
+// 深いページでも1ページあたりの手間が変わらない。未設定なら従来の offset 方式
+const USE_CURSOR_PAGINATION = process.env.NEXT_PUBLIC_USE_CURSOR_PAGINATION === "true";
 
 const SearchPage: React.FC = () => {
   // フィルター配列
@@ -45,15 +48,21 @@ const SearchPage: React.FC = () => {
   // 取得した検索結果データ
   const [searchData, setSearchData] = useState<PokemonListResponse | null>(null);
 
+  // カーソル方式のページ番号(1始まり)と、最初のページで受け取った総件数
+  const [page, setPage] = useState(1);
+  const [totalCount, setTotalCount] = useState(0);
+
   // フィルタ実行時に呼ばれる関数
-  const handleFilter = () => {
-    // フィルタを変えたら最初のページ(offset=0)に戻す
-    setOffset(0);
-    fetchData(0);
+  const handleFilter = async () => {
+    // フィルタを変えたら最初のページ(offset=0)に戻す。取得に失敗したら表示中のページのまま
+    if (await fetchData(0)) {
+      setOffset(0);
+      setPage(1);
+    }
   };
 
   // 実際にデータを取得する関数
-  const fetchData = async (currentOffset: number) => {
+  const fetchData = async (currentOffset: number): Promise<boolean> => {
     const effectiveStatuses = statuses.filter((st) => {
       const noneStat = st.selectedStat.value === "none";
       const noneOp = st.selectedOperator.value === "none";
@@ -66,26 +75,39 @@ const SearchPage: React.FC = () => {
       "http://localhost:8000/api/national-pokemon/",
       effectiveStatuses,
       currentOffset,
-      LIMIT
+      LIMIT,
+      USE_CURSOR_PAGINATION
     );
+    return fetchUrl(url, `offset=${currentOffset}`);
+  };
+
+  // URL のデータを取得する（カーソル方式では API の next / previous の URL をそのまま渡す）。
+  // 成功したら true。ページ番号や offset は呼び出し側が成功してから更新する
+  const fetchUrl = async (url: string, label: string): Promise<boolean> => {
     try {
       const res = await fetch(url);
       if (!res.ok) {
         throw new Error(`サーバーエラー: ${res.status}`);
       }
       const data: PokemonListResponse = await res.json();
+      // カーソル方式では 2 ページ目以降の count が null なので、最初のページの件数を使い続ける
+      if (data.count !== null) {
+        setTotalCount(data.count);
+      }
       setSearchData(data);
 
       toaster.create({
-        description: `データを取得しました (offset=${currentOffset})`,
+        description: `データを取得しました (${label})`,
         type: "info",
       });
+      return true;
     } catch (error) {
       console.error("fetchData error:", error);
       toaster.create({
         description: `データ取得エラー: ${String(error)}`,
         type: "error",
       });
+      return false;
     }
   };
 
@@ -95,15 +117,26 @@ const SearchPage: React.FC = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  // ページネーションが変化したら再取得
-  useEffect(() => {
-    fetchData(offset);
-    // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [offset]);
+  // offset を更新するコールバック（PaginationControls から呼ばれる）。取得できてから offset を進める
+  const onOffsetChange = async (newOffset: number) => {
+    if (await fetchData(newOffset)) {
+      setOffset(newOffset);
+    }
+  };
 
-  // offset を更新するコールバック（PaginationControls から呼ばれる）
-  const onOffsetChange = (newOffset: number) => {
-    setOffset(newOffset);
+  // カーソル方式のページ送り（PaginationControls から呼ばれる）
+  const onNext = async () => {
+    if (!searchData?.next) return;
+    if (await fetchUrl(searchData.next, `page=${page + 1}`)) {
+      setPage(page + 1);
+    }
+  };
+
+  const onPrev = async () => {
+    if (!searchData?.previous) return;
+    if (await fetchUrl(searchData.previous, `page=${page - 1}`)) {
+      setPage(page - 1);
+    }
   };
 
   return (
@@ -117,12 +150,23 @@ const SearchPage: React.FC = () => {
       {/* 検索結果 */}
       {searchData ? (
         <>
-          <SearchDataDisplay data={searchData} />
+          <SearchDataDisplay data={{ ...searchData, count: searchData.count ?? totalCount }} />
           <PaginationControls
-            totalCount={searchData.count}
+            totalCount={totalCount}
             limit={LIMIT}
             offset={offset}
             onOffsetChange={onOffsetChange}
+            cursor={
+              USE_CURSOR_PAGINATION
+                ? {
+                    page,
+                    hasNext: searchData.next !== null,
+                    hasPrevious: searchData.previous !== null,
+                    onNext,
+                    onPrev,
+                  }
+                : undefined
+            }
           />
         </>
       ) : (
@@ -3,15 +3,21 @@ import { Status } from "@/PokemonCards/types/types";
 
 /**
  * ステータス情報と offset / limit を基にリクエストURLを作成
+ * cursorMode が true なら offset の代わりに pagination=cursor を付ける（最初のページ。以降は API の next / previous を使う）
  */
 export function createRequestUrl(
   baseUrl: string,
   statuses: Status[],
   offset: number,
-  limit: number
+  limit: number,
+  cursorMode: boolean = false
 ): string {
   const params = new URLSearchParams();
-  params.set("offset", offset.toString());
+  if (cursorMode) {
+    params.set("pagination", "cursor");
+  } else {
+    params.set("offset", offset.toString());
+  }
   params.set("limit", limit.toString());
 
   // statuses から "none" や空文字は無効扱いにするロジックは呼び出し元でフィルタ済みでもOK
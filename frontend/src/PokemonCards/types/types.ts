@@ -31,9 +31,9 @@ export interface SelectOption {
     // 必要に応じて他の項目も追加
   }
   
-  /** ページネーション付きレスポンス */
+  /** ページネーション付きレスポンス（カーソル方式では 2 ページ目以降の count は null） */
   export interface PokemonListResponse {
-    count: number;
+    count: number | null;
     next: string | null;
     previous: string | null;
     results: PokemonDetail[];
@@ -50,6 +50,16 @@ export interface SelectOption {
     limit: number;            // 1ページあたりの件数(48)
     offset: number;           // 現在の offset
     onOffsetChange: (newOffset: number) => void;
+    cursor?: CursorPagination; // 指定するとカーソル方式で送る(offset / onOffsetChange は使わない)
+  }
+
+  /** カーソル方式 (?pagination=cursor) のページ送り。API の next / previous の URL をたどる */
+  export interface CursorPagination {
+    page: number;             // 現在のページ(1始まり)
+    hasNext: boolean;         // next の URL があるか
+    hasPrevious: boolean;     // previous の URL があるか
+    onNext: () => void;
+    onPrev: () => void;
   }
   
   /** フィルタ実行用コンポーネントのプロパティ */